@@ -0,0 +1,391 @@
+"""ASGI entry point: live crowd routes on an event loop, everything else on a thread pool.
+
+Running
+-------
+The WSGI setup (``gunicorn server:app``) keeps working unchanged. For
+deployments that hold many open pages, serve this module instead:
+
+    uvicorn asgi:application --host 0.0.0.0 --port 8000
+
+or, with gunicorn managing the worker processes:
+
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker -w 2 -b 0.0.0.0:8000
+
+ASGI_THREADS (default 32) sizes each process's pool for the Flask routes.
+Serving this module also tells pages to use the crowd stream rather than
+poll (server.CROWD_STREAMING).
+
+What runs where
+---------------
+``GET /api/cafeteria/stream``, ``/api/cafeteria/crowd`` and
+``/api/cafeteria/status`` are answered on the event loop. An open
+event stream is a coroutine waiting on the broadcaster rather than a
+worker thread, so idle tabs cost a socket and a few kilobytes each. Every
+other request goes to the Flask app on the thread pool. Its body is read
+asynchronously first, spilling to a temporary file past 1 MB, so a slow
+upload occupies a thread only once it has fully arrived. Responses are
+sent back from the loop.
+
+The native routes skip the Flask middleware stack, which matters in two
+places. They never read the client address, so ProxyFix (applied to the
+bridged app when TRUSTED_PROXY_HOPS is set) has nothing to correct there;
+the per-IP crowd report limit lives on a bridged POST route. And instead of
+CompressionMiddleware they compress for themselves, sharing the app's
+CompressedBodyCache: the status body is encoded once per crowd version and
+compressed once per encoding, both on the thread pool, so neither JSON
+encoding nor compression of it runs on the event loop.
+
+State is still per process, as under gunicorn: each worker streams the
+reports it receives itself.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from werkzeug.http import parse_accept_header
+
+from broadcast import SSE_KEEPALIVE_SECONDS, format_sse
+from compression import (BROTLI_DYNAMIC_QUALITY, COMPRESS_MIN_SIZE, GZIP_DYNAMIC_LEVEL, SUPPORTED_ENCODINGS,
+                         CompressedBodyCache, compress, negotiate_encoding)
+from http_cache import CachedBody
+from metrics import RequestMetrics
+import server
+
+ASGI_THREADS = int(os.getenv("ASGI_THREADS", "32"))
+# Request bodies larger than this are spooled to disk while they arrive
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+Headers = List[Tuple[bytes, bytes]]
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _wait_for_disconnect(receive: Receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+class LoopWakeup:
+    """Wakes every stream on one event loop when the broadcaster publishes.
+
+    The broadcaster calls notify() from whichever thread published; that
+    schedules a single set() on the loop, whatever the number of streams.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._event = asyncio.Event()
+
+    def notify(self) -> None:
+        self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self) -> None:
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    def current(self) -> asyncio.Event:
+        """The event the next publish will set; take it before checking for messages."""
+        return self._event
+
+
+class WSGIBridge:
+    """Runs a WSGI app on a thread pool for an ASGI server."""
+
+    def __init__(self, wsgi_app: Callable, executor: ThreadPoolExecutor, max_body: Optional[int]):
+        self.wsgi_app = wsgi_app
+        self.executor = executor
+        self.max_body = max_body
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+        try:
+            size = 0
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                if self.max_body is not None and size > self.max_body:
+                    await _send_simple(send, 413, b'{"error": "Request body too large"}\n', "application/json")
+                    return
+                body.write(chunk)
+                more_body = message.get("more_body", False)
+            body.seek(0)
+            environ = self._environ(scope, body, size)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, self._run, environ, send, loop)
+        finally:
+            body.close()
+
+    @staticmethod
+    def _environ(scope: Scope, body, size: int) -> Dict[str, Any]:
+        root_path = scope.get("root_path", "")
+        path = scope["path"]
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        server_addr = scope.get("server") or ("localhost", 80)
+        client = scope.get("client")
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            # PEP 3333 strings are bytes decoded as latin-1
+            "SCRIPT_NAME": root_path.encode("utf-8").decode("latin-1"),
+            "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": str(server_addr[0]),
+            "SERVER_PORT": str(server_addr[1]) if server_addr[1] is not None else "80",
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0] if client else "",
+            "REMOTE_PORT": str(client[1]) if client else "",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope["headers"]:
+            key = name.decode("latin-1").upper().replace("-", "_")
+            if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                key = f"HTTP_{key}"
+            value = value.decode("latin-1")
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        if "CONTENT_LENGTH" not in environ and size:
+            environ["CONTENT_LENGTH"] = str(size)
+        return environ
+
+    def _run(self, environ: Dict[str, Any], send: Send, loop: asyncio.AbstractEventLoop) -> None:
+        """Call the app on a pool thread, handing each message to the loop to send."""
+        response_start: Dict[str, Any] = {}
+        started = False
+
+        def deliver(*messages: Dict[str, Any]) -> None:
+            nonlocal started
+            if not started:
+                messages = (response_start,) + messages
+                started = True
+
+            async def send_all():
+                for message in messages:
+                    await send(message)
+            asyncio.run_coroutine_threadsafe(send_all(), loop).result()
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            if exc_info and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            response_start.update({
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(n.lower().encode("latin-1"), v.encode("latin-1")) for n, v in headers],
+            })
+            return lambda data: deliver({"type": "http.response.body", "body": data, "more_body": True})
+
+        app_iter = self.wsgi_app(environ, start_response)
+        try:
+            # Hold each chunk back until the next arrives, so the usual
+            # one-chunk response goes out with its headers in a single hop
+            pending = None
+            for chunk in app_iter:
+                if not chunk:
+                    continue
+                if pending is not None:
+                    deliver({"type": "http.response.body", "body": pending, "more_body": True})
+                pending = chunk
+            deliver({"type": "http.response.body", "body": pending or b"", "more_body": False})
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+
+
+async def _send_simple(send: Send, status: int, body: bytes, content_type: str,
+                       headers: Optional[Headers] = None) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type.encode("latin-1")),
+                    (b"content-length", str(len(body)).encode("latin-1"))] + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class CampusASGI:
+    """Dispatches crowd streaming and polling natively and bridges the rest to Flask."""
+
+    def __init__(self, flask_app, threads: int = ASGI_THREADS):
+        self.flask_app = flask_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="asgi-wsgi")
+        self.bridge = WSGIBridge(flask_app, self.executor, flask_app.config.get("MAX_CONTENT_LENGTH"))
+        self.metrics: Optional[RequestMetrics] = flask_app.extensions.get("request_metrics")
+        self.compressed: CompressedBodyCache = flask_app.extensions.get("compressed_body_cache") \
+            or CompressedBodyCache()
+        # (crowd version, body) of the last /api/cafeteria/status encoded
+        self._status: Optional[Tuple[int, CachedBody]] = None
+        self._wakeups: Dict[asyncio.AbstractEventLoop, LoopWakeup] = {}
+        self.routes: Dict[Tuple[str, str], Tuple[str, Callable]] = {
+            ("GET", "/api/cafeteria/stream"): ("stream_cafeteria_crowd", self.stream_crowd),
+            ("GET", "/api/cafeteria/crowd"): ("get_cafeteria_crowd", self.poll_crowd),
+            ("GET", "/api/cafeteria/status"): ("get_cafeteria_status", self.cafeteria_status),
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 1000})
+            return
+        route = self.routes.get((scope["method"], scope["path"]))
+        if route is None:
+            await self.bridge(scope, receive, send)
+            return
+        endpoint, handler = route
+        if self.metrics is not None:
+            self.metrics.in_flight.inc((endpoint,))
+        start = time.perf_counter()
+        status, sent = 500, 0
+        try:
+            status, sent = await handler(scope, receive, send)
+        finally:
+            if self.metrics is not None:
+                self.metrics.in_flight.dec((endpoint,))
+                self.metrics.record(endpoint, "GET", str(status), time.perf_counter() - start, sent)
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for wakeup in self._wakeups.values():
+                    server.crowd_broadcaster.remove_listener(wakeup.notify)
+                self._wakeups.clear()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _wakeup(self) -> LoopWakeup:
+        loop = asyncio.get_running_loop()
+        wakeup = self._wakeups.get(loop)
+        if wakeup is None:
+            wakeup = self._wakeups[loop] = LoopWakeup(loop)
+            server.crowd_broadcaster.add_listener(wakeup.notify)
+        return wakeup
+
+    async def _send_json(self, scope: Scope, send: Send, status: int, payload: Any,
+                         headers: Optional[Headers] = None) -> int:
+        """Send payload as JSON like jsonify() would, compressed (on the pool) if worthwhile; returns bytes sent."""
+        body = f"{self.flask_app.json.dumps(payload)}\n".encode("utf-8")
+        headers = [(b"access-control-allow-origin", b"*")] + (headers or [])
+        if len(body) >= COMPRESS_MIN_SIZE:
+            headers.append((b"vary", b"Accept-Encoding"))
+            encoding = negotiate_encoding(parse_accept_header(_header(scope, b"accept-encoding")), SUPPORTED_ENCODINGS)
+            if encoding != "identity":
+                level = GZIP_DYNAMIC_LEVEL if encoding == "gzip" else BROTLI_DYNAMIC_QUALITY
+                body = await asyncio.get_running_loop().run_in_executor(self.executor, compress, body, encoding, level)
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+        await _send_simple(send, status, body, "application/json", headers)
+        return len(body)
+
+    async def poll_crowd(self, scope: Scope, receive: Receive, send: Send) -> Tuple[int, int]:
+        args = dict(urllib.parse.parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+        status, payload = server.crowd_poll(args.get("since"))
+        no_cache = [(b"cache-control", b"no-cache")]
+        if payload is None:
+            await send({"type": "http.response.start", "status": 304,
+                        "headers": [(b"access-control-allow-origin", b"*")] + no_cache})
+            await send({"type": "http.response.body", "body": b""})
+            return 304, 0
+        return status, await self._send_json(scope, send, status, payload, no_cache if status == 200 else None)
+
+    async def cafeteria_status(self, scope: Scope, receive: Receive, send: Send) -> Tuple[int, int]:
+        body = await self._status_body()
+        headers = [(b"access-control-allow-origin", b"*")]
+        data = body.body
+        if len(data) >= COMPRESS_MIN_SIZE:
+            headers.append((b"vary", b"Accept-Encoding"))
+            encoding = negotiate_encoding(parse_accept_header(_header(scope, b"accept-encoding")), SUPPORTED_ENCODINGS)
+            if encoding != "identity":
+                data = self.compressed.get((body.etag, encoding))
+                if data is None:
+                    data = await asyncio.get_running_loop().run_in_executor(
+                        self.executor, compress, body.body, encoding)
+                    self.compressed.put((body.etag, encoding), data)
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+        await _send_simple(send, 200, data, body.mimetype, headers)
+        return 200, len(data)
+
+    async def _status_body(self) -> CachedBody:
+        """The status payload for the current crowd version, encoded on the thread pool once per version.
+
+        Every report changes cafeteria_data before bumping the version, so a
+        body is never older than the version it is kept under.
+        """
+        version = server.crowd_versions.version
+        status = self._status
+        if status is None or status[0] != version:
+            body = await asyncio.get_running_loop().run_in_executor(self.executor, self._encode_status)
+            status = self._status = (version, body)
+        return status[1]
+
+    def _encode_status(self) -> CachedBody:
+        return CachedBody.from_json(self.flask_app.json.dumps({"success": True, "data": server.cafeteria_data}))
+
+    async def stream_crowd(self, scope: Scope, receive: Receive, send: Send) -> Tuple[int, int]:
+        broadcaster = server.crowd_broadcaster
+        wakeup = self._wakeup()
+        # Subscribe before taking the snapshot so no report falls in between
+        last = broadcaster.last_id
+        await send({"type": "http.response.start", "status": 200, "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+            (b"access-control-allow-origin", b"*"),
+        ]})
+        sent = 0
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+        try:
+            chunk = "".join(server.crowd_stream_preamble()).encode("utf-8")
+            while not disconnected.done():
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                sent += len(chunk)
+                event = wakeup.current()
+                messages = broadcaster.since(last)
+                if messages:
+                    chunk = "".join(format_sse(*message) for message in messages).encode("utf-8")
+                    last = messages[-1][0]
+                    continue
+                woken = asyncio.ensure_future(event.wait())
+                await asyncio.wait({woken, disconnected}, timeout=SSE_KEEPALIVE_SECONDS,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                woken.cancel()
+                messages = broadcaster.since(last)
+                if messages:
+                    chunk = "".join(format_sse(*message) for message in messages).encode("utf-8")
+                    last = messages[-1][0]
+                else:
+                    chunk = b": keepalive\n\n"
+        finally:
+            disconnected.cancel()
+        return 200, sent
+
+
+# Open streams cost no thread here, so pages may hold them
+server.CROWD_STREAMING = True
+application = CampusASGI(server.app)
@@ -0,0 +1,229 @@
+"""How many live crowd streams each server setup can hold, and whether it still answers.
+
+Run from the repository root:
+
+    python benchmarks/bench_connections.py [--servers gunicorn-sync,gunicorn-gthread,asgi]
+        [--connections 2000] [--workers 1] [--threads 8] [--json results.json]
+
+For each setup a server is started on a scratch database and then:
+
+1. --connections clients open /api/cafeteria/stream, as idle cafeteria tabs
+   do, in batches of --batch. A stream counts as held once its first event
+   arrives within --timeout seconds.
+2. With those streams open, --probes requests for /api/cafeteria/crowd
+   check whether ordinary requests still get answered, and how fast.
+3. One crowd report is posted, and the time until each held stream
+   receives it is measured.
+
+"gunicorn-sync" and "gunicorn-gthread" serve server:app as the WSGI
+deployment does; "asgi" serves asgi:application under uvicorn. Every
+setup gets the same --workers. With more than one worker a report only
+reaches the streams on the worker that took it.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from bench_endpoints import ROOT, free_port, percentiles, wait_until_up
+
+STREAM_REQUEST = (b"GET /api/cafeteria/stream HTTP/1.1\r\nHost: localhost\r\n"
+                  b"Accept: text/event-stream\r\n\r\n")
+
+
+def server_command(name: str, port: int, args) -> List[str]:
+    if name == "asgi":
+        return [sys.executable, "-m", "uvicorn", "asgi:application", "--app-dir", ROOT,
+                "--host", "127.0.0.1", "--port", str(port), "--workers", str(args.workers),
+                "--log-level", "warning", "--backlog", "4096"]
+    worker_class = name.split("-", 1)[1]
+    # gunicorn quietly turns sync into gthread when given --threads
+    threads = ["--threads", str(args.threads)] if worker_class == "gthread" else []
+    return [sys.executable, "-m", "gunicorn", "--pythonpath", ROOT, "-b", f"127.0.0.1:{port}",
+            "-w", str(args.workers), "-k", worker_class, *threads,
+            "--backlog", "4096", "--log-level", "warning", "server:app"]
+
+
+async def http_request(port: int, method: str, path: str, body: bytes = b"",
+                       content_type: str = "application/json") -> int:
+    """One request on a fresh connection; returns the status code."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        head = (f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+                f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n").encode("latin-1")
+        writer.write(head + body)
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+class Stream:
+    """One open /api/cafeteria/stream connection, read in the background."""
+
+    def __init__(self):
+        self.first_event: Optional[float] = None
+        self.broadcast_at: Optional[float] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.task: Optional[asyncio.Task] = None
+        self._held = asyncio.Event()
+
+    async def open(self, port: int, timeout: float) -> bool:
+        self.task = asyncio.ensure_future(self._run(port))
+        try:
+            await asyncio.wait_for(self._held.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def _run(self, port: int) -> None:
+        start = time.perf_counter()
+        try:
+            reader, self.writer = await asyncio.open_connection("127.0.0.1", port)
+            self.writer.write(STREAM_REQUEST)
+            await self.writer.drain()
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    return
+                now = time.perf_counter()
+                if self.first_event is None and b"event:" in chunk:
+                    self.first_event = now - start
+                    self._held.set()
+                # Published messages carry an id; the opening snapshot does not
+                if self.broadcast_at is None and b"\nid: " in b"\n" + chunk:
+                    self.broadcast_at = now
+        except (OSError, asyncio.IncompleteReadError):
+            return
+
+    def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def measure(port: int, args) -> Dict[str, Any]:
+    streams: List[Stream] = []
+    held: List[Stream] = []
+    ramp_start = time.perf_counter()
+    for offset in range(0, args.connections, args.batch):
+        batch = [Stream() for _ in range(min(args.batch, args.connections - offset))]
+        streams.extend(batch)
+        results = await asyncio.gather(*(s.open(port, args.timeout) for s in batch))
+        held.extend(s for s, ok in zip(batch, results) if ok)
+        if not any(results):
+            # The server has stopped taking streams; more batches only add timeouts
+            break
+    ramp_seconds = time.perf_counter() - ramp_start
+
+    probe_times: List[float] = []
+    probe_failures = 0
+    for _ in range(args.probes):
+        start = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(http_request(port, "GET", "/api/cafeteria/crowd"), args.timeout)
+            if status == 200:
+                probe_times.append(time.perf_counter() - start)
+            else:
+                probe_failures += 1
+        except (asyncio.TimeoutError, OSError):
+            probe_failures += 1
+
+    fanout: List[float] = []
+    report_status = None
+    if held:
+        report = json.dumps({"cafeteria_id": "main_cafeteria", "rush_time": 17, "user_id": "bench-connections"})
+        posted_at = time.perf_counter()
+        try:
+            report_status = await asyncio.wait_for(
+                http_request(port, "POST", "/api/cafeteria/report-crowd", report.encode()), args.timeout)
+        except (asyncio.TimeoutError, OSError):
+            report_status = None
+        deadline = time.perf_counter() + args.timeout
+        while time.perf_counter() < deadline and any(s.broadcast_at is None for s in held):
+            await asyncio.sleep(0.05)
+        fanout = [s.broadcast_at - posted_at for s in held if s.broadcast_at is not None]
+
+    for stream in streams:
+        stream.close()
+    await asyncio.sleep(0.1)
+
+    first_events = [s.first_event for s in held]
+    return {
+        "attempted": len(streams),
+        "held": len(held),
+        "ramp_seconds": round(ramp_seconds, 2),
+        "first_event": percentiles(first_events),
+        "probes": {"ok": len(probe_times), "failed": probe_failures, **percentiles(probe_times)},
+        "report_status": report_status,
+        "broadcast": {"received": len(fanout), **percentiles(fanout)},
+    }
+
+
+def run_server(name: str, args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="bench-connections-")
+    port = free_port()
+    env = dict(os.environ, DATABASE_PATH=os.path.join(workdir, "bench.db"),
+               DATA_DIR=os.environ.get("DATA_DIR", os.path.join(ROOT, "data")),
+               CROWD_REPORT_IP_BURST="1000000", LOG_LEVEL="WARNING")
+    process = subprocess.Popen(server_command(name, port, args), cwd=workdir, env=env)
+    try:
+        wait_until_up(f"http://127.0.0.1:{port}", process)
+        result = asyncio.run(measure(port, args))
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    result["server"] = name
+    print(f"{name:<18} held {result['held']:>5}/{result['attempted']:<5} "
+          f"probes ok {result['probes']['ok']:>3}/{args.probes:<3} "
+          f"probe p50 {result['probes'].get('p50_ms', float('nan')):>8.2f} ms  "
+          f"broadcast to {result['broadcast']['received']:>5} streams, "
+          f"p99 {result['broadcast'].get('p99_ms', float('nan')):.1f} ms")
+    return result
+
+
+def raise_file_limit(wanted: int) -> None:
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = hard if hard != resource.RLIM_INFINITY else max(soft, wanted)
+    if soft < target:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    if target < wanted:
+        print(f"Open file limit is {target}; --connections {wanted // 2} may hit it", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servers", default="gunicorn-sync,gunicorn-gthread,asgi")
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=5.0, help="seconds to wait for a first event or a probe")
+    parser.add_argument("--probes", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8, help="threads per gunicorn-gthread worker")
+    parser.add_argument("--json", metavar="PATH", help="also write results to PATH")
+    args = parser.parse_args()
+
+    # Client and server sockets both count against the limit on one machine
+    raise_file_limit(2 * args.connections + 256)
+    results = [run_server(name.strip(), args) for name in args.servers.split(",") if name.strip()]
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "connection_capacity", "config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,579 @@
+"""Per-route request cost and load-test throughput for every route in create_app.
+
+Run from the repository root:
+
+    # CPU cost of each route through the Flask test client, in-process
+    python benchmarks/bench_endpoints.py client [--requests 200] [--json results.json]
+
+    # Throughput and latency percentiles against a local gunicorn
+    python benchmarks/bench_endpoints.py load [--mix lunch_rush] [--clients 32] [--duration 20]
+        [--workers 2] [--threads 4] [--worker-class gthread] [--url http://host:port] [--json results.json]
+
+Both modes run against a throwaway database and upload folder, so the
+working tree is left alone. "load" starts gunicorn itself unless --url names
+a server that is already running. The "lunch_rush" mix models the midday
+peak: most clients poll the cafeteria crowd numbers, some post crowd reports
+and the rest load the map. "all_routes" spreads requests evenly over every
+route that is safe to repeat.
+
+The SSE stream is only timed in "client" mode (time to the first event);
+under load each open stream would pin a sync worker thread for good.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A 1x1 transparent PNG for the upload routes
+TINY_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+MULTIPART_BOUNDARY = "bench-endpoints-boundary"
+
+# (method, path, body, headers) for one request
+Request = Tuple[str, str, Optional[bytes], Dict[str, str]]
+
+
+# -----------------------------
+# Transports
+# -----------------------------
+
+class ClientTransport:
+    """Requests through a Flask test client, in this process."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def send(self, method: str, path: str, body: Optional[bytes] = None,
+             headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        response = self.client.open(path, method=method, data=body, headers=headers or {})
+        return response.status_code, response.get_data()
+
+    def first_event(self, path: str) -> int:
+        """Open an event stream, read up to its first event and hang up."""
+        response = self.client.get(path, buffered=False)
+        try:
+            for chunk in response.response:
+                if b"event:" in (chunk if isinstance(chunk, bytes) else chunk.encode()):
+                    break
+        finally:
+            response.close()
+        return response.status_code
+
+
+class HTTPTransport:
+    """Requests over one keep-alive HTTP/1.1 connection."""
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def send(self, method: str, path: str, body: Optional[bytes] = None,
+             headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers=headers or {})
+                response = self.conn.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self.close()
+                return response.status, data
+            except (ConnectionError, http.client.HTTPException):
+                # The server closed an idle keep-alive connection; retry once on a fresh one
+                self.close()
+                if attempt:
+                    raise
+        raise AssertionError("unreachable")
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+# -----------------------------
+# Scenarios
+# -----------------------------
+
+def json_body(payload: Any) -> Tuple[bytes, Dict[str, str]]:
+    return json.dumps(payload).encode(), {"Content-Type": "application/json"}
+
+
+def multipart_body(fields: Dict[str, str], image: Optional[bytes] = None) -> Tuple[bytes, Dict[str, str]]:
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{MULTIPART_BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    if image is not None:
+        parts.append(f'--{MULTIPART_BOUNDARY}\r\nContent-Disposition: form-data; name="image"; filename="item.png"\r\n'
+                     "Content-Type: image/png\r\n\r\n".encode() + image + b"\r\n")
+    parts.append(f"--{MULTIPART_BOUNDARY}--\r\n".encode())
+    return b"".join(parts), {"Content-Type": f"multipart/form-data; boundary={MULTIPART_BOUNDARY}"}
+
+
+def lost_found_fields(item_type: str) -> Dict[str, str]:
+    return {
+        "title": "Blue water bottle", "description": "Steel bottle with a dented lid and stickers",
+        "category": "personal", "item_type": item_type, "location": "Library reading room",
+        "contact_method": "phone", "contact_info": "9999999999", "user_id": "bench",
+    }
+
+
+class Fixtures:
+    """Ids and names the scenarios need, discovered from the running app."""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.counter = 0
+        self._lock = threading.Lock()
+
+        status, body = transport.send("GET", "/api/locations")
+        locations = json.loads(body) if status == 200 else []
+        self.location_ids = [loc["id"] for loc in locations] or ["BLDG-01"]
+        # A point inside the first building, for /api/locations/at and nearest
+        ring = locations[0]["coordinates"] if locations else [[16.8285, 81.5255]]
+        self.lat = sum(p[0] for p in ring) / len(ring)
+        self.lng = sum(p[1] for p in ring) / len(ring)
+
+        _, body = transport.send("GET", "/api/cafeteria/status")
+        self.cafeteria_ids = list(json.loads(body)["data"])
+
+        _, body = transport.send("GET", "/api/events?limit=1")
+        self.event_id = json.loads(body)[0]["id"]
+
+        self.register_number = "BENCH-USER"
+        transport.send("POST", "/api/auth/register", *json_body({
+            "register_number": self.register_number, "password": "bench", "year": "2", "branch": "CSE"}))
+        self.session_id = self.new_session()
+
+        body, headers = multipart_body(lost_found_fields("found"), TINY_PNG)
+        _, body = transport.send("POST", "/api/lost-found/report", body, headers)
+        item = json.loads(body)["item"]
+        self.item_id = item["id"]
+        self.upload_path = item["image_url"]
+
+    def unique(self) -> int:
+        with self._lock:
+            self.counter += 1
+            return self.counter
+
+    def new_session(self) -> str:
+        _, body = self.transport.send("POST", "/api/auth/login", *json_body({
+            "register_number": self.register_number, "password": "bench"}))
+        return json.loads(body)["session_id"]
+
+    def new_event(self) -> int:
+        _, body = self.transport.send("POST", "/api/events", *json_body({
+            "name": "Bench event", "date": "2099-01-01", "location": "Auditorium"}))
+        return json.loads(body)["id"]
+
+    def new_item(self) -> int:
+        body, headers = multipart_body(lost_found_fields("lost"))
+        _, body = self.transport.send("POST", "/api/lost-found/report", body, headers)
+        return json.loads(body)["item"]["id"]
+
+
+class Scenario:
+    """One kind of request: build() makes it, prepare() does untimed setup first.
+
+    state is per simulated client, so a scenario can carry values between its
+    own requests (a poller remembers the last crowd version it saw).
+    """
+
+    def __init__(self, name: str, endpoint: str, build: Callable[[Fixtures, Dict, random.Random, Any], Request],
+                 prepare: Optional[Callable[[Fixtures], Any]] = None,
+                 observe: Optional[Callable[[Dict, int, bytes], None]] = None,
+                 repeatable: bool = True, stream: bool = False):
+        self.name = name
+        self.endpoint = endpoint
+        self.build = build
+        self.prepare = prepare
+        self.observe = observe
+        # False for scenarios that need prepare(), which is too costly to run under load
+        self.repeatable = repeatable and prepare is None
+        self.stream = stream
+
+
+def _get(path: str, headers: Optional[Dict[str, str]] = None):
+    return lambda fx, state, rng, prepared: ("GET", path, None, headers or {})
+
+
+def _crowd_poll(fx, state, rng, prepared):
+    version = state.get("crowd_version")
+    path = "/api/cafeteria/crowd" if version is None else f"/api/cafeteria/crowd?since={version}"
+    return "GET", path, None, {}
+
+
+def _observe_crowd(state, status, body):
+    if status == 200:
+        state["crowd_version"] = json.loads(body)["version"]
+
+
+def _crowd_report(fx, state, rng, prepared):
+    body, headers = json_body({"cafeteria_id": rng.choice(fx.cafeteria_ids),
+                               "rush_time": rng.randint(0, 40), "user_id": f"student-{rng.randint(1, 500)}"})
+    return "POST", "/api/cafeteria/report-crowd", body, headers
+
+
+def _nearest(fx, state, rng, prepared):
+    return "GET", f"/api/locations/nearest?lat={fx.lat + rng.uniform(-0.001, 0.001):.6f}&lng={fx.lng:.6f}&k=5", None, {}
+
+
+def _register(fx, state, rng, prepared):
+    body, headers = json_body({"register_number": f"BENCH-{os.getpid()}-{fx.unique()}-{rng.random()}",
+                               "password": "bench", "year": "2", "branch": "CSE"})
+    return "POST", "/api/auth/register", body, headers
+
+
+def _login(fx, state, rng, prepared):
+    return ("POST", "/api/auth/login",
+            *json_body({"register_number": fx.register_number, "password": "bench"}))
+
+
+def _create_event(fx, state, rng, prepared):
+    return ("POST", "/api/events",
+            *json_body({"name": "Bench event", "date": "2099-01-01", "location": "Auditorium"}))
+
+
+def _update_event(fx, state, rng, prepared):
+    return ("PUT", f"/api/events/{fx.event_id}", *json_body({"description": f"Updated {rng.random()}"}))
+
+
+def _report_item(fx, state, rng, prepared):
+    body, headers = multipart_body(lost_found_fields(rng.choice(("lost", "found"))), TINY_PNG)
+    return "POST", "/api/lost-found/report", body, headers
+
+
+SCENARIOS = [
+    Scenario("health", "health", _get("/health")),
+    Scenario("metrics", "metrics", _get("/metrics")),
+    Scenario("page_home", "home_page", _get("/")),
+    Scenario("page_map", "map_page", _get("/map")),
+    Scenario("page_events", "events_page", _get("/events")),
+    Scenario("page_cafeteria", "cafeteria_page", _get("/cafeteria")),
+    Scenario("page_lost_found", "lost_found_page", _get("/lost-found")),
+    Scenario("stylesheet", "stylesheet", _get("/static/style.css")),
+    Scenario("upload_image", "uploaded_file", lambda fx, s, r, p: ("GET", fx.upload_path, None, {})),
+    Scenario("register", "register_user", _register),
+    Scenario("login", "login_user", _login),
+    Scenario("current_user", "current_user",
+             lambda fx, s, r, p: ("GET", "/api/auth/me", None, {"Authorization": f"Bearer {fx.session_id}"})),
+    Scenario("logout", "logout_user",
+             lambda fx, s, r, p: ("POST", "/api/auth/logout", None, {"Authorization": f"Bearer {p}"}),
+             prepare=Fixtures.new_session),
+    Scenario("campus_boundary", "get_campus_boundary", _get("/api/campus/boundary")),
+    Scenario("locations", "get_locations", _get("/api/locations")),
+    Scenario("locations_zoom_bbox", "get_locations",
+             lambda fx, s, r, p: ("GET", f"/api/locations?zoom=16&bbox={fx.lng - 0.005},{fx.lat - 0.005},"
+                                         f"{fx.lng + 0.005},{fx.lat + 0.005}", None, {})),
+    Scenario("location_at", "get_location_at",
+             lambda fx, s, r, p: ("GET", f"/api/locations/at?lat={fx.lat:.6f}&lng={fx.lng:.6f}", None, {})),
+    Scenario("locations_nearest", "get_nearest_locations", _nearest),
+    Scenario("location_by_id", "get_location_by_id",
+             lambda fx, s, r, p: ("GET", f"/api/locations/{r.choice(fx.location_ids)}", None, {})),
+    Scenario("roads", "get_roads", _get("/api/roads")),
+    Scenario("roads_polyline", "get_roads", _get("/api/roads?format=polyline")),
+    Scenario("navigation_config", "get_navigation_config", _get("/api/navigation/config")),
+    Scenario("navigation_all", "get_navigation_all", _get("/api/navigation/all")),
+    Scenario("navigation_route", "get_navigation_route",
+             lambda fx, s, r, p: ("GET", "/api/navigation/route?from={}&to={}".format(
+                 *r.sample(fx.location_ids, 2) if len(fx.location_ids) > 1 else fx.location_ids * 2), None, {})),
+    Scenario("events_list", "handle_events", _get("/api/events")),
+    Scenario("event_create", "handle_events", _create_event),
+    Scenario("event_get", "handle_event_by_id", lambda fx, s, r, p: ("GET", f"/api/events/{fx.event_id}", None, {})),
+    Scenario("event_update", "handle_event_by_id", _update_event),
+    Scenario("event_delete", "handle_event_by_id", lambda fx, s, r, p: ("DELETE", f"/api/events/{p}", None, {}),
+             prepare=Fixtures.new_event),
+    Scenario("events_search", "search_events", _get("/api/events/search?query=tech")),
+    Scenario("events_filter", "filter_events", _get("/api/events/filter?date=2025&location=hall")),
+    Scenario("events_upcoming", "get_upcoming_events", _get("/api/events/upcoming")),
+    Scenario("crowd_report", "report_crowd", _crowd_report),
+    Scenario("user_stats", "get_user_stats",
+             lambda fx, s, r, p: ("GET", f"/api/user/stats/student-{r.randint(1, 500)}", None, {})),
+    Scenario("crowd_stream", "stream_cafeteria_crowd", _get("/api/cafeteria/stream"), stream=True),
+    Scenario("crowd_poll", "get_cafeteria_crowd", _crowd_poll, observe=_observe_crowd),
+    Scenario("cafeteria_menu", "get_cafeteria_menu", _get("/api/cafeteria/menu")),
+    Scenario("cafeteria_status", "get_cafeteria_status", _get("/api/cafeteria/status")),
+    Scenario("lost_found_list", "get_lost_found_items", _get("/api/lost-found/items")),
+    Scenario("lost_found_report", "report_lost_found_item", _report_item),
+    Scenario("lost_found_get", "get_lost_found_item",
+             lambda fx, s, r, p: ("GET", f"/api/lost-found/items/{fx.item_id}", None, {})),
+    Scenario("lost_found_matches", "get_lost_found_matches",
+             lambda fx, s, r, p: ("GET", f"/api/lost-found/items/{fx.item_id}/matches", None, {})),
+    Scenario("lost_found_resolve", "resolve_lost_found_item",
+             lambda fx, s, r, p: ("POST", f"/api/lost-found/items/{p}/resolve", None, {}), prepare=Fixtures.new_item),
+    Scenario("lost_found_delete", "delete_lost_found_item",
+             lambda fx, s, r, p: ("DELETE", f"/api/lost-found/items/{p}", None, {}), prepare=Fixtures.new_item),
+]
+SCENARIOS_BY_NAME = {scenario.name: scenario for scenario in SCENARIOS}
+
+# Relative weights of each scenario in a traffic mix
+MIXES = {
+    # Midday peak: everyone watching the queue, a few reporting it, the rest finding their way
+    "lunch_rush": {
+        "crowd_poll": 40, "cafeteria_status": 6, "cafeteria_menu": 4, "page_cafeteria": 3,
+        "crowd_report": 12, "user_stats": 3,
+        "navigation_all": 8, "page_map": 4, "stylesheet": 3, "roads": 4, "locations_nearest": 4,
+        "location_at": 2, "navigation_route": 4, "events_upcoming": 2, "lost_found_list": 1,
+    },
+    "all_routes": {scenario.name: 1 for scenario in SCENARIOS
+                   if scenario.repeatable and not scenario.stream and scenario.name not in ("register", "event_create")},
+}
+
+
+def percentiles(samples: List[float], points=(50, 90, 95, 99)) -> Dict[str, float]:
+    """Nearest-rank percentiles of samples (seconds), in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    out = {f"p{p}_ms": round(ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))] * 1e3, 3)
+           for p in points}
+    out["max_ms"] = round(ordered[-1] * 1e3, 3)
+    return out
+
+
+# -----------------------------
+# client: per-request cost in-process
+# -----------------------------
+
+def import_app(workdir: str):
+    """Import server with its database, uploads and cwd under workdir."""
+    os.environ["DATABASE_PATH"] = os.path.join(workdir, "bench.db")
+    os.environ.setdefault("DATA_DIR", os.path.join(ROOT, "data"))
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    import server
+    return server.app
+
+
+def run_client(args) -> Dict[str, Any]:
+    app = import_app(tempfile.mkdtemp(prefix="bench-endpoints-"))
+    transport = ClientTransport(app)
+    fx = Fixtures(transport)
+    rng = random.Random(args.seed)
+
+    covered = {scenario.endpoint for scenario in SCENARIOS}
+    missing = sorted({rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint != "static"} - covered)
+    if missing:
+        print(f"No scenario for: {', '.join(missing)}", file=sys.stderr)
+
+    results = []
+    print(f"{'scenario':<22} {'status':>8} {'mean_us':>10} {'p50_us':>10} {'p95_us':>10}")
+    for scenario in SCENARIOS:
+        requests = max(1, args.requests // 10) if scenario.stream or scenario.prepare else args.requests
+        state: Dict[str, Any] = {}
+        timings = []
+        statuses: Counter = Counter()
+        for _ in range(requests):
+            prepared = scenario.prepare(fx) if scenario.prepare else None
+            method, path, body, headers = scenario.build(fx, state, rng, prepared)
+            start = time.perf_counter()
+            if scenario.stream:
+                status, data = transport.first_event(path), b""
+            else:
+                status, data = transport.send(method, path, body, headers)
+            timings.append(time.perf_counter() - start)
+            statuses[status] += 1
+            if scenario.observe:
+                scenario.observe(state, status, data)
+        row = {
+            "scenario": scenario.name, "endpoint": scenario.endpoint, "requests": requests,
+            "statuses": {str(code): n for code, n in sorted(statuses.items())},
+            "mean_us": round(statistics.fmean(timings) * 1e6, 1),
+            "p50_us": round(statistics.median(timings) * 1e6, 1),
+            "p95_us": round(sorted(timings)[int(0.95 * (len(timings) - 1))] * 1e6, 1),
+        }
+        results.append(row)
+        status_text = "/".join(row["statuses"])
+        print(f"{scenario.name:<22} {status_text:>8} {row['mean_us']:>10.1f} {row['p50_us']:>10.1f} {row['p95_us']:>10.1f}")
+    return {"benchmark": "endpoints_client", "requests_per_scenario": args.requests,
+            "uncovered_endpoints": missing, "results": results}
+
+
+# -----------------------------
+# load: throughput against gunicorn
+# -----------------------------
+
+def free_port() -> int:
+    import socket
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(base_url: str, process: Optional[subprocess.Popen], timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            if HTTPTransport(base_url, timeout=2).send("GET", "/health")[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not come up within {timeout:.0f}s")
+
+
+def start_gunicorn(args, workdir: str) -> Tuple[subprocess.Popen, str]:
+    """gunicorn serving server:app from a scratch cwd and database."""
+    port = free_port()
+    env = dict(os.environ, DATABASE_PATH=os.path.join(workdir, "bench.db"),
+               DATA_DIR=os.environ.get("DATA_DIR", os.path.join(ROOT, "data")))
+    # Every simulated client connects from 127.0.0.1; without this the per-IP
+    # crowd report limit would turn most reports into 429s
+    env.setdefault("CROWD_REPORT_IP_BURST", "1000000")
+    cmd = [sys.executable, "-m", "gunicorn", "--pythonpath", ROOT, "-b", f"127.0.0.1:{port}",
+           "-w", str(args.workers), "-k", args.worker_class, "--threads", str(args.threads),
+           "--log-level", "warning", "server:app"]
+    process = subprocess.Popen(cmd, cwd=workdir, env=env)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def run_load(args) -> Dict[str, Any]:
+    mix = MIXES[args.mix]
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    process = None
+    base_url = args.url
+    if base_url is None:
+        process, base_url = start_gunicorn(args, tempfile.mkdtemp(prefix="bench-endpoints-"))
+    try:
+        wait_until_up(base_url, process)
+        fx = Fixtures(HTTPTransport(base_url))
+
+        lock = threading.Lock()
+        timings: Dict[str, List[float]] = {name: [] for name in names}
+        statuses: Dict[str, Counter] = {name: Counter() for name in names}
+        errors: Counter = Counter()
+        measure_from = time.monotonic() + args.warmup
+        stop_at = measure_from + args.duration
+
+        def client(index: int) -> None:
+            rng = random.Random(args.seed + index)
+            transport = HTTPTransport(base_url)
+            state: Dict[str, Any] = {}
+            local_timings: Dict[str, List[float]] = {name: [] for name in names}
+            local_statuses: Dict[str, Counter] = {name: Counter() for name in names}
+            local_errors: Counter = Counter()
+            while True:
+                now = time.monotonic()
+                if now >= stop_at:
+                    break
+                scenario = SCENARIOS_BY_NAME[rng.choices(names, weights)[0]]
+                method, path, body, headers = scenario.build(fx, state, rng, None)
+                start = time.perf_counter()
+                try:
+                    status, data = transport.send(method, path, body, headers)
+                except OSError as e:
+                    transport.close()
+                    local_errors[type(e).__name__] += 1
+                    continue
+                elapsed = time.perf_counter() - start
+                if scenario.observe:
+                    scenario.observe(state, status, data)
+                if now >= measure_from:
+                    local_timings[scenario.name].append(elapsed)
+                    local_statuses[scenario.name][status] += 1
+                if args.think:
+                    time.sleep(rng.expovariate(1 / args.think))
+            transport.close()
+            with lock:
+                for name in names:
+                    timings[name].extend(local_timings[name])
+                    statuses[name].update(local_statuses[name])
+                errors.update(local_errors)
+
+        threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    all_timings = [t for name in names for t in timings[name]]
+    total = len(all_timings)
+    non_2xx = sum(n for name in names for code, n in statuses[name].items() if not 200 <= code < 400)
+    summary = {
+        "requests": total,
+        "throughput_rps": round(total / args.duration, 1),
+        "non_2xx_3xx": non_2xx,
+        "connection_errors": dict(errors),
+        **percentiles(all_timings),
+    }
+    print(f"{args.mix}: {total} requests in {args.duration:.0f}s = {summary['throughput_rps']} req/s, "
+          f"p50 {summary.get('p50_ms')} ms, p99 {summary.get('p99_ms')} ms, "
+          f"{non_2xx} error responses, {sum(errors.values())} connection errors")
+    per_scenario = []
+    print(f"{'scenario':<22} {'requests':>9} {'p50_ms':>9} {'p90_ms':>9} {'p99_ms':>9}")
+    for name in sorted(names, key=lambda n: -len(timings[n])):
+        row = {"scenario": name, "requests": len(timings[name]),
+               "statuses": {str(code): n for code, n in sorted(statuses[name].items())}, **percentiles(timings[name])}
+        per_scenario.append(row)
+        if timings[name]:
+            print(f"{name:<22} {row['requests']:>9} {row['p50_ms']:>9.2f} {row['p90_ms']:>9.2f} {row['p99_ms']:>9.2f}")
+    return {
+        "benchmark": "endpoints_load",
+        "mix": args.mix,
+        "weights": mix,
+        "config": {"clients": args.clients, "duration_s": args.duration, "warmup_s": args.warmup,
+                   "think_s": args.think, "url": args.url, "workers": args.workers, "threads": args.threads,
+                   "worker_class": args.worker_class},
+        "summary": summary,
+        "results": per_scenario,
+    }
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--seed", type=int, default=1)
+    common.add_argument("--json", metavar="PATH", help="also write results to PATH")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    modes = parser.add_subparsers(dest="mode", required=True)
+
+    client = modes.add_parser("client", parents=[common], help="per-request cost through the Flask test client")
+    client.add_argument("--requests", type=int, default=200, help="timed requests per scenario")
+
+    load = modes.add_parser("load", parents=[common], help="throughput and latency percentiles against gunicorn")
+    load.add_argument("--mix", choices=sorted(MIXES), default="lunch_rush")
+    load.add_argument("--clients", type=int, default=32, help="concurrent keep-alive connections")
+    load.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    load.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before that")
+    load.add_argument("--think", type=float, default=0.0, help="mean pause between a client's requests, seconds")
+    load.add_argument("--url", help="load an already running server instead of starting gunicorn")
+    load.add_argument("--workers", type=int, default=2)
+    load.add_argument("--threads", type=int, default=4)
+    load.add_argument("--worker-class", default="gthread")
+
+    args = parser.parse_args()
+    # "client" changes directory before importing the app
+    output = os.path.abspath(args.json) if args.json else None
+    results = run_client(args) if args.mode == "client" else run_load(args)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
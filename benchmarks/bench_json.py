@@ -0,0 +1,105 @@
+"""Compare the stdlib and orjson JSON providers on the app's real payloads.
+
+Run from the repository root:
+
+    python benchmarks/bench_json.py [--repeat 7] [--json results.json]
+
+Payloads come from data/ (via GeoStore) and the in-module cafeteria and
+event data; the event list is repeated to archive size.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Importing server builds an app; keep its database out of the working tree
+os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-json-"), "bench.db"))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import server  # noqa: E402
+from json_provider import OrjsonProvider, orjson  # noqa: E402
+
+ARCHIVE_EVENTS = 5000
+
+
+def payloads():
+    snap = server.geo_store.snapshot()
+    seed = server.SEED_EVENTS
+    events = [dict(seed[i % len(seed)], id=i + 1) for i in range(ARCHIVE_EVENTS)]
+    return {
+        "navigation_all": {"config": snap.nav_config, "boundary": snap.boundary or server.PLACEHOLDER_BOUNDARY,
+                           "locations": snap.locations},
+        "roads": snap.roads,
+        "cafeteria_status": {"success": True, "data": server.cafeteria_data},
+        "cafeteria_menu": {"success": True, "data": {cid: {"name": c["name"], "menu": c["menu"]}
+                                                     for cid, c in server.cafeteria_data.items()}},
+        "events_%d" % ARCHIVE_EVENTS: events,
+    }
+
+
+def time_call(fn, arg, repeat):
+    """Median seconds per call over repeat rounds, each sized to run about 0.2 s."""
+    fn(arg)
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(arg)
+        elapsed = time.perf_counter() - start
+        if elapsed >= 0.2:
+            break
+        number *= 2
+    rounds = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(arg)
+        rounds.append((time.perf_counter() - start) / number)
+    return statistics.median(rounds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--json", metavar="PATH", help="also write results to PATH")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {"json": DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers["orjson"] = OrjsonProvider(app)
+    else:
+        print("orjson is not installed; timing the stdlib provider only", file=sys.stderr)
+
+    results = []
+    print(f"{'payload':<20} {'bytes':>9} " + " ".join(f"{name + ' dumps':>13} {name + ' loads':>13}" for name in providers))
+    for name, payload in payloads().items():
+        text = providers["json"].dumps(payload)
+        row = {"payload": name, "bytes": len(text.encode("utf-8"))}
+        cells = []
+        for provider_name, provider in providers.items():
+            dumps_s = time_call(provider.dumps, payload, args.repeat)
+            loads_s = time_call(provider.loads, text, args.repeat)
+            row[f"{provider_name}_dumps_us"] = round(dumps_s * 1e6, 1)
+            row[f"{provider_name}_loads_us"] = round(loads_s * 1e6, 1)
+            cells.append(f"{dumps_s * 1e6:>11.1f}us {loads_s * 1e6:>11.1f}us")
+        if "orjson" in providers:
+            row["dumps_speedup"] = round(row["json_dumps_us"] / row["orjson_dumps_us"], 2)
+        results.append(row)
+        print(f"{name:<20} {row['bytes']:>9} " + " ".join(cells))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "json_provider", "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
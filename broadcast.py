@@ -0,0 +1,98 @@
+"""In-process fan-out of server-sent events to every connected client."""
+
+import json
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Iterator, List, Optional, Tuple
+
+# Messages kept for streams that fall behind. Reconnecting clients are not
+# resumed from Last-Event-ID: ids are per process, and the crowd stream
+# starts every connection with the current state instead.
+BROADCAST_BACKLOG = 64
+# Comment lines sent on idle streams so proxies don't time the connection out
+SSE_KEEPALIVE_SECONDS = 15.0
+# Reconnect delay suggested to EventSource clients
+SSE_RETRY_MS = 5000
+
+Message = Tuple[int, str, str]
+
+
+def format_sse(message_id: Optional[int], event: str, data: str) -> str:
+    lines = [f"id: {message_id}"] if message_id is not None else []
+    lines.append(f"event: {event}")
+    lines.extend(f"data: {line}" for line in data.splitlines() or [""])
+    return "\n".join(lines) + "\n\n"
+
+
+class Broadcaster:
+    """A numbered message log that any number of streams wait on.
+
+    publish() appends once and wakes every waiting stream, so its cost does
+    not grow with the number of clients and there is no per-client queue to
+    fill up. A stream that falls more than BROADCAST_BACKLOG messages behind
+    skips ahead to what is still held; for state updates the latest message
+    is the one that matters.
+
+    The log lives in this process. Under several workers, each one fans out
+    the reports it receives to the clients connected to it.
+
+    Listeners are called after every publish, from the publishing thread;
+    the ASGI entry point uses one to wake its event loop.
+    """
+
+    def __init__(self, backlog: int = BROADCAST_BACKLOG):
+        self._cond = threading.Condition()
+        self._messages: Deque[Message] = deque(maxlen=backlog)
+        self._last_id = 0
+        self._listeners: List[Callable[[], None]] = []
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, event: str, payload: Any) -> int:
+        """Send payload (JSON-serialised) to every stream; returns its message id."""
+        data = json.dumps(payload)
+        with self._cond:
+            self._last_id += 1
+            self._messages.append((self._last_id, event, data))
+            self._cond.notify_all()
+            message_id = self._last_id
+        for listener in self._listeners:
+            listener()
+        return message_id
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        """Call listener (with no arguments, and quickly) after each publish."""
+        with self._cond:
+            self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener: Callable[[], None]) -> None:
+        with self._cond:
+            # == rather than is: each access to a bound method makes a new object
+            self._listeners = [other for other in self._listeners if other != listener]
+
+    def since(self, after: int) -> List[Message]:
+        """Messages newer than after that are still held, without waiting."""
+        with self._cond:
+            return [m for m in self._messages if m[0] > after]
+
+    def wait(self, after: int, timeout: float) -> List[Message]:
+        """Messages newer than after, blocking up to timeout seconds for one to arrive."""
+        with self._cond:
+            if self._last_id <= after:
+                self._cond.wait(timeout)
+            return [m for m in self._messages if m[0] > after]
+
+    def stream(self, after: Optional[int] = None,
+               keepalive: float = SSE_KEEPALIVE_SECONDS) -> Iterator[str]:
+        """text/event-stream chunks for messages published after the given id, forever."""
+        last = self._last_id if after is None else after
+        while True:
+            messages = self.wait(last, keepalive)
+            if not messages:
+                yield ": keepalive\n\n"
+                continue
+            for message_id, event, data in messages:
+                yield format_sse(message_id, event, data)
+            last = messages[-1][0]
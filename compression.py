@@ -0,0 +1,232 @@
+"""Content-Encoding negotiation, gzip/brotli compression and a WSGI middleware."""
+
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag, unquote_etag
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip alone is always available
+    brotli = None
+
+# Preferred first when the client rates several encodings equally
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Levels for bodies compressed once and reused (prebuilt assets, cached bodies)
+GZIP_MAX_LEVEL = 9
+BROTLI_MAX_QUALITY = 11
+# Levels for one-off dynamic responses, where compression time is on the request path
+GZIP_DYNAMIC_LEVEL = 6
+BROTLI_DYNAMIC_QUALITY = 5
+
+# Responses smaller than this go out as-is; framing would eat most of the gain
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+# Upper bound on compressed bodies kept for responses that carry an ETag
+COMPRESS_CACHE_BYTES = int(os.getenv("COMPRESS_CACHE_BYTES", str(16 * 1024 * 1024)))
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/javascript", "image/svg+xml")
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == "gzip":
+        # mtime=0 keeps the output (and so any ETag derived from it) stable
+        return gzip.compress(data, compresslevel=GZIP_MAX_LEVEL if level is None else level, mtime=0)
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(data, quality=BROTLI_MAX_QUALITY if level is None else level)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def negotiate_encoding(accept_encodings, available: Iterable[str]) -> str:
+    """Best of available for a request's Accept-Encoding, or "identity".
+
+    accept_encodings is werkzeug's parsed header (request.accept_encodings).
+    """
+    best = "identity"
+    best_quality = 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        if encoding not in available:
+            continue
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """ETag of the encoding variant of a representation tagged etag."""
+    return etag if encoding == "identity" else f"{etag}-{encoding}"
+
+
+def prebuilt_variants(body: bytes) -> Dict[str, bytes]:
+    """identity plus every supported encoding that actually shrinks body."""
+    variants = {"identity": body}
+    for encoding in SUPPORTED_ENCODINGS:
+        compressed = compress(body, encoding)
+        if len(compressed) < len(body):
+            variants[encoding] = compressed
+    return variants
+
+
+def _is_compressible(mimetype: str) -> bool:
+    mimetype = mimetype.split(";", 1)[0].strip().lower()
+    if mimetype == "text/event-stream":
+        return False
+    return mimetype.startswith("text/") or mimetype.endswith("+json") or mimetype in COMPRESSIBLE_MIMETYPES
+
+
+class CompressedBodyCache:
+    """LRU of (ETag, encoding) -> compressed body, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int = COMPRESS_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: Tuple[str, str], body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+class CompressionMiddleware:
+    """Compress text and JSON responses for clients that accept gzip or brotli.
+
+    Responses that carry a strong ETag are compressed once per (ETag,
+    encoding), at the highest level, and served from a cache afterwards; the
+    rest are compressed at a cheaper level on every request. Compressed
+    variants are tagged "<etag>-<encoding>", and conditional requests for
+    such a tag are also matched against the plain ETag so the app's own 304
+    handling keeps working. Responses that are already encoded, streamed
+    (no Content-Length), partial or small pass straight through.
+
+    HEAD is answered as the GET would be, with the same Content-Encoding,
+    Content-Length and ETag, and no body.
+    """
+
+    def __init__(self, app: Callable, min_size: int = COMPRESS_MIN_SIZE,
+                 cache: Optional[CompressedBodyCache] = None):
+        self.app = app
+        self.min_size = min_size
+        self.cache = cache if cache is not None else CompressedBodyCache()
+
+    def __call__(self, environ, start_response):
+        encoding = negotiate_encoding(parse_accept_header(environ.get("HTTP_ACCEPT_ENCODING")), SUPPORTED_ENCODINGS)
+        if encoding == "identity":
+            return self.app(environ, start_response)
+
+        # Let a cached "<etag>-<encoding>" revalidate against the app's plain ETag
+        if_none_match = environ.get("HTTP_IF_NONE_MATCH")
+        suffix = f"-{encoding}"
+        if if_none_match:
+            tags = parse_etags(if_none_match)
+            plain = [tag[:-len(suffix)] for tag in tags._strong if tag.endswith(suffix)]
+            if plain:
+                environ["HTTP_IF_NONE_MATCH"] = ", ".join([if_none_match] + [quote_etag(tag) for tag in plain])
+
+        captured: Dict[str, object] = {}
+        written: List[bytes] = []
+
+        def capture(status, headers, exc_info=None):
+            captured["status"] = status
+            captured["headers"] = headers
+            captured["exc_info"] = exc_info
+            return written.append
+
+        head = environ.get("REQUEST_METHOD") == "HEAD"
+        if head:
+            # The compressed length depends on the body, which only GET produces
+            environ["REQUEST_METHOD"] = "GET"
+            try:
+                app_iter = self.app(environ, capture)
+            finally:
+                environ["REQUEST_METHOD"] = "HEAD"
+        else:
+            app_iter = self.app(environ, capture)
+        status: str = captured["status"]
+        headers: List[Tuple[str, str]] = captured["headers"]
+        header_map = {name.lower(): value for name, value in headers}
+        etag = header_map.get("etag")
+
+        if status.startswith("304") and etag and if_none_match:
+            tag, weak = unquote_etag(etag)
+            if not weak and quote_etag(variant_etag(tag, encoding)) in if_none_match:
+                headers = [(n, v) for n, v in headers if n.lower() != "etag"]
+                headers.append(("ETag", quote_etag(variant_etag(tag, encoding))))
+                headers.append(("Vary", "Accept-Encoding"))
+
+        content_length = header_map.get("content-length")
+        if (not status.startswith("200") or "content-encoding" in header_map or content_length is None
+                or int(content_length) < self.min_size
+                or not _is_compressible(header_map.get("content-type", ""))):
+            start_response(status, headers, captured["exc_info"])
+            if head:
+                if hasattr(app_iter, "close"):
+                    app_iter.close()
+                return []
+            if written:
+                return _prepend(written, app_iter)
+            return app_iter
+
+        try:
+            body = b"".join(written) + b"".join(app_iter)
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
+
+        cache_key = None
+        tag = None
+        if etag:
+            tag, weak = unquote_etag(etag)
+            if not weak:
+                cache_key = (tag, encoding)
+        compressed = self.cache.get(cache_key) if cache_key else None
+        if compressed is None:
+            if cache_key:
+                compressed = compress(body, encoding)
+                self.cache.put(cache_key, compressed)
+            else:
+                level = GZIP_DYNAMIC_LEVEL if encoding == "gzip" else BROTLI_DYNAMIC_QUALITY
+                compressed = compress(body, encoding, level)
+
+        drop = {"content-length", "etag"} if cache_key else {"content-length"}
+        headers = [(n, v) for n, v in headers if n.lower() not in drop]
+        headers.append(("Content-Encoding", encoding))
+        headers.append(("Content-Length", str(len(compressed))))
+        if cache_key:
+            headers.append(("ETag", quote_etag(variant_etag(tag, encoding))))
+        vary = header_map.get("vary")
+        if vary is None:
+            headers.append(("Vary", "Accept-Encoding"))
+        elif "accept-encoding" not in vary.lower():
+            headers = [(n, v) for n, v in headers if n.lower() != "vary"]
+            headers.append(("Vary", f"{vary}, Accept-Encoding"))
+        start_response(status, headers, captured["exc_info"])
+        return [] if head else [compressed]
+
+
+def _prepend(first: List[bytes], rest: Iterable[bytes]):
+    yield from first
+    try:
+        yield from rest
+    finally:
+        if hasattr(rest, "close"):
+            rest.close()
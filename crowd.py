@@ -0,0 +1,154 @@
+"""Live cafeteria crowd state: rolling rush-time estimates and change versions."""
+
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+MAX_RUSH_TIME = 60
+# Reports held per cafeteria for the median and the recent-reports list
+CROWD_WINDOW_REPORTS = 64
+# Reports older than this no longer count towards the median
+CROWD_WINDOW_SECONDS = 30 * 60
+# Time constant of the decayed average: a report's weight falls by 1/e this often
+CROWD_DECAY_SECONDS = 10 * 60
+# Once the window holds this many reports, new ones are clamped to the
+# window median +/- CROWD_OUTLIER_MARGIN minutes before they are averaged
+CROWD_MIN_REPORTS_FOR_CLAMP = 3
+CROWD_OUTLIER_MARGIN = 10
+
+
+class CrowdAggregator:
+    """Rush-time estimate for one cafeteria, updated in O(1) per report.
+
+    Reports go into a fixed-size ring buffer and a 0-60 minute histogram, so
+    the window median is a walk over 61 counters instead of a sort. The
+    estimate is a time-decayed weighted mean of reports clamped around that
+    median: one wild report moves it by at most the margin, and stale reports
+    fade out on their own.
+    """
+
+    def __init__(self, initial: Optional[float] = None, capacity: int = CROWD_WINDOW_REPORTS,
+                 window_seconds: float = CROWD_WINDOW_SECONDS, decay_seconds: float = CROWD_DECAY_SECONDS):
+        self._lock = threading.Lock()
+        self._ring: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._times: List[float] = [0.0] * capacity
+        self._values: List[int] = [0] * capacity
+        self._start = 0  # oldest live slot
+        self._count = 0
+        self._histogram = [0] * (MAX_RUSH_TIME + 1)
+        self.window_seconds = window_seconds
+        self.decay_seconds = decay_seconds
+        self._mean = initial
+        self._weight = 0.0
+        self._last_time: Optional[float] = None
+
+    def _evict_oldest(self) -> None:
+        self._histogram[self._values[self._start]] -= 1
+        self._ring[self._start] = None
+        self._start = (self._start + 1) % len(self._ring)
+        self._count -= 1
+
+    def _expire(self, now: float) -> None:
+        # Each report is evicted once, so this is amortised O(1) per add()
+        while self._count and now - self._times[self._start] > self.window_seconds:
+            self._evict_oldest()
+
+    def _median(self) -> Optional[int]:
+        if not self._count:
+            return None
+        target = (self._count + 1) // 2
+        seen = 0
+        for value, n in enumerate(self._histogram):
+            seen += n
+            if seen >= target:
+                return value
+        return None
+
+    def add(self, rush_time: int, report: Dict[str, Any], now: Optional[float] = None) -> float:
+        """Fold in one report (rush_time in 0..MAX_RUSH_TIME); returns the new estimate."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expire(now)
+            median = self._median()
+            value = rush_time
+            if median is not None and self._count >= CROWD_MIN_REPORTS_FOR_CLAMP:
+                value = min(max(value, median - CROWD_OUTLIER_MARGIN), median + CROWD_OUTLIER_MARGIN)
+
+            if self._last_time is None or self._mean is None or self._weight == 0.0:
+                self._weight = 1.0
+                self._mean = float(value)
+            else:
+                decay = math.exp(-max(0.0, now - self._last_time) / self.decay_seconds)
+                self._weight = self._weight * decay + 1.0
+                self._mean += (value - self._mean) / self._weight
+            self._last_time = now
+
+            if self._count == len(self._ring):
+                self._evict_oldest()
+            slot = (self._start + self._count) % len(self._ring)
+            self._ring[slot] = report
+            self._times[slot] = now
+            self._values[slot] = rush_time
+            self._histogram[rush_time] += 1
+            self._count += 1
+            return self._mean
+
+    def estimate(self) -> Optional[int]:
+        """The current rush time in whole minutes, or None before any report."""
+        return None if self._mean is None else int(round(self._mean))
+
+    def median(self, now: Optional[float] = None) -> Optional[int]:
+        with self._lock:
+            self._expire(time.time() if now is None else now)
+            return self._median()
+
+    def report_rate(self, now: Optional[float] = None) -> float:
+        """Reports per minute over the window (or over the span the full buffer covers)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._expire(now)
+            if not self._count:
+                return 0.0
+            span = self.window_seconds
+            if self._count == len(self._ring):
+                span = max(now - self._times[self._start], 1.0)
+            return self._count * 60.0 / span
+
+    def recent(self, n: int) -> List[Dict[str, Any]]:
+        """The last n reports still in the buffer, oldest first."""
+        with self._lock:
+            size = len(self._ring)
+            first = self._count - min(n, self._count)
+            return [self._ring[(self._start + i) % size] for i in range(first, self._count)]
+
+
+class CrowdVersions:
+    """A process-wide version counter plus the version each cafeteria last changed at.
+
+    Every accepted report bumps the counter, so a client holding version v
+    needs exactly the cafeterias whose version is greater than v.
+    """
+
+    def __init__(self, cafeteria_ids: Iterable[str]):
+        self._lock = threading.Lock()
+        self.version = 0
+        self._changed_at: Dict[str, int] = {cafeteria_id: 0 for cafeteria_id in cafeteria_ids}
+
+    def bump(self, cafeteria_id: str) -> int:
+        """Record a change to cafeteria_id and return the new version."""
+        with self._lock:
+            self.version += 1
+            self._changed_at[cafeteria_id] = self.version
+            return self.version
+
+    def changed_since(self, since: int) -> List[str]:
+        """Cafeterias changed after version since; all of them if since is from the future.
+
+        A version ahead of ours can only come from before a restart, so the
+        client's copy is unrelated to our state and it needs everything.
+        """
+        with self._lock:
+            if since > self.version:
+                return list(self._changed_at)
+            return [cid for cid, changed_at in self._changed_at.items() if changed_at > since]
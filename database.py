@@ -0,0 +1,189 @@
+"""SQLite connection handling and schema for the persistent stores."""
+
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Sequence
+
+# Statements are kept compiled per connection; every store uses constant SQL
+# strings so repeated calls hit this cache instead of re-preparing.
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    date TEXT,
+    location TEXT,
+    description TEXT DEFAULT '',
+    category TEXT DEFAULT 'General',
+    participants TEXT DEFAULT '',
+    coordinators TEXT DEFAULT '',
+    winners TEXT DEFAULT '',
+    imageUrl TEXT DEFAULT '',
+    status TEXT DEFAULT 'Upcoming'
+);
+CREATE INDEX IF NOT EXISTS idx_events_date ON events (date, id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5 (
+    name, category, location, description, participants, coordinators,
+    content='events', content_rowid='id', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts (rowid, name, category, location, description, participants, coordinators)
+    VALUES (new.id, new.name, new.category, new.location, new.description, new.participants, new.coordinators);
+END;
+CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, name, category, location, description, participants, coordinators)
+    VALUES ('delete', old.id, old.name, old.category, old.location, old.description, old.participants, old.coordinators);
+END;
+CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE ON events BEGIN
+    INSERT INTO events_fts (events_fts, rowid, name, category, location, description, participants, coordinators)
+    VALUES ('delete', old.id, old.name, old.category, old.location, old.description, old.participants, old.coordinators);
+    INSERT INTO events_fts (rowid, name, category, location, description, participants, coordinators)
+    VALUES (new.id, new.name, new.category, new.location, new.description, new.participants, new.coordinators);
+END;
+
+CREATE TABLE IF NOT EXISTS lost_found_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT,
+    description TEXT,
+    category TEXT,
+    item_type TEXT,
+    location TEXT,
+    contact_method TEXT,
+    contact_info TEXT DEFAULT '',
+    image_url TEXT DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'active',
+    created_at TEXT NOT NULL,
+    user_id TEXT DEFAULT 'anonymous'
+);
+CREATE INDEX IF NOT EXISTS idx_lost_found_status_type ON lost_found_items (status, item_type, id);
+
+-- Match terms of each item (lost_found_store.match_terms), looked up by the
+-- opposite item_type when a new report comes in
+CREATE TABLE IF NOT EXISTS lost_found_terms (
+    item_type TEXT NOT NULL,
+    term TEXT NOT NULL,
+    item_id INTEGER NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (item_type, term, item_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_lost_found_terms_item ON lost_found_terms (item_id);
+CREATE TRIGGER IF NOT EXISTS lost_found_terms_delete AFTER DELETE ON lost_found_items BEGIN
+    DELETE FROM lost_found_terms WHERE item_id = old.id;
+END;
+
+CREATE TABLE IF NOT EXISTS users (
+    register_number TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    year TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+-- Logins are signed tokens (sessions.py); only early logouts are stored,
+-- until the token would have expired anyway
+CREATE TABLE IF NOT EXISTS session_revocations (
+    token_id TEXT PRIMARY KEY,
+    expires_at INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_session_revocations_expires_at ON session_revocations (expires_at);
+
+CREATE TABLE IF NOT EXISTS app_secrets (
+    name TEXT PRIMARY KEY,
+    value BLOB NOT NULL
+);
+"""
+
+
+def _reset_after_fork(ref: "weakref.ref[Database]") -> None:
+    db = ref()
+    if db is not None:
+        db._after_fork_in_child()
+
+
+class Database:
+    """One SQLite file shared by every worker process, one connection per thread.
+
+    Connections run in autocommit mode with WAL journaling, so readers never
+    block the writer; writes go through transaction(), which takes the write
+    lock up front (BEGIN IMMEDIATE) instead of failing on upgrade.
+
+    A forked child (gunicorn --preload) opens its own connections rather
+    than using any it inherited from the parent.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        # Connections inherited over fork; kept referenced so they are never
+        # closed (or otherwise touched) from the child
+        self._inherited: List[threading.local] = []
+        if hasattr(os, "register_at_fork"):
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: _reset_after_fork(ref))
+
+    def _after_fork_in_child(self) -> None:
+        self._inherited.append(self._local)
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened (and the schema created) on first use."""
+        conn: Optional[sqlite3.Connection] = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                               check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._schema_ready = True
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block of writes atomically; rolls back if the block raises."""
+        conn = self.connection()
+        if conn.in_transaction:
+            # Nested use joins the outer transaction
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        return self.connection().execute(sql, params).fetchall()
+
+    def query_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[sqlite3.Row]:
+        return self.connection().execute(sql, params).fetchone()
+
+    def close(self) -> None:
+        """Close the calling thread's connection, if it has one."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,204 @@
+"""Event storage on SQLite, indexed by id, date, location and full text."""
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from database import Database
+from pagination import PageKey, encode_cursor
+
+EVENT_FIELDS = ("name", "date", "location", "description", "category", "participants",
+                "coordinators", "winners", "imageUrl", "status")
+_COLUMNS = ("id",) + EVENT_FIELDS
+
+# bm25() weights for the events_fts columns, in declaration order:
+# name, category, location, description, participants, coordinators
+SEARCH_WEIGHTS = (3.0, 2.0, 2.0, 1.0, 1.0, 1.0)
+# Query words shorter than this only match whole terms, which keeps a
+# one-letter query from expanding to most of the vocabulary.
+MIN_PREFIX_LEN = 2
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_SELECT = f"SELECT {', '.join(_COLUMNS)} FROM events"
+_SELECT_PAGE = f"{_SELECT} WHERE id > ? ORDER BY id LIMIT ?"
+_SELECT_ONE = f"{_SELECT} WHERE id = ?"
+_SELECT_UPCOMING = f"{_SELECT} WHERE date >= ? ORDER BY date, id"
+_SELECT_SEARCH = (
+    f"SELECT bm25(events_fts, {', '.join(map(str, SEARCH_WEIGHTS))}) AS rank, "
+    f"{', '.join('e.' + col for col in _COLUMNS)} "
+    "FROM events_fts JOIN events e ON e.id = events_fts.rowid "
+    "WHERE events_fts MATCH ? ORDER BY rank, e.id"
+)
+# Keyset pages of the ranked search: strictly after the last (rank, id) seen
+_SELECT_SEARCH_FIRST = f"{_SELECT_SEARCH} LIMIT ?"
+_SELECT_SEARCH_AFTER = (f"SELECT * FROM ({_SELECT_SEARCH}) WHERE rank > ? OR (rank = ? AND id > ?) "
+                        "ORDER BY rank, id LIMIT ?")
+_COUNT_SEARCH = "SELECT COUNT(*) FROM events_fts WHERE events_fts MATCH ?"
+_INSERT_WITH_ID = f"INSERT INTO events ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+
+
+def _event(row) -> Dict[str, Any]:
+    return {key: row[key] for key in _COLUMNS}
+
+
+def _column_value(value: Any) -> Any:
+    # Columns hold scalars; anything structured is kept as its JSON text
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+
+def fts_query(query: str, column: Optional[str] = None) -> Optional[str]:
+    """FTS5 MATCH expression requiring every word of query, each also as a prefix.
+
+    With column, the words must all be found in that column.
+    """
+    terms = []
+    for token in dict.fromkeys(_TOKEN_RE.findall(query.casefold())):
+        token = token.replace('"', '""')
+        terms.append(f'"{token}"*' if len(token) >= MIN_PREFIX_LEN else f'"{token}"')
+    if not terms:
+        return None
+    return f"{column} : ({' '.join(terms)})" if column else " ".join(terms)
+
+
+def _filter_where(date_prefix: Optional[str], location: Optional[str]) -> Tuple[List[str], List[Any]]:
+    clauses: List[str] = []
+    params: List[Any] = []
+    if date_prefix:
+        # A range scan on idx_events_date; LIKE 'prefix%' could not use it
+        clauses.append("date >= ? AND date < ?")
+        params += [date_prefix, date_prefix + "\uffff"]
+    if location:
+        # The location words through events_fts rather than a substring
+        # test, which would read every row
+        match = fts_query(location, "location")
+        if match is None:
+            clauses.append("0")
+        else:
+            clauses.append("id IN (SELECT rowid FROM events_fts WHERE events_fts MATCH ?)")
+            params.append(match)
+    return clauses, params
+
+
+class EventStore:
+    """Events in the events table, with events_fts kept in step by triggers.
+
+    The integer primary key serves lookups by id, idx_events_date serves
+    date ranges and events_fts serves word and location searches, so no
+    request reads every event to find a few. SQLite allocates ids, and every
+    worker process reads and writes the same file.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+        self._index_missing()
+
+    def _index_missing(self) -> None:
+        # Events stored before events_fts existed
+        with self.db.transaction() as conn:
+            if conn.execute("SELECT 1 FROM events LIMIT 1").fetchone() \
+                    and not conn.execute("SELECT 1 FROM events_fts_docsize LIMIT 1").fetchone():
+                conn.execute("INSERT INTO events_fts (events_fts) VALUES ('rebuild')")
+
+    def seed(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Insert events (keeping their ids) unless the table has ever held any."""
+        with self.db.transaction() as conn:
+            if conn.execute("SELECT 1 FROM sqlite_sequence WHERE name = 'events'").fetchone():
+                return
+            for event in events:
+                conn.execute(_INSERT_WITH_ID, [event["id"]] + [_column_value(event.get(f, "")) for f in EVENT_FIELDS])
+
+    def __len__(self) -> int:
+        return self.db.query_one("SELECT COUNT(*) FROM events")[0]
+
+    # -----------------------------
+    # CRUD
+    # -----------------------------
+
+    def page(self, limit: int, after: Optional[PageKey] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of events in creation order plus the next cursor; the sort key is the id itself."""
+        after_id = after[1] if after is not None else 0
+        rows = self.db.query(_SELECT_PAGE, (after_id, limit + 1))
+        page = [_event(row) for row in rows[:limit]]
+        next_cursor = encode_cursor((page[-1]["id"], page[-1]["id"])) if len(rows) > limit else None
+        return page, next_cursor
+
+    def get(self, event_id: int) -> Optional[Dict[str, Any]]:
+        row = self.db.query_one(_SELECT_ONE, (event_id,))
+        return _event(row) if row else None
+
+    def create(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a new event; the database allocates its id."""
+        columns = [f for f in EVENT_FIELDS if f in fields]
+        with self.db.transaction() as conn:
+            cur = conn.execute(
+                f"INSERT INTO events ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [_column_value(fields[f]) for f in columns],
+            )
+            row = conn.execute(_SELECT_ONE, (cur.lastrowid,)).fetchone()
+        return _event(row)
+
+    def update(self, event_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply changes to known event fields; ids cannot be changed."""
+        columns = [f for f in EVENT_FIELDS if f in changes]
+        with self.db.transaction() as conn:
+            if columns:
+                conn.execute(
+                    f"UPDATE events SET {', '.join(col + ' = ?' for col in columns)} WHERE id = ?",
+                    [_column_value(changes[col]) for col in columns] + [event_id],
+                )
+            row = conn.execute(_SELECT_ONE, (event_id,)).fetchone()
+        return _event(row) if row else None
+
+    def delete(self, event_id: int) -> bool:
+        with self.db.transaction() as conn:
+            return conn.execute("DELETE FROM events WHERE id = ?", (event_id,)).rowcount > 0
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+
+    def search(self, query: str, limit: int,
+               after: Optional[PageKey] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of events matching every word of query (prefixes included), best first.
+
+        The cursor's sort key is the bm25() rank, lower being better, so a
+        page resumes in SQL right after the last (rank, id) of the previous one.
+        """
+        match = fts_query(query)
+        if match is None:
+            return [], None
+        if after is None:
+            rows = self.db.query(_SELECT_SEARCH_FIRST, (match, limit + 1))
+        else:
+            rows = self.db.query(_SELECT_SEARCH_AFTER, (match, after[0], after[0], after[1], limit + 1))
+        page = [_event(row) for row in rows[:limit]]
+        next_cursor = encode_cursor((rows[limit - 1]["rank"], rows[limit - 1]["id"])) if len(rows) > limit else None
+        return page, next_cursor
+
+    def search_count(self, query: str) -> int:
+        match = fts_query(query)
+        return self.db.query_one(_COUNT_SEARCH, (match,))[0] if match is not None else 0
+
+    def upcoming(self, today: str) -> List[Dict[str, Any]]:
+        """Events dated on or after today (YYYY-MM-DD), soonest first."""
+        return [_event(row) for row in self.db.query(_SELECT_UPCOMING, (today,))]
+
+    def filter(self, limit: int, after: Optional[PageKey] = None, date_prefix: Optional[str] = None,
+               location: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page, in id order, of events whose date starts with date_prefix and
+        whose location has every word of location (prefixes included)."""
+        clauses, params = _filter_where(date_prefix, location)
+        clauses.append("id > ?")
+        params += [after[1] if after is not None else 0, limit + 1]
+        rows = self.db.query(f"{_SELECT} WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?", params)
+        page = [_event(row) for row in rows[:limit]]
+        next_cursor = encode_cursor((page[-1]["id"], page[-1]["id"])) if len(rows) > limit else None
+        return page, next_cursor
+
+    def filter_count(self, date_prefix: Optional[str] = None, location: Optional[str] = None) -> int:
+        clauses, params = _filter_where(date_prefix, location)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.db.query_one(f"SELECT COUNT(*) FROM events{where}", params)[0]
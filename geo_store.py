@@ -0,0 +1,316 @@
+"""Process-level cache of the parsed campus GeoJSON and navigation config files."""
+
+import os
+import json
+import logging
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# How often (seconds) a request may re-stat the data files to pick up edits.
+GEO_CHECK_INTERVAL = float(os.getenv("GEO_CHECK_INTERVAL", "2"))
+
+FileSignature = Optional[Tuple[int, int]]
+
+logger = logging.getLogger(__name__)
+
+
+def _safe_read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning("Failed to read JSON from %s: %s", path, e)
+        return None
+
+
+def file_signature(path: str) -> FileSignature:
+    """Return (mtime_ns, size) for path, or None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _geojson_outer_ring_to_latlng(geom: Dict[str, Any]) -> List[List[float]]:
+    if not geom or "type" not in geom or "coordinates" not in geom:
+        return []
+
+    gtype = geom["type"]
+    coords = geom["coordinates"]
+
+    ring: List[List[float]] = []
+
+    if gtype == "Polygon":
+        if not coords or not coords[0]:
+            return []
+        outer = coords[0]
+        ring = [[pt[1], pt[0]] for pt in outer if isinstance(pt, (list, tuple)) and len(pt) >= 2]
+    elif gtype == "MultiPolygon":
+        if not coords:
+            return []
+        candidate = max(coords, key=lambda poly: len(poly[0]) if poly and poly[0] else 0)
+        if not candidate or not candidate[0]:
+            return []
+        outer = candidate[0]
+        ring = [[pt[1], pt[0]] for pt in outer if isinstance(pt, (list, tuple)) and len(pt) >= 2]
+    else:
+        return []
+
+    if ring and ring[0] != ring[-1]:
+        ring.append(ring[0])
+    return ring
+
+
+def _geojson_lines_to_latlng(geom: Dict[str, Any]) -> List[List[List[float]]]:
+    """Every line of a LineString or MultiLineString (or an area's outline) as lat/lng lists."""
+    if not geom or "type" not in geom or "coordinates" not in geom:
+        return []
+
+    gtype = geom["type"]
+    coords = geom["coordinates"]
+
+    if gtype == "LineString":
+        parts = [coords or []]
+    elif gtype == "MultiLineString":
+        parts = [part or [] for part in coords or []]
+    else:
+        # Roads drawn as areas fall back to their outline
+        ring = _geojson_outer_ring_to_latlng(geom)
+        return [ring] if ring else []
+
+    lines = [[[pt[1], pt[0]] for pt in part if isinstance(pt, (list, tuple)) and len(pt) >= 2] for part in parts]
+    return [line for line in lines if line]
+
+
+def parse_campus_boundary(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not data:
+        return None
+
+    if data.get("type") == "Feature":
+        geom = data.get("geometry", {})
+        name = data.get("properties", {}).get("name") or "Campus"
+    elif data.get("type") in ("Polygon", "MultiPolygon"):
+        geom = data
+        name = "Campus"
+    else:
+        if data.get("type") == "FeatureCollection" and data.get("features"):
+            feat = data["features"][0]
+            geom = feat.get("geometry", {})
+            name = feat.get("properties", {}).get("name") or "Campus"
+        else:
+            return None
+
+    coords_latlng = _geojson_outer_ring_to_latlng(geom)
+    return {"id": "campus", "name": name, "coordinates": coords_latlng}
+
+
+def parse_locations(data: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    if not data:
+        return [
+            {
+                "id": "b1",
+                "name": "Main Block",
+                "category": "Academic",
+                "coordinates": [[16.4945, 80.5123], [16.4946, 80.5129], [16.4941, 80.5130], [16.4940, 80.5124], [16.4945, 80.5123]],
+                "description": "Central academic building.",
+                "imageUrl": "https://example.com/main-block.jpg",
+            },
+            {
+                "id": "b2",
+                "name": "Auditorium",
+                "category": "Facility",
+                "coordinates": [[16.4930, 80.5110], [16.4934, 80.5115], [16.4929, 80.5118], [16.4926, 80.5112], [16.4930, 80.5110]],
+                "description": "Events and cultural programs.",
+                "imageUrl": "https://example.com/auditorium.jpg",
+            },
+        ]
+
+    feats: List[Dict[str, Any]] = []
+    if data.get("type") == "FeatureCollection":
+        for feat in data.get("features", []):
+            geom = feat.get("geometry", {})
+            props = feat.get("properties", {})
+            ring = _geojson_outer_ring_to_latlng(geom)
+            if not ring:
+                continue
+            feats.append({
+                "id": str(props.get("id") or props.get("code") or props.get("name") or len(feats) + 1),
+                "name": str(props.get("name") or "Building"),
+                "category": str(props.get("category") or "General"),
+                "coordinates": ring,
+                "description": str(props.get("description") or ""),
+                "imageUrl": str(props.get("imageUrl") or ""),
+            })
+    elif data.get("type") == "Feature":
+        geom = data.get("geometry", {})
+        props = data.get("properties", {})
+        ring = _geojson_outer_ring_to_latlng(geom)
+        if ring:
+            feats.append({
+                "id": str(props.get("id") or props.get("code") or props.get("name") or 1),
+                "name": str(props.get("name") or "Building"),
+                "category": str(props.get("category") or "General"),
+                "coordinates": ring,
+                "description": str(props.get("description") or ""),
+                "imageUrl": str(props.get("imageUrl") or ""),
+            })
+    return feats
+
+
+def _road_features(geom: Dict[str, Any], road_id: str, name: str) -> List[Dict[str, Any]]:
+    """One /api/roads entry per line of geom; the parts of a MultiLineString get "-1", "-2"... ids."""
+    lines = _geojson_lines_to_latlng(geom)
+    gtype = geom.get("type", "LineString")
+    if gtype != "MultiLineString":
+        return [{"id": road_id, "name": name, "coordinates": line, "type": gtype} for line in lines]
+    return [{"id": f"{road_id}-{n}", "name": name, "coordinates": line, "type": "LineString"}
+            for n, line in enumerate(lines, 1)]
+
+
+def parse_roads(data: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert roads GeoJSON into the /api/roads payload."""
+    if not data:
+        return []
+
+    feats: List[Dict[str, Any]] = []
+    if data.get("type") == "FeatureCollection":
+        for feat in data.get("features", []):
+            geom = feat.get("geometry", {})
+            props = feat.get("properties", {})
+
+            # Convert coordinates to lat/lng format
+            n = len(feats) + 1
+            feats.extend(_road_features(geom, str(props.get("id", n)), str(props.get("name", f"Road {n}"))))
+    elif data.get("type") == "Feature":
+        geom = data.get("geometry", {})
+        props = data.get("properties", {})
+
+        # Convert coordinates to lat/lng format
+        feats.extend(_road_features(geom, str(props.get("id", "1")), str(props.get("name", "Road"))))
+    return feats
+
+
+def parse_nav_config(data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    default = {
+        "center": [16.493, 80.513],
+        "defaultZoom": 17,
+        "categoryColors": {
+            "Academic": "#2563eb",
+            "Admin": "#f59e0b",
+            "Hostel": "#10b981",
+            "Facility": "#8b5cf6",
+            "Sports": "#ef4444",
+            "General": "#3b82f6",
+        },
+    }
+    if isinstance(data, dict):
+        cfg = default.copy()
+        for k in ("center", "defaultZoom", "categoryColors"):
+            if k in data:
+                cfg[k] = data[k]
+        return cfg
+    return default
+
+
+class GeoSnapshot:
+    """Immutable view of the parsed data files at one point in time.
+
+    The lists and dicts held here are shared by every request; callers must
+    treat them as read-only.  Structures derived from a snapshot (indexes,
+    serialized bodies, ...) are memoized on it through ``derived`` so they are
+    rebuilt exactly when the underlying files change.
+    """
+
+    def __init__(self, signatures: Dict[str, FileSignature], raw: Dict[str, Any],
+                 boundary: Optional[Dict[str, Any]], locations: List[Dict[str, Any]],
+                 roads: List[Dict[str, Any]], nav_config: Dict[str, Any]):
+        self.signatures = signatures
+        self.raw = raw
+        self.boundary = boundary
+        self.locations = locations
+        self.roads = roads
+        self.nav_config = nav_config
+        self.locations_by_id: Dict[str, Dict[str, Any]] = {}
+        for loc in locations:
+            self.locations_by_id.setdefault(str(loc.get("id")), loc)
+        self._derived: Dict[str, Any] = {}
+        self._derived_lock = threading.RLock()
+
+    def get_location(self, loc_id: str) -> Optional[Dict[str, Any]]:
+        return self.locations_by_id.get(str(loc_id))
+
+    def derived(self, key: str, factory: Callable[["GeoSnapshot"], Any]) -> Any:
+        """Return the value cached under key, building it once via factory(self)."""
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+        with self._derived_lock:
+            if key not in self._derived:
+                self._derived[key] = factory(self)
+            return self._derived[key]
+
+
+class GeoStore:
+    """Parses each data file once and re-parses it only when its mtime/size changes."""
+
+    def __init__(self, boundary_path: str, buildings_path: str, roads_path: str,
+                 nav_config_path: str, check_interval: float = GEO_CHECK_INTERVAL):
+        self.paths = {
+            "boundary": boundary_path,
+            "buildings": buildings_path,
+            "roads": roads_path,
+            "nav_config": nav_config_path,
+        }
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._snapshot: Optional[GeoSnapshot] = None
+        self._checked_at = 0.0
+
+    def snapshot(self) -> GeoSnapshot:
+        """Return the current snapshot, reloading changed files at most every check_interval."""
+        snap = self._snapshot
+        if snap is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snap
+
+        with self._lock:
+            snap = self._snapshot
+            now = time.monotonic()
+            if snap is not None and now - self._checked_at < self.check_interval:
+                return snap
+            signatures = {name: file_signature(path) for name, path in self.paths.items()}
+            if snap is None or signatures != snap.signatures:
+                snap = self._build(signatures, snap)
+                self._snapshot = snap
+            self._checked_at = now
+            return snap
+
+    def invalidate(self) -> None:
+        """Force the next snapshot() call to re-stat the data files."""
+        self._checked_at = 0.0
+
+    def _build(self, signatures: Dict[str, FileSignature], previous: Optional[GeoSnapshot]) -> GeoSnapshot:
+        raw: Dict[str, Any] = {}
+        for name, path in self.paths.items():
+            if previous is not None and previous.signatures.get(name) == signatures[name]:
+                raw[name] = previous.raw[name]
+            else:
+                raw[name] = _safe_read_json(path)
+
+        def reuse(name: str, attr: str, parse: Callable[[Any], Any]) -> Any:
+            if previous is not None and previous.raw.get(name) is raw[name]:
+                return getattr(previous, attr)
+            return parse(raw[name])
+
+        return GeoSnapshot(
+            signatures=signatures,
+            raw=raw,
+            boundary=reuse("boundary", "boundary", parse_campus_boundary),
+            locations=reuse("buildings", "locations", parse_locations),
+            roads=reuse("roads", "roads", parse_roads),
+            nav_config=reuse("nav_config", "nav_config", parse_nav_config),
+        )
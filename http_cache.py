@@ -0,0 +1,44 @@
+"""Pre-serialized response bodies with strong ETags and conditional GET handling."""
+
+import hashlib
+
+from flask import Response, request
+
+
+class CachedBody:
+    """A response body serialized once, together with its content-hash ETag."""
+
+    __slots__ = ("body", "etag", "mimetype")
+
+    def __init__(self, body: bytes, mimetype: str = "application/json"):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.mimetype = mimetype
+
+    @classmethod
+    def from_json(cls, text: str, mimetype: str = "application/json") -> "CachedBody":
+        # Trailing newline matches what jsonify() sends
+        return cls(f"{text}\n".encode("utf-8"), mimetype)
+
+    def __len__(self) -> int:
+        return len(self.body)
+
+
+def is_not_modified(etag: str) -> bool:
+    """True when the current request's If-None-Match already names etag."""
+    return request.method in ("GET", "HEAD") and request.if_none_match.contains(etag)
+
+
+def cached_response(cached: CachedBody, max_age: int) -> Response:
+    """Build a 200 (or 304 for a matching conditional GET) from a CachedBody.
+
+    The 304 path never touches the body, so a revalidation costs a header
+    comparison only.
+    """
+    if is_not_modified(cached.etag):
+        response = Response(status=304)
+    else:
+        response = Response(cached.body, mimetype=cached.mimetype)
+    response.set_etag(cached.etag)
+    response.headers["Cache-Control"] = f"public, max-age={max_age}, must-revalidate"
+    return response
@@ -0,0 +1,51 @@
+"""Flask JSON provider backed by orjson, with the stdlib provider as fallback."""
+
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; Flask's stdlib provider is used instead
+    orjson = None
+
+# dumps() keyword arguments orjson can honour; anything else goes to the stdlib
+_ORJSON_KWARGS = {"default", "sort_keys", "ensure_ascii", "indent", "separators"}
+# orjson always writes compact output; jsonify() asks for exactly that
+_COMPACT_SEPARATORS = (",", ":")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with dumps/loads done by orjson.
+
+    Output matches the stdlib provider's content (sorted keys, the same
+    default() for dates, UUIDs and dataclasses) but non-ASCII text is written
+    as UTF-8 rather than \\u escapes, and indentation is either none or two
+    spaces. Calls asking for anything else fall back to the stdlib encoder.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        indent = kwargs.get("indent")
+        separators = kwargs.get("separators")
+        if (not _ORJSON_KWARGS.issuperset(kwargs) or indent not in (None, 2)
+                or (separators is not None and (indent or tuple(separators) != _COMPACT_SEPARATORS))):
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get("default", self.default), option=option).decode("utf-8")
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def install_json_provider(app) -> str:
+    """Switch app to orjson when it is installed (requirements-optional.txt); returns the encoder in use."""
+    if orjson is None:
+        return "json"
+    app.json = OrjsonProvider(app)
+    return "orjson"
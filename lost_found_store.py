@@ -0,0 +1,172 @@
+"""Lost-and-found reports on SQLite, with an index for matching lost items to found ones."""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import Database
+from pagination import PageKey, encode_cursor
+
+ITEM_FIELDS = ("title", "description", "category", "item_type", "location", "contact_method",
+               "contact_info", "image_url", "status", "created_at", "user_id")
+_COLUMNS = ("id",) + ITEM_FIELDS
+
+# A report is matched against active reports of the other kind
+OPPOSITE_TYPES = {"lost": "found", "found": "lost"}
+
+# Score each shared term adds to a candidate match, by kind of term
+CATEGORY_WEIGHT = 2.0
+LOCATION_WEIGHT = 2.0       # the whole normalized location is the same
+LOCATION_WORD_WEIGHT = 1.0  # one word of the location is shared
+WORD_WEIGHT = 1.0           # one word of the title or description is shared
+# Candidates scoring less are not worth showing. A candidate must also share
+# a title or description word: a shared category or place alone would pair
+# every phone lost in the library with every one found there.
+MIN_MATCH_SCORE = 3.0
+MATCH_LIMIT = 10
+# Title and description words indexed per item, so a pasted essay stays cheap
+MAX_WORDS_PER_ITEM = 40
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# Words that say nothing about which item it is
+_STOP_WORDS = frozenset("""
+    a an and are at by for from have has i in is it its lost found me my near of on or
+    please someone the this to was were with
+""".split())
+
+_SELECT = f"SELECT {', '.join(_COLUMNS)} FROM lost_found_items"
+_SELECT_PAGE = f"{_SELECT} WHERE id > ? ORDER BY id LIMIT ?"
+_SELECT_ONE = f"{_SELECT} WHERE id = ?"
+_SELECT_UNINDEXED = (f"{_SELECT} WHERE status = 'active' "
+                     "AND id NOT IN (SELECT item_id FROM lost_found_terms) ORDER BY id")
+_INSERT = f"INSERT INTO lost_found_items ({', '.join(ITEM_FIELDS)}) VALUES ({', '.join('?' * len(ITEM_FIELDS))})"
+_INSERT_TERM = "INSERT OR IGNORE INTO lost_found_terms (item_type, term, item_id, weight) VALUES (?, ?, ?, ?)"
+# Terms are passed as one JSON array so the statement text stays constant
+# (and cached) whatever their number; each lookup is a primary key range
+_SELECT_MATCHES = (
+    "WITH scores AS ("
+    "SELECT item_id, SUM(weight) AS score, group_concat(term, char(31)) AS terms "
+    "FROM lost_found_terms WHERE item_type = ? AND term IN (SELECT value FROM json_each(?)) "
+    "GROUP BY item_id HAVING SUM(weight) >= ? AND MAX(term >= 'w:' AND term < 'w;')) "
+    f"SELECT s.score, s.terms, {', '.join('i.' + col for col in _COLUMNS)} "
+    "FROM scores s JOIN lost_found_items i ON i.id = s.item_id WHERE i.status = 'active' "
+    "ORDER BY s.score DESC, i.id DESC LIMIT ?"
+)
+
+
+def _item(row) -> Dict[str, Any]:
+    return {key: row[key] for key in _COLUMNS}
+
+
+def _words(text: Optional[str]) -> List[str]:
+    """Casefolded words of text without stop words, plurals folded to the singular."""
+    words = []
+    for word in _TOKEN_RE.findall((text or "").casefold()):
+        if word in _STOP_WORDS or (len(word) < 2 and not word.isdigit()):
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def match_terms(item: Dict[str, Any]) -> Dict[str, float]:
+    """The index terms of an item and the score each adds to a match.
+
+    Terms are prefixed by kind, so "c:" (category), "l=" (whole location),
+    "l:" (location word) and "w:" (title or description word) never collide.
+    """
+    terms: Dict[str, float] = {}
+    category = " ".join(_TOKEN_RE.findall((item.get("category") or "").casefold()))
+    if category:
+        terms[f"c:{category}"] = CATEGORY_WEIGHT
+    location_words = _words(item.get("location"))
+    if location_words:
+        terms[f"l={' '.join(location_words)}"] = LOCATION_WEIGHT
+        for word in location_words:
+            terms[f"l:{word}"] = LOCATION_WORD_WEIGHT
+    words = dict.fromkeys(_words(item.get("title")) + _words(item.get("description")))
+    for word in list(words)[:MAX_WORDS_PER_ITEM]:
+        terms[f"w:{word}"] = WORD_WEIGHT
+    return terms
+
+
+def _matched_on(terms: str) -> List[str]:
+    """Readable reasons for a match from the matched terms, strongest kinds first."""
+    reasons = {"category": False, "location": False}
+    words = []
+    for term in terms.split("\x1f"):
+        if term.startswith("c:"):
+            reasons["category"] = True
+        elif term.startswith(("l=", "l:")):
+            reasons["location"] = True
+        else:
+            words.append(term[2:])
+    return [reason for reason, shared in reasons.items() if shared] + sorted(words)
+
+
+class LostFoundStore:
+    """Reported items in the lost_found_items table, listed in report order.
+
+    Each active item's match terms sit in lost_found_terms under its own
+    item_type. Matching a report looks its terms up under the opposite type
+    and sums the weights per candidate, so it touches only the items that
+    share something with it rather than the whole board.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+        self._index_missing()
+
+    def _index_missing(self) -> None:
+        # Items reported before the index existed
+        with self.db.transaction() as conn:
+            for row in conn.execute(_SELECT_UNINDEXED).fetchall():
+                self._index(conn, _item(row))
+
+    @staticmethod
+    def _index(conn, item: Dict[str, Any]) -> None:
+        conn.executemany(_INSERT_TERM, [(item["item_type"], term, item["id"], weight)
+                                        for term, weight in match_terms(item).items()])
+
+    def __len__(self) -> int:
+        return self.db.query_one("SELECT COUNT(*) FROM lost_found_items")[0]
+
+    def page(self, limit: int, after: Optional[PageKey] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """One page of items plus the next cursor; the sort key is the id itself."""
+        after_id = after[1] if after is not None else 0
+        rows = self.db.query(_SELECT_PAGE, (after_id, limit + 1))
+        page = [_item(row) for row in rows[:limit]]
+        next_cursor = encode_cursor((page[-1]["id"], page[-1]["id"])) if len(rows) > limit else None
+        return page, next_cursor
+
+    def get(self, item_id: int) -> Optional[Dict[str, Any]]:
+        row = self.db.query_one(_SELECT_ONE, (item_id,))
+        return _item(row) if row else None
+
+    def create(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a new report and index it for matching; the database allocates its id."""
+        with self.db.transaction() as conn:
+            cur = conn.execute(_INSERT, [fields.get(f) for f in ITEM_FIELDS])
+            item = _item(conn.execute(_SELECT_ONE, (cur.lastrowid,)).fetchone())
+            if item["status"] == "active":
+                self._index(conn, item)
+        return item
+
+    def matches(self, item: Dict[str, Any], limit: int = MATCH_LIMIT) -> List[Dict[str, Any]]:
+        """Active items of the opposite type sharing enough with item, best first.
+
+        Each comes with its score and what it matched on ("category",
+        "location" and the shared words).
+        """
+        opposite = OPPOSITE_TYPES.get(item.get("item_type"))
+        terms = list(match_terms(item))
+        if opposite is None or not terms:
+            return []
+        rows = self.db.query(_SELECT_MATCHES, (opposite, json.dumps(terms), MIN_MATCH_SCORE, limit))
+        return [dict(_item(row), score=row["score"], matched_on=_matched_on(row["terms"])) for row in rows]
+
+    def delete(self, item_id: int) -> bool:
+        # lost_found_terms_delete drops the item's terms with it
+        with self.db.transaction() as conn:
+            return conn.execute("DELETE FROM lost_found_items WHERE id = ?", (item_id,)).rowcount > 0
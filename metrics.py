@@ -0,0 +1,287 @@
+"""In-process request metrics rendered in the Prometheus text format."""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from flask import request
+
+# Upper bounds in seconds; covers 304s and cached bodies through to slow writes
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds in bytes for request and response bodies
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152, 8388608)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Label value for requests that matched no route
+UNMATCHED_ENDPOINT = "unmatched"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Family:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, values: LabelValues = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_label_text(self.labels, v)} {_number(n)}" for v, n in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, values: LabelValues = (), amount: float = 1) -> None:
+        self.inc(values, -amount)
+
+
+class Histogram(_Family):
+    """Fixed-bucket histogram; observe() is a bisect and two additions under a lock."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (last is +Inf)..., sum]
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, values: LabelValues, amount: float) -> None:
+        index = bisect_left(self.buckets, amount)
+        with self._lock:
+            series = self._series.get(values)
+            if series is None:
+                series = self._series[values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((v, list(s)) for v, s in self._series.items())
+        lines = []
+        for values, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, values, le)} {cumulative}")
+            labels = _label_text(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+GaugeReading = Union[float, Dict[LabelValues, float]]
+
+
+class CallbackGauge(_Family):
+    """A gauge read at scrape time, for values the app already keeps."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], GaugeReading], labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self.read = read
+
+    def render(self) -> List[str]:
+        reading = self.read()
+        if not isinstance(reading, dict):
+            reading = {(): reading}
+        return [f"{self.name}{_label_text(self.labels, v)} {_number(n)}" for v, n in sorted(reading.items())]
+
+
+class CallbackCounter(CallbackGauge):
+    """A counter read at scrape time; read() must never go down while the process lives."""
+
+    kind = "counter"
+
+
+class Registry:
+    """The metric families one process exposes on /metrics."""
+
+    def __init__(self):
+        self._families: Dict[str, _Family] = {}
+
+    def register(self, family: _Family) -> _Family:
+        if family.name in self._families:
+            raise ValueError(f"Metric {family.name} is already registered")
+        self._families[family.name] = family
+        return family
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def gauge_callback(self, name: str, help_text: str, read: Callable[[], GaugeReading],
+                       labels: Sequence[str] = ()) -> CallbackGauge:
+        return self.register(CallbackGauge(name, help_text, read, labels))
+
+    def counter_callback(self, name: str, help_text: str, read: Callable[[], GaugeReading],
+                         labels: Sequence[str] = ()) -> CallbackCounter:
+        return self.register(CallbackCounter(name, help_text, read, labels))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self._families.values():
+            lines.extend(family.header())
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+class RequestMetrics:
+    """Times every request and counts it by endpoint, method and status.
+
+    Installed as the outermost WSGI layer, so the latency covers routing,
+    the handler, compression and sending the body. A before_request hook
+    labels the request with its Flask endpoint and counts it as in flight
+    until the response is closed. Event streams are timed to their first
+    chunk, since their full duration is however long the client stays.
+
+    Each process keeps its own numbers; under several gunicorn workers a
+    scrape sees the worker that answered it.
+    """
+
+    def __init__(self, registry: Registry):
+        self.registry = registry
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "Time from receiving a request to finishing its response.",
+            ("endpoint", "method"))
+        self.requests = registry.counter(
+            "http_requests_total", "Requests answered, by status code.", ("endpoint", "method", "status"))
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight", "Requests being handled or streamed right now.", ("endpoint",))
+        self.request_size = registry.histogram(
+            "http_request_size_bytes", "Request body sizes from Content-Length.", ("endpoint",), SIZE_BUCKETS)
+        self.response_size = registry.histogram(
+            "http_response_size_bytes", "Response body bytes sent, after compression.", ("endpoint",), SIZE_BUCKETS)
+
+    def init_app(self, app) -> None:
+        @app.before_request
+        def _label_request():
+            endpoint = request.endpoint or UNMATCHED_ENDPOINT
+            request.environ["metrics.endpoint"] = endpoint
+            self.in_flight.inc((endpoint,))
+
+        app.wsgi_app = _TimedApp(app.wsgi_app, self)
+        app.extensions["request_metrics"] = self
+
+    def record(self, endpoint: str, method: str, status: str, elapsed: float, sent: int,
+               received: Optional[int] = None) -> None:
+        """Count one finished request (in-flight accounting is up to the caller)."""
+        self.latency.observe((endpoint, method), elapsed)
+        self.requests.inc((endpoint, method, status))
+        self.response_size.observe((endpoint,), sent)
+        if received is not None:
+            self.request_size.observe((endpoint,), received)
+
+
+class _TimedApp:
+    def __init__(self, app: Callable, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    def __call__(self, environ, start_response):
+        start = time.perf_counter()
+        response_info: Dict[str, object] = {}
+
+        def record_start(status, headers, exc_info=None):
+            response_info["status"] = status.split(" ", 1)[0]
+            for name, value in headers:
+                if name.lower() == "content-type":
+                    response_info["stream"] = value.startswith("text/event-stream")
+                    break
+            return start_response(status, headers, exc_info)
+
+        try:
+            app_iter = self.app(environ, record_start)
+        except BaseException:
+            self._finish(environ, start, "500", 0)
+            raise
+        return _TimedIterable(app_iter, self, environ, start, response_info)
+
+    def _finish(self, environ, start: float, status: str, sent: int, elapsed: Optional[float] = None) -> None:
+        metrics = self.metrics
+        endpoint = environ.get("metrics.endpoint")
+        if endpoint is None:
+            # Never reached the app's request hooks (e.g. rejected by a middleware)
+            endpoint = UNMATCHED_ENDPOINT
+        else:
+            metrics.in_flight.dec((endpoint,))
+        if elapsed is None:
+            elapsed = time.perf_counter() - start
+        content_length = environ.get("CONTENT_LENGTH")
+        received = int(content_length) if content_length and content_length.isdigit() else None
+        metrics.record(endpoint, environ.get("REQUEST_METHOD", ""), status, elapsed, sent, received)
+
+
+class _TimedIterable:
+    """Passes the body through, counting bytes, and records the request on close()."""
+
+    def __init__(self, app_iter: Iterable[bytes], timed: _TimedApp, environ, start: float, response_info: Dict):
+        self._app_iter = app_iter
+        self._timed = timed
+        self._environ = environ
+        self._start = start
+        self._info = response_info
+        self._sent = 0
+        self._first_chunk: Optional[float] = None
+
+    def __iter__(self):
+        for chunk in self._app_iter:
+            if self._first_chunk is None:
+                self._first_chunk = time.perf_counter() - self._start
+            self._sent += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            if hasattr(self._app_iter, "close"):
+                self._app_iter.close()
+        finally:
+            elapsed = self._first_chunk if self._info.get("stream") else None
+            self._timed._finish(self._environ, self._start, str(self._info.get("status", "500")), self._sent, elapsed)
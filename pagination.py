@@ -0,0 +1,51 @@
+"""Opaque keyset cursors for paginated list endpoints."""
+
+import base64
+import json
+from typing import Mapping, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# (sort key, id): rows are ordered by it and a cursor resumes strictly after it
+PageKey = Tuple[float, int]
+
+
+def encode_cursor(key: PageKey) -> str:
+    """URL-safe token for the (sort key, id) of the last row of a page."""
+    raw = json.dumps([key[0], key[1]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> PageKey:
+    """Inverse of encode_cursor(); raises ValueError for anything it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        sort_key, item_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if isinstance(sort_key, bool) or not isinstance(sort_key, (int, float)) \
+            or isinstance(item_id, bool) or not isinstance(item_id, int):
+        raise ValueError("Invalid cursor")
+    return (sort_key, item_id)
+
+
+def parse_page_args(args: Mapping[str, str]) -> Tuple[int, Optional[PageKey]]:
+    """Read ?limit= and ?cursor= as (limit, key to resume after).
+
+    limit defaults to DEFAULT_PAGE_SIZE and is capped at MAX_PAGE_SIZE.
+    Raises ValueError with a client-facing message for bad values.
+    """
+    limit_arg = args.get("limit")
+    if limit_arg in (None, ""):
+        limit = DEFAULT_PAGE_SIZE
+    else:
+        try:
+            limit = int(limit_arg)
+        except ValueError:
+            raise ValueError("limit must be an integer")
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        limit = min(limit, MAX_PAGE_SIZE)
+    cursor = args.get("cursor")
+    return limit, decode_cursor(cursor) if cursor else None
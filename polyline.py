@@ -0,0 +1,85 @@
+"""Google encoded-polyline coordinates for compact geometry payloads."""
+
+from typing import Any, List, Optional, Sequence
+
+# ?format= values and the decimal precision each one encodes at
+POLYLINE_FORMATS = {"polyline": 5, "polyline6": 6}
+POLYLINE_MIMETYPE = "application/vnd.campus.polyline+json"
+
+
+def encode(coords: Sequence[Sequence[float]], precision: int = 5) -> str:
+    """Encode [[lat, lng], ...] as a Google encoded-polyline string."""
+    factor = 10 ** precision
+    out: List[str] = []
+    prev_lat = prev_lng = 0
+    for pt in coords:
+        lat = int(round(pt[0] * factor))
+        lng = int(round(pt[1] * factor))
+        _encode_value(lat - prev_lat, out)
+        _encode_value(lng - prev_lng, out)
+        prev_lat, prev_lng = lat, lng
+    return "".join(out)
+
+
+def _encode_value(value: int, out: List[str]) -> None:
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def decode(encoded: str, precision: int = 5) -> List[List[float]]:
+    """Inverse of encode(); used by tooling and benchmarks."""
+    factor = 10 ** precision
+    coords: List[List[float]] = []
+    index = lat = lng = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1F) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        coords.append([lat / factor, lng / factor])
+    return coords
+
+
+def encode_payload(payload: Any, precision: int = 5) -> Any:
+    """Copy of payload with every "coordinates" point list replaced by its encoding."""
+    if isinstance(payload, list):
+        return [encode_payload(item, precision) for item in payload]
+    if isinstance(payload, dict):
+        encoded = {}
+        for key, value in payload.items():
+            if key == "coordinates" and _is_point_list(value):
+                encoded[key] = encode(value, precision)
+            else:
+                encoded[key] = encode_payload(value, precision)
+        return encoded
+    return payload
+
+
+def _is_point_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(pt, (list, tuple)) and len(pt) >= 2 for pt in value)
+
+
+def negotiate_format(format_arg: Optional[str], accept_polyline: bool) -> Optional[str]:
+    """Resolve the requested coordinate format; "json" means plain arrays.
+
+    Raises ValueError for an unknown ?format= value.
+    """
+    if format_arg:
+        if format_arg == "json":
+            return None
+        if format_arg not in POLYLINE_FORMATS:
+            raise ValueError(format_arg)
+        return format_arg
+    return "polyline" if accept_polyline else None
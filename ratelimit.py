@@ -0,0 +1,76 @@
+"""In-memory token buckets and duplicate suppression, both bounded by LRU eviction."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+# Keys tracked per limiter; the least recently seen are forgotten first
+RATE_LIMIT_MAX_KEYS = 10000
+
+
+class TokenBucketLimiter:
+    """One bucket per key holding up to burst tokens, refilled at rate per second.
+
+    Buckets are refilled lazily from the time since their last use, so an
+    idle key costs nothing. A forgotten key starts again with a full bucket,
+    which only ever errs on the side of letting a request through.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.rejected = 0
+        # key -> [tokens, last refill time]
+        self._buckets: "OrderedDict[Hashable, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: Hashable, now: Optional[float] = None) -> Tuple[bool, float]:
+        """Take a token for key: (True, 0) if allowed, else (False, seconds until one is free)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0.0
+            self.rejected += 1
+            return False, (1 - bucket[0]) / self.rate
+
+
+class RecentKeys:
+    """Keys seen within the last window seconds, for coalescing repeats."""
+
+    def __init__(self, window: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.window = window
+        self.max_keys = max_keys
+        self.coalesced = 0
+        # key -> time first seen in the current window, oldest first
+        self._seen: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seen(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """True if key was recorded within the window; otherwise record it and return False."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            # Entries are in first-seen order, so expired ones are all at the front
+            while self._seen:
+                oldest_key, first_seen = next(iter(self._seen.items()))
+                if now - first_seen < self.window:
+                    break
+                del self._seen[oldest_key]
+            if key in self._seen:
+                self.coalesced += 1
+                return True
+            self._seen[key] = now
+            if len(self._seen) > self.max_keys:
+                self._seen.popitem(last=False)
+            return False
@@ -0,0 +1,466 @@
+"""Walking route engine over the campus road network in roads.geojson."""
+
+import os
+import heapq
+import math
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from spatial_index import GridIndex, LocalProjection, haversine_m, project_onto_segment
+
+WALKING_SPEED_MPS = 1.4
+# Dangling road ends closer than this to another road are joined to it
+ROUTE_JOIN_TOLERANCE_M = float(os.getenv("ROUTE_JOIN_TOLERANCE_M", "6"))
+# Points further than this from any road are considered off the network
+ROUTE_MAX_SNAP_M = float(os.getenv("ROUTE_MAX_SNAP_M", "1000"))
+EDGE_GRID_CELL_M = 50.0
+
+# (node a, node b, source line, metres along the line at a, metres along the line at b)
+_RawEdge = Tuple[int, int, int, float, float]
+
+
+def geojson_lines(data: Optional[Dict[str, Any]]) -> List[List[List[float]]]:
+    """Extract every LineString part from a GeoJSON object as [lng, lat] lists."""
+    if not data:
+        return []
+    dtype = data.get("type")
+    if dtype == "FeatureCollection":
+        lines: List[List[List[float]]] = []
+        for feat in data.get("features", []):
+            lines.extend(geojson_lines(feat))
+        return lines
+    if dtype == "Feature":
+        return geojson_lines(data.get("geometry") or {})
+    coords = data.get("coordinates") or []
+    if dtype == "LineString":
+        return [coords]
+    if dtype == "MultiLineString":
+        return list(coords)
+    return []
+
+
+class Snap:
+    """A point projected onto a graph edge."""
+
+    __slots__ = ("edge", "lat", "lng", "along", "offset", "origin")
+
+    def __init__(self, edge: int, lat: float, lng: float, along: float, offset: float,
+                 origin: Tuple[float, float]):
+        self.edge = edge        # edge id the point lies on
+        self.lat = lat          # snapped position
+        self.lng = lng
+        self.along = along      # metres from the edge's first node
+        self.offset = offset    # metres from the query point to the snapped position
+        self.origin = origin    # the query point itself
+
+
+class RoadGraph:
+    """Undirected node/edge graph of walkable roads, built once per roads file."""
+
+    def __init__(self, lines: List[List[List[float]]], join_tolerance: float = ROUTE_JOIN_TOLERANCE_M):
+        self.nodes: List[Tuple[float, float]] = []
+        self.edges: List[Tuple[int, int, float]] = []
+        self.adj: List[List[Tuple[int, float]]] = []
+        self.projection = LocalProjection.around((pt[1], pt[0]) for line in lines for pt in line if len(pt) >= 2)
+        self._xy: List[Tuple[float, float]] = []
+        self._node_ids: Dict[Tuple[float, float], int] = {}
+        self._edge_index = GridIndex(EDGE_GRID_CELL_M)
+        self._build(lines, join_tolerance)
+
+    @classmethod
+    def from_geojson(cls, data: Optional[Dict[str, Any]]) -> "RoadGraph":
+        return cls(geojson_lines(data))
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    # -----------------------------
+    # Construction
+    # -----------------------------
+
+    def _node(self, lat: float, lng: float) -> int:
+        key = (round(lat, 7), round(lng, 7))
+        node = self._node_ids.get(key)
+        if node is None:
+            node = len(self.nodes)
+            self._node_ids[key] = node
+            self.nodes.append((lat, lng))
+            self._xy.append(self.projection.to_xy(lat, lng))
+        return node
+
+    def _build(self, lines: List[List[List[float]]], join_tolerance: float) -> None:
+        # Raw edges remember their line and the span they cover along it, so a
+        # dangling end is never joined back onto its own neighbouring vertices.
+        raw: List[Optional[_RawEdge]] = []
+        line_ends: List[Tuple[int, int, float]] = []
+        for line_no, line in enumerate(lines):
+            path = [self._node(pt[1], pt[0]) for pt in line if isinstance(pt, (list, tuple)) and len(pt) >= 2]
+            path = [n for i, n in enumerate(path) if i == 0 or n != path[i - 1]]
+            if len(path) < 2:
+                continue
+            along = 0.0
+            for a, b in zip(path, path[1:]):
+                length = math.hypot(self._xy[b][0] - self._xy[a][0], self._xy[b][1] - self._xy[a][1])
+                self._add_raw_edge(raw, (a, b, line_no, along, along + length))
+                along += length
+            line_ends.append((path[0], line_no, 0.0))
+            line_ends.append((path[-1], line_no, along))
+
+        degree = [0] * len(self.nodes)
+        for e in raw:
+            degree[e[0]] += 1
+            degree[e[1]] += 1
+        dangling = [(node, line_no, end_along) for node, line_no, end_along in line_ends if degree[node] == 1]
+
+        # Hand-digitised roads rarely share exact vertices at junctions (and many
+        # are drawn as loops that don't quite close): connect each dangling end
+        # to the closest point of every road passing within the tolerance,
+        # including distant stretches of its own line.
+        min_self_gap = 3 * join_tolerance
+        for node, line_no, end_along in dangling:
+            x, y = self._xy[node]
+            closest: Dict[int, Tuple[float, int]] = {}
+            for eid in self._edge_index.query_bbox(x - join_tolerance, y - join_tolerance,
+                                                   x + join_tolerance, y + join_tolerance):
+                e = raw[eid]
+                if e is None or e[2] == -1 or node in (e[0], e[1]):
+                    continue
+                if e[2] == line_no and not (e[3] - end_along > min_self_gap or end_along - e[4] > min_self_gap):
+                    continue
+                ax, ay = self._xy[e[0]]
+                bx, by = self._xy[e[1]]
+                d = project_onto_segment(x, y, ax, ay, bx, by)[0]
+                if d <= join_tolerance and d < closest.get(e[2], (math.inf, -1))[0]:
+                    closest[e[2]] = (d, eid)
+
+            for _, eid in closest.values():
+                junction = self._split_at(raw, eid, x, y)
+                if junction != node:
+                    self._add_raw_edge(raw, (node, junction, -1, 0.0, 0.0))
+
+        self.adj = [[] for _ in self.nodes]
+        self._edge_index = GridIndex(EDGE_GRID_CELL_M)
+        seen = set()
+        for e in raw:
+            if e is None:
+                continue
+            a, b = e[0], e[1]
+            key = (a, b) if a < b else (b, a)
+            if key in seen:
+                continue
+            seen.add(key)
+            (lat1, lng1), (lat2, lng2) = self.nodes[a], self.nodes[b]
+            length = haversine_m(lat1, lng1, lat2, lng2)
+            eid = len(self.edges)
+            self.edges.append((a, b, length))
+            self.adj[a].append((b, length))
+            self.adj[b].append((a, length))
+            self._index_edge(eid, a, b)
+
+    def _split_at(self, raw: List[Optional[_RawEdge]], eid: int, x: float, y: float) -> int:
+        """Node on raw edge eid closest to (x, y), splitting the edge if needed."""
+        a, b, line_no, start_along, stop_along = raw[eid]
+        ax, ay = self._xy[a]
+        bx, by = self._xy[b]
+        _, t, px, py = project_onto_segment(x, y, ax, ay, bx, by)
+        seg_len = math.hypot(bx - ax, by - ay)
+        if t * seg_len < 1.0:
+            return a
+        if (1.0 - t) * seg_len < 1.0:
+            return b
+        lat, lng = self.projection.to_latlng(px, py)
+        junction = self._node(lat, lng)
+        split_along = start_along + t * (stop_along - start_along)
+        raw[eid] = None
+        self._add_raw_edge(raw, (a, junction, line_no, start_along, split_along))
+        self._add_raw_edge(raw, (junction, b, line_no, split_along, stop_along))
+        return junction
+
+    def _add_raw_edge(self, raw: List[Optional[_RawEdge]], edge: _RawEdge) -> None:
+        raw.append(edge)
+        self._index_edge(len(raw) - 1, edge[0], edge[1])
+
+    def _index_edge(self, eid: int, a: int, b: int) -> None:
+        (ax, ay), (bx, by) = self._xy[a], self._xy[b]
+        self._edge_index.insert(eid, min(ax, bx), min(ay, by), max(ax, bx), max(ay, by))
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+
+    def snap(self, lat: float, lng: float, max_distance: float = ROUTE_MAX_SNAP_M) -> Optional[Snap]:
+        """Project a point onto the nearest edge, or None if no edge is within max_distance."""
+        x, y = self.projection.to_xy(lat, lng)
+
+        def distance(eid: int) -> float:
+            a, b, _ = self.edges[eid]
+            ax, ay = self._xy[a]
+            bx, by = self._xy[b]
+            return project_onto_segment(x, y, ax, ay, bx, by)[0]
+
+        hits = self._edge_index.nearest(x, y, distance, k=1, max_distance=max_distance)
+        if not hits:
+            return None
+        offset, eid = hits[0]
+        a, b, length = self.edges[eid]
+        ax, ay = self._xy[a]
+        bx, by = self._xy[b]
+        _, t, px, py = project_onto_segment(x, y, ax, ay, bx, by)
+        slat, slng = self.projection.to_latlng(px, py)
+        return Snap(eid, slat, slng, t * length, offset, (lat, lng))
+
+    def snap_polygon(self, ring: Sequence[Sequence[float]], max_distance: float = ROUTE_MAX_SNAP_M) -> Optional[Snap]:
+        """Snap the ring vertex closest to the network, i.e. the road-facing side of a building."""
+        best: Optional[Snap] = None
+        for pt in ring:
+            snap = self.snap(pt[0], pt[1], max_distance)
+            if snap is not None and (best is None or snap.offset < best.offset):
+                best = snap
+        return best
+
+    def endpoint_costs(self, snap: Snap) -> Tuple[Tuple[int, float], Tuple[int, float]]:
+        """The two nodes of snap's edge with the walking distance from each to the snap point."""
+        a, b, length = self.edges[snap.edge]
+        return (a, snap.along), (b, length - snap.along)
+
+    def shortest_path(self, start: Snap, goal: Snap) -> Optional[Tuple[float, List[int]]]:
+        """A* from start to goal; returns (network metres, node ids between the two snaps)."""
+        best = math.inf
+        best_end: Optional[int] = None
+        if start.edge == goal.edge:
+            best = abs(start.along - goal.along)
+
+        goal_cost = {}
+        for node, cost in self.endpoint_costs(goal):
+            goal_cost[node] = min(cost, goal_cost.get(node, math.inf))
+
+        nodes = self.nodes
+        glat, glng = goal.lat, goal.lng
+        g_score: Dict[int, float] = {}
+        came_from: Dict[int, int] = {}
+        heap: List[Tuple[float, float, int]] = []
+        for node, cost in self.endpoint_costs(start):
+            if cost < g_score.get(node, math.inf):
+                g_score[node] = cost
+                came_from[node] = -1
+                lat, lng = nodes[node]
+                heapq.heappush(heap, (cost + haversine_m(lat, lng, glat, glng), cost, node))
+
+        while heap:
+            f, g, node = heapq.heappop(heap)
+            if f >= best:
+                break
+            if g > g_score[node]:
+                continue
+            tail = goal_cost.get(node)
+            if tail is not None and g + tail < best:
+                best = g + tail
+                best_end = node
+            for nxt, weight in self.adj[node]:
+                ng = g + weight
+                if ng < g_score.get(nxt, math.inf):
+                    g_score[nxt] = ng
+                    came_from[nxt] = node
+                    lat, lng = nodes[nxt]
+                    heapq.heappush(heap, (ng + haversine_m(lat, lng, glat, glng), ng, nxt))
+
+        if best == math.inf:
+            return None
+        path: List[int] = []
+        node = best_end if best_end is not None else -1
+        while node != -1:
+            path.append(node)
+            node = came_from[node]
+        path.reverse()
+        return best, path
+
+    def route(self, start: Snap, goal: Snap) -> Optional[Dict[str, Any]]:
+        """Walking route between two snaps as a JSON-ready dict, or None if disconnected."""
+        found = self.shortest_path(start, goal)
+        if found is None:
+            return None
+        network_m, path = found
+        return self.describe(start, goal, network_m, path)
+
+    def describe(self, start: Snap, goal: Snap, network_m: float, path: List[int]) -> Dict[str, Any]:
+        coordinates = []
+        if start.offset >= 1.0:
+            coordinates.append(list(start.origin))
+        coordinates.append([start.lat, start.lng])
+        coordinates.extend([list(self.nodes[n]) for n in path])
+        coordinates.append([goal.lat, goal.lng])
+        if goal.offset >= 1.0:
+            coordinates.append(list(goal.origin))
+        distance = start.offset + network_m + goal.offset
+        return {
+            "distance_m": round(distance, 1),
+            "duration_s": int(round(distance / WALKING_SPEED_MPS)),
+            "coordinates": coordinates,
+        }
+
+
+class Destination:
+    """A fixed routing endpoint: a building or a navigation quick link."""
+
+    __slots__ = ("key", "name", "snap")
+
+    def __init__(self, key: str, name: str, snap: Snap):
+        self.key = key
+        self.name = name
+        self.snap = snap
+
+
+class RouteTable:
+    """All-pairs shortest paths between fixed destinations, precomputed once.
+
+    For every source destination we run one full Dijkstra and keep only its
+    predecessor row (one int per graph node) plus the distance and final
+    network node towards every other destination. A route between two
+    destinations is then a walk back along the predecessor row.
+
+    aliases maps further names onto destination keys; they look up the
+    same row as the key itself.
+    """
+
+    def __init__(self, graph: RoadGraph, destinations: List[Destination],
+                 aliases: Optional[Dict[str, str]] = None):
+        self.graph = graph
+        self.destinations = destinations
+        self.index = {d.key: i for i, d in enumerate(destinations)}
+        for alias, key in (aliases or {}).items():
+            if key in self.index:
+                self.index.setdefault(alias, self.index[key])
+        n = len(destinations)
+        self.predecessors: List[array] = []
+        self.distances = array("d", [math.inf]) * (n * n)
+        # Last network node before each destination, -1 for same-edge hops
+        self.via = array("i", [-1]) * (n * n)
+        for i, src in enumerate(destinations):
+            dist, pred = self._dijkstra(src.snap)
+            self.predecessors.append(pred)
+            for j, dst in enumerate(destinations):
+                best = math.inf
+                via = -1
+                if src.snap.edge == dst.snap.edge:
+                    best = abs(src.snap.along - dst.snap.along)
+                for node, cost in graph.endpoint_costs(dst.snap):
+                    if dist[node] + cost < best:
+                        best = dist[node] + cost
+                        via = node
+                self.distances[i * n + j] = best
+                self.via[i * n + j] = via
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def describe_key(self, key: str) -> Dict[str, str]:
+        dest = self.destinations[self.index[key]]
+        return {"id": dest.key, "name": dest.name}
+
+    def _dijkstra(self, start: Snap) -> Tuple[array, array]:
+        dist = array("d", [math.inf]) * len(self.graph.nodes)
+        pred = array("i", [-1]) * len(self.graph.nodes)
+        heap: List[Tuple[float, int]] = []
+        for node, cost in self.graph.endpoint_costs(start):
+            if cost < dist[node]:
+                dist[node] = cost
+                heapq.heappush(heap, (cost, node))
+        adj = self.graph.adj
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            for nxt, weight in adj[node]:
+                nd = d + weight
+                if nd < dist[nxt]:
+                    dist[nxt] = nd
+                    pred[nxt] = node
+                    heapq.heappush(heap, (nd, nxt))
+        return dist, pred
+
+    def distance(self, src_key: str, dst_key: str) -> float:
+        n = len(self.destinations)
+        return self.distances[self.index[src_key] * n + self.index[dst_key]]
+
+    def route(self, src_key: str, dst_key: str) -> Optional[Dict[str, Any]]:
+        """Route between two destination keys by table lookup, or None if disconnected."""
+        i, j = self.index[src_key], self.index[dst_key]
+        n = len(self.destinations)
+        network_m = self.distances[i * n + j]
+        if network_m == math.inf:
+            return None
+        src, dst = self.destinations[i], self.destinations[j]
+        pred = self.predecessors[i]
+        path: List[int] = []
+        node = self.via[i * n + j]
+        while node != -1:
+            path.append(node)
+            node = pred[node]
+        path.reverse()
+        return self.graph.describe(src.snap, dst.snap, network_m, path)
+
+
+def route_destinations(snapshot, graph: RoadGraph) -> List[Destination]:
+    """Buildings plus navigation_config.json quick links, snapped onto graph."""
+    destinations: List[Destination] = []
+    seen = set()
+    for loc in snapshot.locations:
+        snap = graph.snap_polygon(loc["coordinates"])
+        if snap is not None and loc["id"] not in seen:
+            seen.add(loc["id"])
+            destinations.append(Destination(loc["id"], loc["name"], snap))
+
+    for link in _quick_links(snapshot):
+        if link.get("targetId") is not None:
+            # Links to a building route to the building itself (route_aliases)
+            continue
+        coords = link.get("coordinates")
+        key = str(link.get("id") or link.get("name") or "")
+        if not key or key in seen or not isinstance(coords, list) or len(coords) != 2:
+            continue
+        snap = graph.snap(float(coords[0]), float(coords[1]))
+        if snap is not None:
+            seen.add(key)
+            destinations.append(Destination(key, str(link.get("name") or key), snap))
+    return destinations
+
+
+def route_aliases(snapshot) -> Dict[str, str]:
+    """Names of quick links that point at a building, mapped to its id."""
+    return {str(link["name"]): str(link["targetId"]) for link in _quick_links(snapshot)
+            if link.get("targetId") is not None and link.get("name")}
+
+
+def _quick_links(snapshot) -> List[Dict[str, Any]]:
+    cfg = snapshot.raw.get("nav_config")
+    quick_links = cfg.get("quickLinks", []) if isinstance(cfg, dict) else []
+    return [link for link in quick_links if isinstance(link, dict)]
+
+
+def road_graph(snapshot) -> RoadGraph:
+    """The RoadGraph for a GeoSnapshot, built once per roads file version."""
+    return snapshot.derived("road_graph", lambda snap: RoadGraph.from_geojson(snap.raw["roads"]))
+
+
+def route_table(snapshot) -> RouteTable:
+    """The destination RouteTable for a GeoSnapshot, rebuilt whenever its files change."""
+    def build(snap) -> RouteTable:
+        graph = road_graph(snap)
+        return RouteTable(graph, route_destinations(snap, graph), route_aliases(snap))
+    return snapshot.derived("route_table", build)
+
+
+def parse_latlng(value: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Parse a "lat,lng" query value; None when it is not a valid coordinate pair."""
+    if not value:
+        return None
+    parts = value.split(",")
+    if len(parts) != 2:
+        return None
+    try:
+        lat, lng = float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
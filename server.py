@@ -1,22 +1,89 @@
 import os
 import json
+import logging
 from typing import Any, Dict, List, Optional
-from flask import Flask, jsonify, request, send_from_directory, render_template
+from flask import Flask, Response, jsonify, request, send_from_directory, render_template
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from datetime import datetime
-from werkzeug.utils import secure_filename
+
+from broadcast import SSE_RETRY_MS, Broadcaster, format_sse
+from compression import CompressionMiddleware
+from crowd import CrowdAggregator, CrowdVersions
+from database import Database
+from event_store import EventStore
+from geo_store import GeoStore
+from http_cache import CachedBody, cached_response
+from json_provider import install_json_provider
+from log_setup import configure_logging, dropped_records
+from lost_found_store import MATCH_LIMIT, LostFoundStore
+from metrics import PROMETHEUS_CONTENT_TYPE, Registry, RequestMetrics
+from pagination import MAX_PAGE_SIZE, parse_page_args
+from ratelimit import RecentKeys, TokenBucketLimiter
+from routing import parse_latlng, route_table
+from sessions import SESSION_REVOCATION, RevokedSessions, SessionTokens, session_secret
+from spatial_index import location_index
+from static_assets import IMMUTABLE_MAX_AGE, AssetRegistry, asset_response
+from simplify import layer_levels, parse_bbox, zoom_band
+from polyline import POLYLINE_FORMATS, POLYLINE_MIMETYPE, encode_payload, negotiate_format
+from uploads import UnsupportedImage, UploadStore, UploadTooLarge
+from user_store import UserStore
 
 DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.getcwd(), "data"))
 UPLOAD_FOLDER = os.path.join(os.getcwd(), "static", "uploads")
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 MAX_IMAGE_FILESIZE_MB = 5 # 5 MB
+# Room for the other form fields and multipart framing around the image
+MAX_REPORT_FORM_OVERHEAD = 64 * 1024
 BOUNDARY_PATH = os.path.join(DATA_DIR, "campus_boundary.geojson")
 BUILDINGS_PATH = os.path.join(DATA_DIR, "buildings.geojson")
 NAV_CONFIG_PATH = os.path.join(DATA_DIR, "navigation_config.json")
 ROADS_PATH = os.path.join(DATA_DIR, "roads.geojson")
-
-# In-memory storage for events
-events = [
+# SQLite file holding events, lost & found items, users and logouts; shared by all workers
+DATABASE_PATH = os.getenv("DATABASE_PATH", os.path.join(DATA_DIR, "campus.db"))
+
+# Parsed geo data shared by every request; re-parsed only when a file changes
+geo_store = GeoStore(BOUNDARY_PATH, BUILDINGS_PATH, ROADS_PATH, NAV_CONFIG_PATH)
+# Seconds browsers may reuse geo responses before revalidating with If-None-Match
+GEO_CACHE_MAX_AGE = int(os.getenv("GEO_CACHE_MAX_AGE", "60"))
+MAX_NEAREST_LOCATIONS = 50
+# Seconds browsers may reuse the cafeteria menu before revalidating it
+MENU_CACHE_MAX_AGE = int(os.getenv("MENU_CACHE_MAX_AGE", "3600"))
+# Proxies in front of the app whose X-Forwarded-For can be trusted. Render
+# puts one in front; without it every client shares the proxy's address
+# (and so one crowd report bucket). Set 0 when clients connect directly,
+# or they could pick their own address.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))
+# Crowd reports: a burst, then one per interval, per client IP and per user.
+# The IP limit is loose because a whole hostel can share one address.
+CROWD_REPORT_IP_BURST = int(os.getenv("CROWD_REPORT_IP_BURST", "30"))
+CROWD_REPORT_IP_INTERVAL = float(os.getenv("CROWD_REPORT_IP_INTERVAL", "2"))
+CROWD_REPORT_USER_BURST = int(os.getenv("CROWD_REPORT_USER_BURST", "3"))
+CROWD_REPORT_USER_INTERVAL = float(os.getenv("CROWD_REPORT_USER_INTERVAL", "30"))
+# Identical reports (user, cafeteria, rush time) within this many seconds count once
+CROWD_REPORT_DEDUP_SECONDS = float(os.getenv("CROWD_REPORT_DEDUP_SECONDS", "120"))
+# Whether pages should hold /api/cafeteria/stream open. Each open stream
+# occupies a sync gunicorn worker for as long as the tab stays open, so
+# pages poll /api/cafeteria/crowd?since= instead unless this is on. Turn it
+# on for gthread workers; the ASGI entry point (asgi.py) turns it on itself.
+CROWD_STREAMING = os.getenv("CROWD_STREAMING", "0") == "1"
+# Pagination metadata sent alongside bare-list JSON responses
+PAGINATION_HEADERS = ["X-Next-Cursor", "X-Total-Count"]
+PLACEHOLDER_BOUNDARY = {"id": "campus", "name": "Campus (placeholder)", "coordinates": []}
+
+logger = logging.getLogger(__name__)
+
+# Persistent storage; connections are opened per thread on first use
+database = Database(DATABASE_PATH)
+event_store = EventStore(database)
+lost_found_store = LostFoundStore(database)
+user_store = UserStore(database)
+session_tokens = SessionTokens(session_secret(database),
+                               revoked=RevokedSessions(database) if SESSION_REVOCATION else None)
+upload_store = UploadStore(UPLOAD_FOLDER, "/static/uploads", MAX_IMAGE_FILESIZE_MB * 1024 * 1024)
+
+# Events inserted the first time the database is created
+SEED_EVENTS = [
     {
         'id': 1,
         'name': 'Annual Sports Meet',
@@ -96,11 +163,6 @@ events = [
         'status': 'ongoing'
     }
 ]
-next_event_id = 7
-
-# Lost & Found data
-lost_found_items: List[Dict[str, Any]] = []
-next_item_id = 1
 
 # Cafeteria data and user reporting system
 cafeteria_data = {
@@ -335,28 +397,156 @@ cafeteria_data = {
 user_reports = {}
 crowd_history = {}
 
+# Live crowd updates pushed to /api/cafeteria/stream clients, and the
+# versions /api/cafeteria/crowd?since= compares against
+crowd_broadcaster = Broadcaster()
+crowd_versions = CrowdVersions(cafeteria_data)
+# Rolling rush-time estimate per cafeteria, seeded with the configured default
+crowd_aggregators = {
+    cafeteria_id: CrowdAggregator(initial=cafeteria['current_rush_time'])
+    for cafeteria_id, cafeteria in cafeteria_data.items()
+}
+RECENT_CROWD_REPORTS = 10
+# Per-process limits on who may post crowd reports, and how often
+crowd_report_ip_limiter = TokenBucketLimiter(1 / CROWD_REPORT_IP_INTERVAL, CROWD_REPORT_IP_BURST)
+crowd_report_user_limiter = TokenBucketLimiter(1 / CROWD_REPORT_USER_INTERVAL, CROWD_REPORT_USER_BURST)
+recent_crowd_reports = RecentKeys(CROWD_REPORT_DEDUP_SECONDS)
+
+
+def crowd_update(cafeteria_id):
+    """The crowd fields of one cafeteria, as pushed to stream clients"""
+    cafeteria = cafeteria_data[cafeteria_id]
+    reports = cafeteria['crowd_reports']
+    return {
+        'cafeteria_id': cafeteria_id,
+        'current_rush_time': cafeteria['current_rush_time'],
+        'last_updated': cafeteria['last_updated'],
+        'total_reports': cafeteria['total_reports'],
+        'latest_report': reports[-1] if reports else None
+    }
+
+
+def crowd_poll(since_arg: Optional[str]):
+    """(status, payload) for a crowd poll: 200 with what changed after version since_arg,
+    304 (payload None) when nothing did, 400 for a malformed version."""
+    version = crowd_versions.version
+    if since_arg is None:
+        changed = list(cafeteria_data)
+    else:
+        try:
+            since = int(since_arg)
+        except ValueError:
+            return 400, {'success': False, 'message': 'since must be an integer version'}
+        if since == version:
+            return 304, None
+        changed = crowd_versions.changed_since(since)
+    return 200, {
+        'success': True,
+        'version': version,
+        'stream': CROWD_STREAMING,
+        'data': {cafeteria_id: crowd_update(cafeteria_id) for cafeteria_id in changed}
+    }
+
+
+def crowd_stream_preamble() -> List[str]:
+    """The first chunks of a crowd stream: the retry hint and every cafeteria's numbers."""
+    return [f"retry: {SSE_RETRY_MS}\n\n"] + [
+        format_sse(None, 'crowd', json.dumps(crowd_update(cafeteria_id))) for cafeteria_id in cafeteria_data
+    ]
+
 # User management system
-users = {}  # In-memory user storage: {register_number: {password, year, branch, created_at}}
-user_sessions = {}  # Simple session management: {session_id: register_number}
 
 
 
 
 def create_app() -> Flask:
     """Create and configure the Flask application."""
+    # Log records are written by a background thread, never on the request path
+    configure_logging()
     app = Flask(__name__)
+    # orjson when installed; the stdlib encoder otherwise
+    install_json_provider(app)
 
-    global lost_found_items, next_item_id
-    lost_found_items = [] # Ensure lost_found_items is empty on app start
-    next_item_id = 1 # Reset item ID on app start
-    print(f"DEBUG: lost_found_items initialized to: {lost_found_items}", flush=True)
+    # Create the schema (if needed) and the sample events on a brand-new database
+    event_store.seed(SEED_EVENTS)
 
     # Configure upload folder and max content length
     app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB limit
 
+    # gzip/brotli for JSON and text responses; bodies with an ETag are
+    # compressed once per version and served from cache afterwards
+    compression = CompressionMiddleware(app.wsgi_app)
+    app.wsgi_app = compression
+    # Shared with asgi.py's native routes, so one budget covers both
+    app.extensions["compressed_body_cache"] = compression.cache
+
+    # Per-endpoint latency, status, in-flight and size metrics on /metrics.
+    # Wraps the compression layer so the timings include it.
+    metrics_registry = Registry()
+    RequestMetrics(metrics_registry).init_app(app)
+    metrics_registry.gauge_callback(
+        "campus_events", "Events in the database.", lambda: len(event_store))
+    metrics_registry.gauge_callback(
+        "campus_lost_found_items", "Active lost and found items.", lambda: len(lost_found_store))
+    metrics_registry.counter_callback(
+        "cafeteria_crowd_reports_total", "Crowd reports accepted since this process started.",
+        lambda: {(cid,): c['total_reports'] for cid, c in cafeteria_data.items()}, ("cafeteria",))
+    metrics_registry.gauge_callback(
+        "cafeteria_crowd_report_rate_per_minute", "Crowd reports per minute over the rolling window.",
+        lambda: {(cid,): round(agg.report_rate(), 3) for cid, agg in crowd_aggregators.items()}, ("cafeteria",))
+    metrics_registry.gauge_callback(
+        "cafeteria_rush_time_minutes", "Current rush-time estimate.",
+        lambda: {(cid,): c['current_rush_time'] for cid, c in cafeteria_data.items()}, ("cafeteria",))
+    metrics_registry.counter_callback(
+        "log_records_dropped_total", "Log records discarded because the log queue was full.", dropped_records)
+    metrics_registry.counter_callback(
+        "crowd_reports_rejected_total", "Crowd reports refused by a rate limit since start.",
+        lambda: {("ip",): crowd_report_ip_limiter.rejected, ("user",): crowd_report_user_limiter.rejected},
+        ("limit",))
+    metrics_registry.counter_callback(
+        "crowd_reports_coalesced_total", "Repeat crowd reports acknowledged without being counted.",
+        lambda: recent_crowd_reports.coalesced)
+
     # Enable CORS for all routes (adjust origins for production as needed)
-    CORS(app, resources={r"/*": {"origins": "*"}})
+    CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=PAGINATION_HEADERS + ["Retry-After"])
+
+    # Take the client address from X-Forwarded-For when behind a known proxy,
+    # so per-IP rate limits see students rather than the proxy
+    if TRUSTED_PROXY_HOPS:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
+
+    # Parse the geo data files and precompute the road graph, route table,
+    # building index and zoom levels up front so the first map load doesn't
+    # pay for it
+    snapshot = geo_store.snapshot()
+    route_table(snapshot)
+    location_index(snapshot)
+    layer_levels(snapshot, "locations")
+    layer_levels(snapshot, "roads")
+
+    # Pages and the stylesheet are served from memory with prebuilt gzip/brotli
+    # variants. Pages link the stylesheet by fingerprint so it can be cached
+    # for good and still update on the next deploy.
+    static_assets = AssetRegistry()
+    static_assets.add("style.css", os.path.join(app.static_folder, "style.css"), "text/css")
+
+    def _fingerprint_stylesheet(body):
+        css = static_assets.get("style.css")
+        if css is None:
+            return body
+        return body.replace(b'/static/style.css"', f'/static/style.css?v={css.fingerprint}"'.encode())
+
+    for page in ("index.html", "map.html", "events.html", "cafeteria.html", "lost_found.html"):
+        static_assets.add(page, os.path.join(app.root_path, "templates", page), "text/html",
+                          rewrite=_fingerprint_stylesheet, depends=("style.css",))
+    static_assets.warm()
+
+    def _page_response(name):
+        asset = static_assets.get(name)
+        if asset is None:
+            return jsonify({"error": "Not found"}), 404
+        return asset_response(asset)
 
     # -----------------------------
     # User Management Routes
@@ -379,18 +569,13 @@ def create_app() -> Flask:
         if not all([register_number, password, year, branch]):
             return jsonify({"success": False, "message": "All fields are required"}), 400
 
-        # Check if user already exists
-        if register_number in users:
+        # Create new user, unless the register number is taken
+        # (password stored as given; in production, this should be hashed)
+        created = user_store.create(register_number, password, year, branch,
+                                    datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        if not created:
             return jsonify({"success": False, "message": "User already exists"}), 400
 
-        # Create new user
-        users[register_number] = {
-            'password': password,  # In production, this should be hashed
-            'year': year,
-            'branch': branch,
-            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-
         return jsonify({
             "success": True,
             "message": "Account created successfully!",
@@ -417,19 +602,18 @@ def create_app() -> Flask:
             return jsonify({"success": False, "message": "Register number and password are required"}), 400
 
         # Check if user exists and password matches
-        if register_number not in users or users[register_number]['password'] != password:
+        user_info = user_store.get(register_number)
+        if not user_info or user_info['password'] != password:
             return jsonify({"success": False, "message": "Invalid credentials"}), 401
 
-        # Create simple session (in production, use proper session management)
-        import uuid
-        session_id = str(uuid.uuid4())
-        user_sessions[session_id] = register_number
+        # A signed token any worker can check; nothing is stored per login
+        session_id, expires_at = session_tokens.issue(register_number)
 
-        user_info = users[register_number]
         return jsonify({
             "success": True,
             "message": "Login successful!",
             "session_id": session_id,
+            "expires_at": expires_at,
             "user": {
                 "register_number": register_number,
                 "year": user_info['year'],
@@ -437,70 +621,228 @@ def create_app() -> Flask:
             }
         }), 200
 
+    def _bearer_token():
+        """The session_id sent as "Authorization: Bearer <session_id>", if any."""
+        auth = request.headers.get("Authorization", "")
+        return auth[len("Bearer "):].strip() if auth.startswith("Bearer ") else None
+
+    def _session_claims():
+        return session_tokens.verify(_bearer_token())
+
+    @app.route("/api/auth/me", methods=["GET"])
+    def current_user():
+        """The logged-in user for the request's session token"""
+        claims = _session_claims()
+        user_info = user_store.get(claims["sub"]) if claims else None
+        if not user_info:
+            return jsonify({"success": False, "message": "Not logged in"}), 401
+        return jsonify({
+            "success": True,
+            "expires_at": claims["exp"],
+            "user": {
+                "register_number": user_info['register_number'],
+                "year": user_info['year'],
+                "branch": user_info['branch']
+            }
+        }), 200
+
+    @app.route("/api/auth/logout", methods=["POST"])
+    def logout_user():
+        """End a session before its token expires"""
+        if not session_tokens.revoke(_bearer_token()):
+            return jsonify({"success": False, "message": "Not logged in"}), 401
+        if session_tokens.revoked is None:
+            # SESSION_REVOCATION=0: the client forgets the token, the server cannot
+            return jsonify({
+                "success": True,
+                "revoked": False,
+                "message": "Logged out. This token stays valid until it expires."
+            }), 200
+        return jsonify({"success": True, "revoked": True, "message": "Logged out"}), 200
+
     @app.route("/health", methods=["GET"])
     def health():
         return jsonify({"status": "Backend is running"}), 200
 
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(metrics_registry.render(), content_type=PROMETHEUS_CONTENT_TYPE,
+                        headers={"Cache-Control": "no-store"})
+
     # Home page at /
     @app.route("/", methods=["GET"])
     def home_page():
-        return send_from_directory("templates", "index.html")
+        return _page_response("index.html")
 
 
     # Serve Map at /map
     @app.route("/map", methods=["GET"])
     def map_page():
-        return send_from_directory("templates", "map.html")
+        return _page_response("map.html")
+
 
+    def _coordinate_format():
+        """The coordinate format asked for via ?format= or Accept (None for plain arrays)."""
+        accept_polyline = request.accept_mimetypes.best_match(["application/json", POLYLINE_MIMETYPE]) == POLYLINE_MIMETYPE
+        return negotiate_format(request.args.get("format"), accept_polyline)
+
+    def _bad_format_response():
+        return jsonify({"error": f"format must be one of: json, {', '.join(POLYLINE_FORMATS)}"}), 400
+
+    def _geo_json_response(key: str, build):
+        """Serve build(snapshot) as JSON, serialized once per data version and format."""
+        try:
+            fmt = _coordinate_format()
+        except ValueError:
+            return _bad_format_response()
+        mimetype = "application/json"
+        if fmt is not None:
+            key = f"{key}:{fmt}"
+            plain = build
+            build = lambda snap: encode_payload(plain(snap), POLYLINE_FORMATS[fmt])
+            mimetype = POLYLINE_MIMETYPE
+        snapshot = geo_store.snapshot()
+        cached = snapshot.derived(f"json:{key}",
+                                  lambda snap: CachedBody.from_json(app.json.dumps(build(snap)), mimetype))
+        response = cached_response(cached, GEO_CACHE_MAX_AGE)
+        response.vary.add("Accept")
+        return response
+
+    def _geo_layer_response(layer: str):
+        """Serve a map layer, optionally simplified for ?zoom= and clipped to ?bbox=."""
+        bbox_arg = request.args.get("bbox")
+        zoom = request.args.get("zoom", type=float)
+        band = zoom_band(zoom) if zoom is not None else None
+        if bbox_arg is None:
+            # Whole-layer zoom levels are as cacheable as the full layer
+            if band is None:
+                return _geo_json_response(layer, lambda snap: getattr(snap, layer))
+            return _geo_json_response(f"{layer}:z{band}", lambda snap: layer_levels(snap, layer).level(zoom))
+        bbox = parse_bbox(bbox_arg)
+        if bbox is None:
+            return jsonify({"error": "bbox must be minLng,minLat,maxLng,maxLat"}), 400
+        try:
+            fmt = _coordinate_format()
+        except ValueError:
+            return _bad_format_response()
+
+        snapshot = geo_store.snapshot()
+        levels = layer_levels(snapshot, layer)
+        if fmt is None:
+            features = levels.level(zoom)
+        else:
+            # Encoded features are cached per level so clipping is just a pick
+            features = snapshot.derived(f"{fmt}:{layer}:z{band}",
+                                        lambda snap: encode_payload(levels.level(zoom), POLYLINE_FORMATS[fmt]))
+        response = jsonify([features[i] for i in levels.indices(bbox)])
+        if fmt is not None:
+            response.mimetype = POLYLINE_MIMETYPE
+        response.vary.add("Accept")
+        return response, 200
 
     @app.route("/api/campus/boundary", methods=["GET"])
     def get_campus_boundary():
-        boundary = _load_campus_boundary()
-        if boundary is None:
-            return jsonify({"id": "campus", "name": "Campus (placeholder)", "coordinates": []}), 200
-        return jsonify(boundary), 200
+        return _geo_json_response("boundary", lambda snap: snap.boundary or PLACEHOLDER_BOUNDARY)
 
     @app.route("/api/locations", methods=["GET"])
     def get_locations():
-        locations = _load_locations()
-        return jsonify(locations), 200
+        return _geo_layer_response("locations")
+
+    @app.route("/api/locations/at", methods=["GET"])
+    def get_location_at():
+        """The building containing ?lat=&lng=, innermost first if several overlap."""
+        lat = request.args.get("lat", type=float)
+        lng = request.args.get("lng", type=float)
+        if lat is None or lng is None:
+            return jsonify({"error": "lat and lng are required"}), 400
+        hits = location_index(geo_store.snapshot()).containing(lat, lng)
+        if not hits:
+            return jsonify({"error": "No building at this location"}), 404
+        return jsonify(hits[0]), 200
+
+    @app.route("/api/locations/nearest", methods=["GET"])
+    def get_nearest_locations():
+        """The k buildings closest to ?lat=&lng= by distance to their outline."""
+        lat = request.args.get("lat", type=float)
+        lng = request.args.get("lng", type=float)
+        k = request.args.get("k", default=5, type=int)
+        if lat is None or lng is None:
+            return jsonify({"error": "lat and lng are required"}), 400
+        k = max(1, min(k, MAX_NEAREST_LOCATIONS))
+        nearest = location_index(geo_store.snapshot()).nearest(lat, lng, k)
+        return jsonify([dict(loc, distance_m=round(d, 1)) for d, loc in nearest]), 200
 
     @app.route("/api/locations/<loc_id>", methods=["GET"])
     def get_location_by_id(loc_id: str):
-        for loc in _load_locations():
-            if str(loc.get("id")) == str(loc_id):
-                return jsonify(loc), 200
-        return jsonify({"error": "Location not found"}), 404
+        loc = geo_store.snapshot().get_location(loc_id)
+        if loc is None:
+            return jsonify({"error": "Location not found"}), 404
+        return jsonify(loc), 200
 
 
 
     @app.route("/api/roads", methods=["GET"])
     def get_roads():
         """API endpoint to get roads data."""
-        roads = _load_roads()
-        return jsonify(roads), 200
+        return _geo_layer_response("roads")
 
 
 
     @app.route("/api/navigation/config", methods=["GET"])
     def get_navigation_config():
-        cfg = _load_nav_config()
-        return jsonify(cfg), 200
+        return _geo_json_response("config", lambda snap: snap.nav_config)
 
 
 
     @app.route("/api/navigation/all", methods=["GET"])
     def get_navigation_all():
-        boundary = _load_campus_boundary()
-        if boundary is None:
-            boundary = {"id": "campus", "name": "Campus (placeholder)", "coordinates": []}
-        locations = _load_locations()
-        cfg = _load_nav_config()
-        return jsonify({
-            "config": cfg,
-            "boundary": boundary,
-            "locations": locations,
-        }), 200
+        return _geo_json_response("all", lambda snap: {
+            "config": snap.nav_config,
+            "boundary": snap.boundary or PLACEHOLDER_BOUNDARY,
+            "locations": snap.locations,
+        })
+
+    @app.route("/api/navigation/route", methods=["GET"])
+    def get_navigation_route():
+        """Walking route between two points, each a lat,lng pair or a destination id.
+
+        Destination ids are building ids and quick link names; routes between two
+        of them come straight from the precomputed route table.
+        """
+        source = request.args.get("from", "").strip()
+        target = request.args.get("to", "").strip()
+        if not source or not target:
+            return jsonify({"error": "Expected from=<lat,lng or id> and to=<lat,lng or id>"}), 400
+
+        snapshot = geo_store.snapshot()
+        table = route_table(snapshot)
+        if source in table and target in table:
+            route = table.route(source, target)
+            start_info, goal_info = table.describe_key(source), table.describe_key(target)
+        else:
+            start, start_info = _route_endpoint(snapshot, table, source)
+            goal, goal_info = _route_endpoint(snapshot, table, target)
+            if start_info is None or goal_info is None:
+                return jsonify({"error": "Location not found"}), 404
+            route = table.graph.route(start, goal) if start is not None and goal is not None else None
+
+        if route is None:
+            return jsonify({"error": "No walking route found"}), 404
+        route["from"] = start_info
+        route["to"] = goal_info
+        return jsonify(route), 200
+
+    def _route_endpoint(snapshot, table, value: str):
+        """Resolve a from/to value into (snap or None, JSON description or None if unknown)."""
+        point = parse_latlng(value)
+        if point is not None:
+            return table.graph.snap(*point), list(point)
+        if value in table:
+            return table.destinations[table.index[value]].snap, table.describe_key(value)
+        loc = snapshot.get_location(value)
+        if loc is None:
+            return None, None
+        return table.graph.snap_polygon(loc["coordinates"]), {"id": loc["id"], "name": loc["name"]}
 
     # -----------------------------
     # Events Routes
@@ -509,7 +851,7 @@ def create_app() -> Flask:
     # Serve Events page at /events
     @app.route("/events", methods=["GET"])
     def events_page():
-        return send_from_directory("templates", "events.html")
+        return _page_response("events.html")
 
     # Comprehensive Events API Routes
     @app.route("/api/events", methods=["GET", "POST"])
@@ -519,11 +861,22 @@ def create_app() -> Flask:
         elif request.method == "POST":
             return create_event()
 
+    def _paged_list_response(page, next_cursor, total):
+        resp = jsonify(page)
+        resp.headers["X-Total-Count"] = str(total)
+        if next_cursor:
+            resp.headers["X-Next-Cursor"] = next_cursor
+        return resp, 200
+
     def get_events():
-        return jsonify(events), 200
+        try:
+            limit, after = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        page, next_cursor = event_store.page(limit, after)
+        return _paged_list_response(page, next_cursor, len(event_store))
 
     def create_event():
-        global next_event_id
         data = request.get_json(silent=True) or {}
         
         # Validate required fields
@@ -531,8 +884,7 @@ def create_app() -> Flask:
             return jsonify({"error": "Missing required fields: name, date, location"}), 400
         
         # Create new event
-        new_event = {
-            'id': next_event_id,
+        new_event = event_store.create({
             'name': data['name'],
             'date': data['date'],
             'location': data['location'],
@@ -543,10 +895,7 @@ def create_app() -> Flask:
             'winners': data.get('winners', ''),
             'imageUrl': data.get('imageUrl', ''),
             'status': 'Upcoming'
-        }
-        
-        events.append(new_event)
-        next_event_id += 1
+        })
         
         return jsonify(new_event), 201
 
@@ -560,80 +909,56 @@ def create_app() -> Flask:
             return delete_event(event_id)
 
     def get_event(event_id):
-        event = next((e for e in events if e['id'] == event_id), None)
+        event = event_store.get(event_id)
         if not event:
             return jsonify({"error": "Event not found"}), 404
         return jsonify(event), 200
 
     def update_event(event_id):
-        event = next((e for e in events if e['id'] == event_id), None)
-        if not event:
+        if event_store.get(event_id) is None:
             return jsonify({"error": "Event not found"}), 404
         
         data = request.get_json(silent=True) or {}
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
-        # Update event fields
-        for key, value in data.items():
-            if key in event:
-                event[key] = value
-        
+        event = event_store.update(event_id, data)
+        if not event:
+            return jsonify({"error": "Event not found"}), 404
         return jsonify(event), 200
 
     def delete_event(event_id):
-        global events
-        event = next((e for e in events if e['id'] == event_id), None)
-        if not event:
+        if not event_store.delete(event_id):
             return jsonify({"error": "Event not found"}), 404
-        
-        events = [e for e in events if e['id'] != event_id]
         return jsonify({"message": "Event deleted"}), 200
 
     @app.route("/api/events/search", methods=["GET"])
     def search_events():
-        query = request.args.get('query', '').lower()
-        if not query:
-            return jsonify(events), 200
-        
-        filtered_events = [
-            e for e in events 
-            if query in e['name'].lower() or query in e['description'].lower()
-        ]
-        return jsonify(filtered_events), 200
+        query = request.args.get('query', '')
+        if not query.strip():
+            return get_events()
+        try:
+            limit, after = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        page, next_cursor = event_store.search(query, limit, after)
+        return _paged_list_response(page, next_cursor, event_store.search_count(query))
 
     @app.route("/api/events/filter", methods=["GET"])
     def filter_events():
         date_filter = request.args.get('date')
         location_filter = request.args.get('location')
-        
-        filtered_events = events.copy()
-        
-        if date_filter:
-            filtered_events = [
-                e for e in filtered_events 
-                if e['date'].startswith(date_filter)
-            ]
-        
-        if location_filter:
-            filtered_events = [
-                e for e in filtered_events 
-                if location_filter.lower() in e['location'].lower()
-            ]
-        
-        return jsonify(filtered_events), 200
+        try:
+            limit, after = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        page, next_cursor = event_store.filter(limit, after, date_filter, location_filter)
+        return _paged_list_response(page, next_cursor, event_store.filter_count(date_filter, location_filter))
 
     @app.route("/api/events/upcoming", methods=["GET"])
     def get_upcoming_events():
         today = datetime.now().strftime('%Y-%m-%d')
-        upcoming_events = [
-            e for e in events 
-            if e['date'] >= today
-        ]
-        
-        # Sort by date
-        upcoming_events.sort(key=lambda x: x['date'])
-        return jsonify(upcoming_events), 200
+        return jsonify(event_store.upcoming(today)), 200
 
     # -----------------------------
     # Cafeteria Routes
@@ -642,24 +967,54 @@ def create_app() -> Flask:
     # Serve Cafeteria page at /cafeteria
     @app.route("/cafeteria", methods=["GET"])
     def cafeteria_page():
-        return send_from_directory("templates", "cafeteria.html")
+        return _page_response("cafeteria.html")
 
     # Cafeteria crowd reporting API
     @app.route("/api/cafeteria/report-crowd", methods=["POST"])
     def report_crowd():
         """API endpoint for students to report crowd levels with gamification"""
-        data = request.get_json()
+        # Refuse floods before the body is even parsed: per client IP, and per
+        # user for requests carrying a session token
+        limited = _crowd_report_limited(crowd_report_ip_limiter, ('ip', request.remote_addr))
+        if limited is not None:
+            return limited
+        claims = _session_claims() if request.headers.get("Authorization") else None
+        if claims:
+            limited = _crowd_report_limited(crowd_report_user_limiter, ('user', claims['sub']))
+            if limited is not None:
+                return limited
+
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'success': False, 'message': 'Expected a JSON object'}), 400
         cafeteria_id = data.get('cafeteria_id')
         rush_time = data.get('rush_time')
-        user_id = data.get('user_id', 'anonymous')
+        user_id = claims['sub'] if claims else data.get('user_id', 'anonymous')
+        if not isinstance(user_id, str):
+            return jsonify({'success': False, 'message': 'user_id must be a string'}), 400
 
         if cafeteria_id in cafeteria_data and isinstance(rush_time, int) and 0 <= rush_time <= 60:
-            # Update cafeteria data
-            cafeteria_data[cafeteria_id]['current_rush_time'] = rush_time
-            cafeteria_data[cafeteria_id]['last_updated'] = datetime.now().strftime('%H:%M')
-            cafeteria_data[cafeteria_id]['total_reports'] += 1
+            # Self-declared user ids get their own bucket once we know them
+            # (anonymous reports share the per-IP limit only)
+            if not claims and user_id != 'anonymous':
+                limited = _crowd_report_limited(crowd_report_user_limiter, ('user', user_id))
+                if limited is not None:
+                    return limited
+
+            # The same report again from the same user within the window is
+            # acknowledged but not counted; a different rush time is a correction
+            if user_id != 'anonymous' and recent_crowd_reports.seen((user_id, cafeteria_id, rush_time)):
+                return jsonify({
+                    'success': True,
+                    'coalesced': True,
+                    'message': 'You already reported this cafeteria recently; thanks!',
+                    'data': {
+                        'cafeteria': cafeteria_data[cafeteria_id],
+                        'user_stats': user_reports.get(user_id),
+                        'crowd_level': get_crowd_level(rush_time)
+                    }
+                })
 
-            # Add to recent reports
             report = {
                 'user_id': user_id,
                 'rush_time': rush_time,
@@ -667,11 +1022,17 @@ def create_app() -> Flask:
                 'crowd_level': get_crowd_level(rush_time)
             }
 
-            cafeteria_data[cafeteria_id]['crowd_reports'].append(report)
+            # Fold the report into the rolling estimate rather than letting
+            # the latest single report win
+            aggregator = crowd_aggregators[cafeteria_id]
+            aggregator.add(rush_time, report)
+            cafeteria_data[cafeteria_id]['current_rush_time'] = aggregator.estimate()
+            cafeteria_data[cafeteria_id]['last_updated'] = datetime.now().strftime('%H:%M')
+            cafeteria_data[cafeteria_id]['total_reports'] += 1
+            cafeteria_data[cafeteria_id]['crowd_reports'] = aggregator.recent(RECENT_CROWD_REPORTS)
 
-            # Keep only last 10 reports
-            if len(cafeteria_data[cafeteria_id]['crowd_reports']) > 10:
-                cafeteria_data[cafeteria_id]['crowd_reports'] = cafeteria_data[cafeteria_id]['crowd_reports'][-10:]
+            crowd_versions.bump(cafeteria_id)
+            crowd_broadcaster.publish('crowd', crowd_update(cafeteria_id))
 
             # Update user reporting stats
             if user_id not in user_reports:
@@ -700,6 +1061,19 @@ def create_app() -> Flask:
             'message': 'Invalid cafeteria ID or rush time'
         }), 400
 
+    def _crowd_report_limited(limiter, key):
+        """A 429 response if key is out of tokens, else None."""
+        allowed, retry_after = limiter.acquire(key)
+        if allowed:
+            return None
+        response = jsonify({
+            'success': False,
+            'message': 'Too many crowd reports; please wait a moment and try again'
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, int(retry_after + 0.999)))
+        return response
+
     # Get user reporting statistics and badges
     @app.route("/api/user/stats/<user_id>")
     def get_user_stats(user_id):
@@ -719,6 +1093,44 @@ def create_app() -> Flask:
                 }
             })
 
+    # Live crowd updates as server-sent events
+    @app.route("/api/cafeteria/stream")
+    def stream_cafeteria_crowd():
+        def generate():
+            # Subscribe before taking the snapshot so no report falls in between
+            after = crowd_broadcaster.last_id
+            yield from crowd_stream_preamble()
+            yield from crowd_broadcaster.stream(after)
+
+        return Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            # Stop nginx-style proxies from buffering the stream
+            'X-Accel-Buffering': 'no'
+        })
+
+    # Crowd numbers only; ?since=<version> returns just what changed after it
+    @app.route("/api/cafeteria/crowd")
+    def get_cafeteria_crowd():
+        status, payload = crowd_poll(request.args.get('since'))
+        if status == 400:
+            return jsonify(payload), 400
+        response = Response(status=304) if payload is None else jsonify(payload)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    # The weekly menus, which only change with a deploy
+    menu_body = CachedBody.from_json(app.json.dumps({
+        'success': True,
+        'data': {
+            cafeteria_id: {'name': cafeteria['name'], 'menu': cafeteria['menu']}
+            for cafeteria_id, cafeteria in cafeteria_data.items()
+        }
+    }))
+
+    @app.route("/api/cafeteria/menu")
+    def get_cafeteria_menu():
+        return cached_response(menu_body, MENU_CACHE_MAX_AGE)
+
     # Get cafeteria status and menu
     @app.route("/api/cafeteria/status")
     def get_cafeteria_status():
@@ -734,24 +1146,33 @@ def create_app() -> Flask:
     # Serve Lost & Found page at /lost-found
     @app.route("/lost-found", methods=["GET"])
     def lost_found_page():
-        return send_from_directory("templates", "lost_found.html")
+        return _page_response("lost_found.html")
 
     # Get all lost and found items
     @app.route("/api/lost-found/items")
     def get_lost_found_items():
-        print(f"DEBUG: get_lost_found_items returning: {lost_found_items}", flush=True)
+        try:
+            limit, after = parse_page_args(request.args)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        page, next_cursor = lost_found_store.page(limit, after)
         return jsonify({
             'success': True,
-            'data': lost_found_items
+            'data': [with_image_renditions(item) for item in page],
+            'next_cursor': next_cursor,
+            'total': len(lost_found_store)
         })
 
     # Report a new lost or found item
     @app.route("/api/lost-found/report", methods=["POST"])
     def report_lost_found_item():
-        global next_item_id
-        
-        print(f"Request mimetype: {request.mimetype}", flush=True) # Debug print
+        logger.debug("Lost/found report with mimetype %s", request.mimetype)
         
+        # Refuse oversized bodies from the Content-Length header, before any of it is read
+        if request.content_length and \
+                request.content_length > MAX_IMAGE_FILESIZE_MB * 1024 * 1024 + MAX_REPORT_FORM_OVERHEAD:
+            return jsonify({'success': False, 'message': f'Image file size exceeds {MAX_IMAGE_FILESIZE_MB} MB limit'}), 400
+
         try:
             image_url = ''
             if 'image' in request.files and request.files['image'].filename != '':
@@ -760,24 +1181,18 @@ def create_app() -> Flask:
                     return jsonify({'success': False, 'message': 'No image file provided'}), 400
                 if not allowed_file(image_file.filename):
                     return jsonify({'success': False, 'message': 'Invalid file type. Allowed types: png, jpg, jpeg, gif'}), 400
-                
-                # Check file size
-                image_file.seek(0, os.SEEK_END)
-                file_size = image_file.tell()
-                image_file.seek(0) # Reset file pointer to the beginning
-                if file_size > MAX_IMAGE_FILESIZE_MB * 1024 * 1024:
-                    return jsonify({'success': False, 'message': f'Image file size exceeds {MAX_IMAGE_FILESIZE_MB} MB limit'}), 400
 
-                filename = secure_filename(image_file.filename)
-                os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                file_path = os.path.join(UPLOAD_FOLDER, filename)
-                image_file.save(file_path)
-                image_url = f"/static/uploads/{filename}"
+                # Stored under its content hash; thumbnails are made in the background
+                try:
+                    image_url = upload_store.save(image_file.stream)
+                except UploadTooLarge:
+                    return jsonify({'success': False, 'message': f'Image file size exceeds {MAX_IMAGE_FILESIZE_MB} MB limit'}), 400
+                except UnsupportedImage:
+                    return jsonify({'success': False, 'message': 'Invalid file type. Allowed types: png, jpg, jpeg, gif'}), 400
             
             data = request.form
             
-            new_item = {
-                'id': next_item_id,
+            new_item = lost_found_store.create({
                 'title': data.get('title'),
                 'description': data.get('description'),
                 'category': data.get('category'),
@@ -789,18 +1204,18 @@ def create_app() -> Flask:
                 'status': 'active',
                 'created_at': datetime.now().strftime('%Y-%m-%d %H:%M'),
                 'user_id': data.get('user_id', 'anonymous')
-            }
-            
-            lost_found_items.append(new_item)
-            next_item_id += 1
+            })
             
+            # Reports of the other kind that may be the same item, best first
+            matches = lost_found_store.matches(new_item)
             return jsonify({
                 'success': True,
                 'message': 'Item reported successfully!',
-                'item': new_item
+                'item': with_image_renditions(new_item),
+                'matches': [with_image_renditions(match) for match in matches]
             })
         except Exception as e:
-            print(f"Error reporting item: {e}", flush=True)
+            logger.exception("Error reporting item")
             return jsonify({
                 'success': False,
                 'message': str(e)
@@ -809,11 +1224,11 @@ def create_app() -> Flask:
     # Get a specific lost or found item
     @app.route("/api/lost-found/items/<int:item_id>")
     def get_lost_found_item(item_id):
-        item = next((item for item in lost_found_items if item['id'] == item_id), None)
+        item = lost_found_store.get(item_id)
         if item:
             return jsonify({
                 'success': True,
-                'data': item
+                'data': with_image_renditions(item)
             })
         else:
             return jsonify({
@@ -821,14 +1236,28 @@ def create_app() -> Flask:
                 'message': 'Item not found'
             }), 404
 
+    # Candidate matches for a lost or found item among reports of the other kind
+    @app.route("/api/lost-found/items/<int:item_id>/matches")
+    def get_lost_found_matches(item_id):
+        limit = request.args.get('limit', MATCH_LIMIT, type=int)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return jsonify({'success': False, 'message': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+        item = lost_found_store.get(item_id)
+        if not item:
+            return jsonify({
+                'success': False,
+                'message': 'Item not found'
+            }), 404
+        return jsonify({
+            'success': True,
+            'data': [with_image_renditions(match) for match in lost_found_store.matches(item, limit)]
+        })
+
     # Resolve a lost or found item
     @app.route("/api/lost-found/items/<int:item_id>/resolve", methods=["POST"])
     def resolve_lost_found_item(item_id):
-        global lost_found_items
-        item = next((item for item in lost_found_items if item['id'] == item_id), None)
-        if item:
-            # Remove the item from the list when resolved
-            lost_found_items = [i for i in lost_found_items if i['id'] != item_id]
+        # Remove the item from the board when resolved
+        if lost_found_store.delete(item_id):
             return jsonify({
                 'success': True,
                 'message': 'Item marked as resolved and removed!'
@@ -842,12 +1271,8 @@ def create_app() -> Flask:
     # Delete a lost or found item
     @app.route("/api/lost-found/items/<int:item_id>", methods=["DELETE"])
     def delete_lost_found_item(item_id):
-        global lost_found_items
-        item = next((item for item in lost_found_items if item['id'] == item_id), None)
-        if not item:
+        if not lost_found_store.delete(item_id):
             return jsonify({"error": "Item not found"}), 404
-        
-        lost_found_items = [i for i in lost_found_items if i['id'] != item_id]
         return jsonify({"message": "Item deleted"}), 200
 
     # Helper functions for cafeteria
@@ -902,186 +1327,32 @@ def create_app() -> Flask:
         return '.' in filename and \
                filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-    def _safe_read_json(path: str) -> Optional[Dict[str, Any]]:
-        try:
-            if not os.path.isfile(path):
-                return None
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"[WARN] Failed to read JSON from {path}: {e}", flush=True)
-            return None
-
-    def _geojson_outer_ring_to_latlng(geom: Dict[str, Any]) -> List[List[float]]:
-        if not geom or "type" not in geom or "coordinates" not in geom:
-            return []
-
-        gtype = geom["type"]
-        coords = geom["coordinates"]
-
-        ring: List[List[float]] = []
-
-        if gtype == "Polygon":
-            if not coords or not coords[0]:
-                return []
-            outer = coords[0]
-            ring = [[pt[1], pt[0]] for pt in outer if isinstance(pt, (list, tuple)) and len(pt) >= 2]
-        elif gtype == "MultiPolygon":
-            if not coords:
-                return []
-            candidate = max(coords, key=lambda poly: len(poly[0]) if poly and poly[0] else 0)
-            if not candidate or not candidate[0]:
-                return []
-            outer = candidate[0]
-            ring = [[pt[1], pt[0]] for pt in outer if isinstance(pt, (list, tuple)) and len(pt) >= 2]
-        else:
-            return []
-
-        if ring and ring[0] != ring[-1]:
-            ring.append(ring[0])
-        return ring
-
-    def _load_campus_boundary() -> Optional[Dict[str, Any]]:
-        data = _safe_read_json(BOUNDARY_PATH)
-        if not data:
-            return None
-
-        if data.get("type") == "Feature":
-            geom = data.get("geometry", {})
-            name = data.get("properties", {}).get("name") or "Campus"
-        elif data.get("type") in ("Polygon", "MultiPolygon"):
-            geom = data
-            name = "Campus"
-        else:
-            if data.get("type") == "FeatureCollection" and data.get("features"):
-                feat = data["features"][0]
-                geom = feat.get("geometry", {})
-                name = feat.get("properties", {}).get("name") or "Campus"
-            else:
-                return None
-
-        coords_latlng = _geojson_outer_ring_to_latlng(geom)
-        return {"id": "campus", "name": name, "coordinates": coords_latlng}
-
-    def _load_locations() -> List[Dict[str, Any]]:
-        data = _safe_read_json(BUILDINGS_PATH)
-        if not data:
-            return [
-                {
-                    "id": "b1",
-                    "name": "Main Block",
-                    "category": "Academic",
-                    "coordinates": [[16.4945, 80.5123], [16.4946, 80.5129], [16.4941, 80.5130], [16.4940, 80.5124], [16.4945, 80.5123]],
-                    "description": "Central academic building.",
-                    "imageUrl": "https://example.com/main-block.jpg",
-                },
-                {
-                    "id": "b2",
-                    "name": "Auditorium",
-                    "category": "Facility",
-                    "coordinates": [[16.4930, 80.5110], [16.4934, 80.5115], [16.4929, 80.5118], [16.4926, 80.5112], [16.4930, 80.5110]],
-                    "description": "Events and cultural programs.",
-                    "imageUrl": "https://example.com/auditorium.jpg",
-                },
-            ]
-
-        feats: List[Dict[str, Any]] = []
-        if data.get("type") == "FeatureCollection":
-            for feat in data.get("features", []):
-                geom = feat.get("geometry", {})
-                props = feat.get("properties", {})
-                ring = _geojson_outer_ring_to_latlng(geom)
-                if not ring:
-                    continue
-                feats.append({
-                    "id": str(props.get("id") or props.get("code") or props.get("name") or len(feats) + 1),
-                    "name": str(props.get("name") or "Building"),
-                    "category": str(props.get("category") or "General"),
-                    "coordinates": ring,
-                    "description": str(props.get("description") or ""),
-                    "imageUrl": str(props.get("imageUrl") or ""),
-                })
-        elif data.get("type") == "Feature":
-            geom = data.get("geometry", {})
-            props = data.get("properties", {})
-            ring = _geojson_outer_ring_to_latlng(geom)
-            if ring:
-                feats.append({
-                    "id": str(props.get("id") or props.get("code") or props.get("name") or 1),
-                    "name": str(props.get("name") or "Building"),
-                    "category": str(props.get("category") or "General"),
-                    "coordinates": ring,
-                    "description": str(props.get("description") or ""),
-                    "imageUrl": str(props.get("imageUrl") or ""),
-                })
-        return feats
-
-    def _load_roads() -> List[Dict[str, Any]]:
-        """Load roads data from GeoJSON file."""
-        data = _safe_read_json(ROADS_PATH)
-        if not data:
-            return []
-
-        feats: List[Dict[str, Any]] = []
-        if data.get("type") == "FeatureCollection":
-            for feat in data.get("features", []):
-                geom = feat.get("geometry", {})
-                props = feat.get("properties", {})
-                
-                # Convert coordinates to lat/lng format
-                coords = _geojson_outer_ring_to_latlng(geom)
-                if not coords:
-                    continue
-                    
-                feats.append({
-                    "id": str(props.get("id", len(feats) + 1)),
-                    "name": str(props.get("name", f"Road {len(feats) + 1}")),
-                    "coordinates": coords,
-                    "type": geom.get("type", "LineString")
-                })
-        elif data.get("type") == "Feature":
-            geom = data.get("geometry", {})
-            props = data.get("properties", {})
-            
-            # Convert coordinates to lat/lng format
-            coords = _geojson_outer_ring_to_latlng(geom)
-            if coords:
-                feats.append({
-                    "id": str(props.get("id", "1")),
-                    "name": str(props.get("name", "Road")),
-                    "coordinates": coords,
-                    "type": geom.get("type", "LineString")
-                })
-        return feats
-
-    def _load_nav_config() -> Dict[str, Any]:
-        data = _safe_read_json(NAV_CONFIG_PATH)
-        default = {
-            "center": [16.493, 80.513],
-            "defaultZoom": 17,
-            "categoryColors": {
-                "Academic": "#2563eb",
-                "Admin": "#f59e0b",
-                "Hostel": "#10b981",
-                "Facility": "#8b5cf6",
-                "Sports": "#ef4444",
-                "General": "#3b82f6",
-            },
-        }
-        if isinstance(data, dict):
-            cfg = default.copy()
-            for k in ("center", "defaultZoom", "categoryColors"):
-                if k in data:
-                    cfg[k] = data[k]
-            return cfg
-        return default
-
+    def with_image_renditions(item):
+        """item plus thumbnail_url / medium_url when its image has renditions"""
+        return {**item, **upload_store.rendition_urls(item.get('image_url'))}
 
+    # Serve the stylesheet; immutable when requested by its current fingerprint
+    @app.route('/static/style.css')
+    def stylesheet():
+        asset = static_assets.get("style.css")
+        if asset is None:
+            return jsonify({"error": "Not found"}), 404
+        return asset_response(asset, immutable=request.args.get('v') == asset.fingerprint)
 
     # Serve uploaded files from the UPLOAD_FOLDER
     @app.route('/static/uploads/<filename>')
     def uploaded_file(filename):
-        return send_from_directory(UPLOAD_FOLDER, filename)
+        # send_from_directory answers If-None-Match / Range from the file's stat
+        served = upload_store.resolve(filename)
+        if upload_store.is_immutable(filename) and served == filename:
+            # Given max_age, send_from_directory sends public caching instead of no-cache
+            response = send_from_directory(UPLOAD_FOLDER, served, max_age=IMMUTABLE_MAX_AGE)
+            response.cache_control.immutable = True
+        else:
+            # Legacy names can be overwritten and pending renditions will change
+            response = send_from_directory(UPLOAD_FOLDER, served)
+            response.cache_control.no_cache = True
+        return response
 
     return app
 
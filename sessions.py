@@ -0,0 +1,121 @@
+"""Signed, expiring login tokens that any worker can check on its own."""
+
+import base64
+import hmac
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from database import Database
+
+# How long a login lasts
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+# Set to 0 to skip the revocation check (logout then only forgets the token client-side)
+SESSION_REVOCATION = os.getenv("SESSION_REVOCATION", "1") == "1"
+
+_SELECT_SECRET = "SELECT value FROM app_secrets WHERE name = ?"
+_INSERT_SECRET = "INSERT OR IGNORE INTO app_secrets (name, value) VALUES (?, ?)"
+_INSERT_REVOCATION = "INSERT OR REPLACE INTO session_revocations (token_id, expires_at) VALUES (?, ?)"
+_DELETE_EXPIRED_REVOCATIONS = "DELETE FROM session_revocations WHERE expires_at <= ?"
+_SELECT_REVOCATION = "SELECT 1 FROM session_revocations WHERE token_id = ? AND expires_at > ?"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def session_secret(db: Database, name: str = "session") -> bytes:
+    """The signing key: SESSION_SECRET if set, else one generated once and kept in db.
+
+    Keeping the generated key in the shared database gives every worker the
+    same one, and logins survive restarts.
+    """
+    configured = os.getenv("SESSION_SECRET")
+    if configured:
+        return configured.encode("utf-8")
+    with db.transaction() as conn:
+        conn.execute(_INSERT_SECRET, (name, os.urandom(32)))
+        return bytes(conn.execute(_SELECT_SECRET, (name,)).fetchone()[0])
+
+
+class RevokedSessions:
+    """Ids of tokens logged out before they expired, kept only until they would have expired.
+
+    Expired rows are deleted whenever a new one is added, so the table holds
+    at most the tokens revoked within the last TTL.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def add(self, token_id: str, expires_at: int, now: Optional[float] = None) -> None:
+        now = int(time.time() if now is None else now)
+        with self.db.transaction() as conn:
+            conn.execute(_DELETE_EXPIRED_REVOCATIONS, (now,))
+            if expires_at > now:
+                conn.execute(_INSERT_REVOCATION, (token_id, expires_at))
+
+    def __contains__(self, token_id: str) -> bool:
+        return self.db.query_one(_SELECT_REVOCATION, (token_id, int(time.time()))) is not None
+
+
+class SessionTokens:
+    """Issues and checks "<payload>.<signature>" tokens.
+
+    The payload is base64url JSON holding the register number (sub), the
+    expiry (exp, unix seconds) and a random id (jti); the signature is
+    HMAC-SHA256 over the encoded payload. verify() is one HMAC, a base64
+    decode and a small json.loads, plus an indexed lookup when revocations
+    are enabled.
+    """
+
+    def __init__(self, secret: bytes, ttl: int = SESSION_TTL_SECONDS,
+                 revoked: Optional[RevokedSessions] = None):
+        self._secret = secret
+        self.ttl = ttl
+        self.revoked = revoked
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.digest(self._secret, payload.encode("ascii"), "sha256"))
+
+    def issue(self, subject: str, now: Optional[float] = None) -> Tuple[str, int]:
+        """A new token for subject and its expiry time."""
+        expires_at = int(time.time() if now is None else now) + self.ttl
+        claims = {"sub": subject, "exp": expires_at, "jti": _b64encode(os.urandom(12))}
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        return f"{payload}.{self._sign(payload)}", expires_at
+
+    def verify(self, token: Optional[str], now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """The token's claims if it is genuine, unexpired and not revoked; otherwise None."""
+        if not token or not token.isascii() or token.count(".") != 1:
+            return None
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        if claims.get("exp", 0) <= (time.time() if now is None else now):
+            return None
+        if self.revoked is not None and claims.get("jti") in self.revoked:
+            return None
+        return claims
+
+    def revoke(self, token: Optional[str]) -> bool:
+        """Make a valid token unusable before it expires; False if it was not valid.
+
+        With revocations disabled nothing is recorded, and a valid token
+        stays usable until it expires.
+        """
+        claims = self.verify(token)
+        if claims is None:
+            return False
+        if self.revoked is not None:
+            self.revoked.add(claims["jti"], claims["exp"])
+        return True
@@ -0,0 +1,144 @@
+"""Zoom-banded Douglas-Peucker simplification and bbox filtering for map layers."""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from spatial_index import GridIndex, LocalProjection, project_onto_segment
+
+# Zoom bands with precomputed geometry; requests above the last band get full detail
+ZOOM_BANDS = (13, 14, 15, 16, 17)
+# Simplification tolerance expressed in screen pixels at the band's zoom
+TOLERANCE_PX = 1.0
+LAYER_GRID_CELL_M = 100.0
+
+BBox = Tuple[float, float, float, float]
+
+
+def metres_per_pixel(zoom: float, lat: float) -> float:
+    """Ground resolution of a 256px web-mercator tile at zoom and latitude."""
+    return 156543.03392 * math.cos(math.radians(lat)) / (2 ** zoom)
+
+
+def zoom_band(zoom: float) -> Optional[int]:
+    """The precomputed band serving zoom, or None when full detail is needed."""
+    if zoom > ZOOM_BANDS[-1]:
+        return None
+    for band in ZOOM_BANDS:
+        if zoom <= band:
+            return band
+    return None
+
+
+def douglas_peucker(points: Sequence[Tuple[float, float]], tolerance: float) -> List[int]:
+    """Indices of the points kept by Douglas-Peucker at tolerance (same units as points)."""
+    n = len(points)
+    if n < 3:
+        return list(range(n))
+    keep = [False] * n
+    keep[0] = keep[n - 1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = points[first]
+        bx, by = points[last]
+        max_d = -1.0
+        index = -1
+        for i in range(first + 1, last):
+            d = project_onto_segment(points[i][0], points[i][1], ax, ay, bx, by)[0]
+            if d > max_d:
+                max_d = d
+                index = i
+        if index != -1 and max_d > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [i for i in range(n) if keep[i]]
+
+
+def parse_bbox(value: Optional[str]) -> Optional[BBox]:
+    """Parse "minLng,minLat,maxLng,maxLat" (Leaflet's toBBoxString order)."""
+    if not value:
+        return None
+    parts = value.split(",")
+    if len(parts) != 4:
+        return None
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(p) for p in parts)
+    except ValueError:
+        return None
+    if min_lng > max_lng or min_lat > max_lat:
+        return None
+    return (min_lng, min_lat, max_lng, max_lat)
+
+
+class LayerLevels:
+    """A feature layer with one simplified copy per zoom band and a bbox index.
+
+    Features keep their original payload shape; only "coordinates" (a list of
+    [lat, lng]) is simplified. Closed rings keep at least a triangle, and
+    features that would collapse further are served unsimplified.
+    """
+
+    def __init__(self, features: List[Dict[str, Any]]):
+        self.features = features
+        self.projection = LocalProjection.around(pt for f in features for pt in f.get("coordinates", []))
+        self._grid = GridIndex(LAYER_GRID_CELL_M)
+        self._bounds: List[Optional[BBox]] = []
+        xy_lines: List[List[Tuple[float, float]]] = []
+        for i, feat in enumerate(features):
+            coords = feat.get("coordinates", [])
+            xy = [self.projection.to_xy(pt[0], pt[1]) for pt in coords]
+            xy_lines.append(xy)
+            if not xy:
+                self._bounds.append(None)
+                continue
+            lats = [pt[0] for pt in coords]
+            lngs = [pt[1] for pt in coords]
+            self._bounds.append((min(lngs), min(lats), max(lngs), max(lats)))
+            xs = [p[0] for p in xy]
+            ys = [p[1] for p in xy]
+            self._grid.insert(i, min(xs), min(ys), max(xs), max(ys))
+
+        self.levels: Dict[int, List[Dict[str, Any]]] = {}
+        for band in ZOOM_BANDS:
+            tolerance = TOLERANCE_PX * metres_per_pixel(band, self.projection.lat0)
+            level = []
+            for feat, xy in zip(features, xy_lines):
+                coords = feat.get("coordinates", [])
+                kept = douglas_peucker(xy, tolerance)
+                closed = len(coords) > 3 and coords[0] == coords[-1]
+                if len(kept) == len(coords) or (closed and len(kept) < 4):
+                    level.append(feat)
+                else:
+                    level.append(dict(feat, coordinates=[coords[i] for i in kept]))
+            self.levels[band] = level
+
+    def level(self, zoom: Optional[float] = None) -> List[Dict[str, Any]]:
+        """All features at the detail appropriate for zoom (full detail for None)."""
+        band = zoom_band(zoom) if zoom is not None else None
+        return self.levels[band] if band is not None else self.features
+
+    def indices(self, bbox: BBox) -> List[int]:
+        """Positions, in layer order, of the features whose bounds meet bbox."""
+        min_lng, min_lat, max_lng, max_lat = bbox
+        x0, y0 = self.projection.to_xy(min_lat, min_lng)
+        x1, y1 = self.projection.to_xy(max_lat, max_lng)
+        return sorted(i for i in self._grid.query_bbox(x0, y0, x1, y1) if self._meets(i, bbox))
+
+    def select(self, zoom: Optional[float] = None, bbox: Optional[BBox] = None) -> List[Dict[str, Any]]:
+        """Features for a zoom level, restricted to those whose bounds meet bbox."""
+        level = self.level(zoom)
+        if bbox is None:
+            return level
+        return [level[i] for i in self.indices(bbox)]
+
+    def _meets(self, i: int, bbox: BBox) -> bool:
+        bounds = self._bounds[i]
+        if bounds is None:
+            return False
+        return bounds[0] <= bbox[2] and bounds[2] >= bbox[0] and bounds[1] <= bbox[3] and bounds[3] >= bbox[1]
+
+
+def layer_levels(snapshot, layer: str) -> LayerLevels:
+    """LayerLevels for snapshot.locations or snapshot.roads, built once per file version."""
+    return snapshot.derived(f"levels:{layer}", lambda snap: LayerLevels(getattr(snap, layer)))
@@ -0,0 +1,226 @@
+"""Planar helpers and a uniform-grid spatial index for campus-scale geometry."""
+
+import math
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in metres between two lat/lng points."""
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    h = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(h)))
+
+
+class LocalProjection:
+    """Equirectangular projection to metres around a reference point.
+
+    Accurate to well under a metre across a campus, and cheap enough to use
+    for every distance comparison on the hot path.
+    """
+
+    def __init__(self, lat0: float, lng0: float):
+        self.lat0 = lat0
+        self.lng0 = lng0
+        self._kx = math.radians(1) * EARTH_RADIUS_M * math.cos(math.radians(lat0))
+        self._ky = math.radians(1) * EARTH_RADIUS_M
+
+    @classmethod
+    def around(cls, latlngs: Iterable[Sequence[float]]) -> "LocalProjection":
+        lats: List[float] = []
+        lngs: List[float] = []
+        for pt in latlngs:
+            lats.append(pt[0])
+            lngs.append(pt[1])
+        if not lats:
+            return cls(0.0, 0.0)
+        return cls((min(lats) + max(lats)) / 2, (min(lngs) + max(lngs)) / 2)
+
+    def to_xy(self, lat: float, lng: float) -> Tuple[float, float]:
+        return ((lng - self.lng0) * self._kx, (lat - self.lat0) * self._ky)
+
+    def to_latlng(self, x: float, y: float) -> Tuple[float, float]:
+        return (self.lat0 + y / self._ky, self.lng0 + x / self._kx)
+
+
+def project_onto_segment(px: float, py: float, ax: float, ay: float,
+                         bx: float, by: float) -> Tuple[float, float, float, float]:
+    """Closest point on segment AB to P as (distance, t, x, y) with t in [0, 1]."""
+    dx = bx - ax
+    dy = by - ay
+    seg_len2 = dx * dx + dy * dy
+    if seg_len2 == 0.0:
+        t = 0.0
+    else:
+        t = ((px - ax) * dx + (py - ay) * dy) / seg_len2
+        t = 0.0 if t < 0.0 else 1.0 if t > 1.0 else t
+    x = ax + t * dx
+    y = ay + t * dy
+    return (math.hypot(px - x, py - y), t, x, y)
+
+
+class GridIndex:
+    """Uniform grid over item bounding boxes in projected metres.
+
+    Items are registered in every cell their bbox overlaps. Point and bbox
+    queries touch only the covering cells; nearest-neighbour queries expand
+    ring by ring and stop once no unvisited cell can hold a closer item.
+    """
+
+    def __init__(self, cell_size: float):
+        self.cell_size = float(cell_size)
+        self._cells: Dict[Tuple[int, int], List[Hashable]] = {}
+        self._bounds: Optional[Tuple[int, int, int, int]] = None
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def insert(self, item: Hashable, minx: float, miny: float, maxx: float, maxy: float) -> None:
+        cx0, cy0 = self._cell(minx, miny)
+        cx1, cy1 = self._cell(maxx, maxy)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self._cells.setdefault((cx, cy), []).append(item)
+        if self._bounds is None:
+            self._bounds = (cx0, cy0, cx1, cy1)
+        else:
+            bx0, by0, bx1, by1 = self._bounds
+            self._bounds = (min(bx0, cx0), min(by0, cy0), max(bx1, cx1), max(by1, cy1))
+
+    def query_point(self, x: float, y: float) -> List[Hashable]:
+        return self._cells.get(self._cell(x, y), [])
+
+    def query_bbox(self, minx: float, miny: float, maxx: float, maxy: float) -> Set[Hashable]:
+        found: Set[Hashable] = set()
+        if self._bounds is None:
+            return found
+        bx0, by0, bx1, by1 = self._bounds
+        cx0, cy0 = self._cell(minx, miny)
+        cx1, cy1 = self._cell(maxx, maxy)
+        for cx in range(max(cx0, bx0), min(cx1, bx1) + 1):
+            for cy in range(max(cy0, by0), min(cy1, by1) + 1):
+                found.update(self._cells.get((cx, cy), ()))
+        return found
+
+    def nearest(self, x: float, y: float, distance: Callable[[Hashable], float], k: int = 1,
+                max_distance: float = math.inf) -> List[Tuple[float, Hashable]]:
+        """Return up to k (distance, item) pairs closest to (x, y), nearest first.
+
+        distance(item) must return the exact distance from (x, y) to the item;
+        it is called once per candidate.
+        """
+        if self._bounds is None or k <= 0:
+            return []
+        bx0, by0, bx1, by1 = self._bounds
+        pcx, pcy = self._cell(x, y)
+        max_ring = max(abs(pcx - bx0), abs(pcx - bx1), abs(pcy - by0), abs(pcy - by1))
+        seen: Set[Hashable] = set()
+        best: List[Tuple[float, Hashable]] = []
+
+        ring = 0
+        while ring <= max_ring:
+            # Anything in this ring or beyond is at least (ring - 1) cells away
+            lower_bound = (ring - 1) * self.cell_size
+            if lower_bound > max_distance:
+                break
+            if len(best) >= k and best[k - 1][0] <= lower_bound:
+                break
+            for cell in _ring_cells(pcx, pcy, ring):
+                for item in self._cells.get(cell, ()):
+                    if item in seen:
+                        continue
+                    seen.add(item)
+                    d = distance(item)
+                    if d <= max_distance:
+                        best.append((d, item))
+            best.sort(key=lambda pair: pair[0])
+            del best[k:]
+            ring += 1
+        return best
+
+
+def _ring_cells(cx: int, cy: int, ring: int) -> Iterable[Tuple[int, int]]:
+    """Cells at Chebyshev distance exactly ring from (cx, cy)."""
+    if ring == 0:
+        yield (cx, cy)
+        return
+    for dx in range(-ring, ring + 1):
+        yield (cx + dx, cy - ring)
+        yield (cx + dx, cy + ring)
+    for dy in range(-ring + 1, ring):
+        yield (cx - ring, cy + dy)
+        yield (cx + ring, cy + dy)
+
+
+def point_in_ring(x: float, y: float, ring: Sequence[Tuple[float, float]]) -> bool:
+    """Even-odd ray casting test against a closed ring of projected points."""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def distance_to_ring(x: float, y: float, ring: Sequence[Tuple[float, float]]) -> float:
+    """Distance from a point to a ring's edges, 0 when the point is inside it."""
+    if point_in_ring(x, y, ring):
+        return 0.0
+    best = math.inf
+    for (ax, ay), (bx, by) in zip(ring, ring[1:]):
+        d = project_onto_segment(x, y, ax, ay, bx, by)[0]
+        if d < best:
+            best = d
+    return best
+
+
+class PolygonIndex:
+    """Grid index over location rings for point-in-polygon and k-nearest queries."""
+
+    def __init__(self, locations: List[Dict], cell_size: float = 50.0):
+        self.locations = locations
+        self.projection = LocalProjection.around(pt for loc in locations for pt in loc.get("coordinates", []))
+        self._rings: List[List[Tuple[float, float]]] = []
+        self._areas: List[float] = []
+        self._grid = GridIndex(cell_size)
+        for i, loc in enumerate(locations):
+            ring = [self.projection.to_xy(pt[0], pt[1]) for pt in loc.get("coordinates", [])]
+            self._rings.append(ring)
+            self._areas.append(_ring_area(ring))
+            if ring:
+                xs = [p[0] for p in ring]
+                ys = [p[1] for p in ring]
+                self._grid.insert(i, min(xs), min(ys), max(xs), max(ys))
+
+    def containing(self, lat: float, lng: float) -> List[Dict]:
+        """Locations whose ring contains the point, smallest (most specific) first."""
+        x, y = self.projection.to_xy(lat, lng)
+        hits = [i for i in self._grid.query_point(x, y) if point_in_ring(x, y, self._rings[i])]
+        hits.sort(key=lambda i: self._areas[i])
+        return [self.locations[i] for i in hits]
+
+    def nearest(self, lat: float, lng: float, k: int = 5,
+                max_distance: float = math.inf) -> List[Tuple[float, Dict]]:
+        """Up to k (edge distance in metres, location) pairs, nearest first."""
+        x, y = self.projection.to_xy(lat, lng)
+        hits = self._grid.nearest(x, y, lambda i: distance_to_ring(x, y, self._rings[i]), k, max_distance)
+        return [(d, self.locations[i]) for d, i in hits]
+
+
+def location_index(snapshot) -> PolygonIndex:
+    """The PolygonIndex over a GeoSnapshot's buildings, built once per file version."""
+    return snapshot.derived("location_index", lambda snap: PolygonIndex(snap.locations))
+
+
+def _ring_area(ring: Sequence[Tuple[float, float]]) -> float:
+    area = 0.0
+    for (ax, ay), (bx, by) in zip(ring, ring[1:]):
+        area += ax * by - bx * ay
+    return abs(area) / 2
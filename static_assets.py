@@ -0,0 +1,96 @@
+"""Pages and stylesheets held in memory with precompressed variants."""
+
+import hashlib
+import threading
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from flask import Response, request
+
+from compression import negotiate_encoding, prebuilt_variants, variant_etag
+from geo_store import FileSignature, file_signature
+
+# For URLs whose content can never change (fingerprinted or content-addressed)
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+class StaticAsset:
+    """One file's bytes, its compressed variants and a content-hash ETag."""
+
+    __slots__ = ("mimetype", "key", "etag", "fingerprint", "variants", "mtime")
+
+    def __init__(self, body: bytes, mimetype: str, key: Tuple, mtime: float):
+        self.mimetype = mimetype
+        self.key = key
+        digest = hashlib.sha256(body).hexdigest()
+        self.etag = digest[:32]
+        # Short hash for ?v= cache-busting URLs
+        self.fingerprint = digest[:12]
+        self.variants = prebuilt_variants(body)
+        self.mtime = mtime
+
+
+class AssetRegistry:
+    """Named files served from memory, rebuilt when the file changes on disk.
+
+    A rewrite hook can edit the bytes before they are hashed and compressed;
+    assets listed in depends are rebuilt first, and a change in any of them
+    rebuilds this one too (pages embed the stylesheet's fingerprint that way).
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, Tuple[str, str, Optional[Callable[[bytes], bytes]], Sequence[str]]] = {}
+        self._built: Dict[str, StaticAsset] = {}
+        # Reentrant: a rewrite hook may look up its dependencies mid-build
+        self._lock = threading.RLock()
+
+    def add(self, name: str, path: str, mimetype: str,
+            rewrite: Optional[Callable[[bytes], bytes]] = None, depends: Sequence[str] = ()) -> None:
+        self._specs[name] = (path, mimetype, rewrite, tuple(depends))
+
+    def get(self, name: str) -> Optional[StaticAsset]:
+        """The current build of name; None when its file is missing."""
+        path, mimetype, rewrite, depends = self._specs[name]
+        signature: FileSignature = file_signature(path)
+        if signature is None:
+            return None
+        dep_etags = tuple(dep.etag if dep else None for dep in (self.get(d) for d in depends))
+        key = (signature, dep_etags)
+        built = self._built.get(name)
+        if built is not None and built.key == key:
+            return built
+        with self._lock:
+            built = self._built.get(name)
+            if built is None or built.key != key:
+                with open(path, "rb") as f:
+                    body = f.read()
+                if rewrite is not None:
+                    body = rewrite(body)
+                built = StaticAsset(body, mimetype, key, signature[0] / 1e9)
+                self._built[name] = built
+            return built
+
+    def warm(self) -> None:
+        for name in self._specs:
+            self.get(name)
+
+
+def asset_response(asset: StaticAsset, immutable: bool = False) -> Response:
+    """Serve the best-encoded variant, honouring If-None-Match and Range.
+
+    Immutable assets may be cached for a year; everything else must be
+    revalidated, which costs a 304 while the ETag still matches.
+    """
+    encoding = negotiate_encoding(request.accept_encodings, asset.variants)
+    body = asset.variants[encoding]
+    response = Response(body, mimetype=asset.mimetype)
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    # Each encoding is a different representation, so it needs its own ETag
+    response.set_etag(variant_etag(asset.etag, encoding))
+    response.last_modified = asset.mtime
+    if immutable:
+        response.headers["Cache-Control"] = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request, accept_ranges=True, complete_length=len(body))
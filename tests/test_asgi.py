@@ -0,0 +1,180 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def asgi(app):
+    # asgi imports server, which opens the database the app fixture points at
+    import asgi
+    return asgi
+
+
+def lifespan(application):
+    """Start application up and shut it down again; returns the messages it sent."""
+    async def run():
+        incoming = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        await application({"type": "lifespan"}, receive, send)
+        return sent
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def campus(asgi, app):
+    campus = asgi.CampusASGI(app, threads=4)
+    yield campus
+    # Shutting down detaches the stream wakeups from the shared broadcaster
+    lifespan(campus)
+
+
+def scope(path, method="GET", query=b"", headers=()):
+    return {"type": "http", "method": method, "path": path, "query_string": query, "root_path": "",
+            "headers": [(name.lower(), value) for name, value in headers], "http_version": "1.1",
+            "scheme": "http", "server": ("testserver", 80), "client": ("10.0.0.1", 5000)}
+
+
+def call(application, request_scope, bodies=(b"",), disconnect_after=None, finished=True):
+    """Run one request; returns the messages sent.
+
+    The request body arrives in the chunks of bodies (the last one marked
+    final unless finished is False). The client disconnects
+    once disconnect_after body messages have been sent, or right after the
+    request if that is None.
+    """
+    async def run():
+        sent = []
+        body_sent = asyncio.Event()
+        incoming = [{"type": "http.request", "body": chunk, "more_body": not finished or i < len(bodies) - 1}
+                    for i, chunk in enumerate(bodies)]
+
+        async def receive():
+            if incoming:
+                return incoming.pop(0)
+            if disconnect_after is not None:
+                await body_sent.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            bodies_sent = sum(m["type"] == "http.response.body" for m in sent)
+            if disconnect_after is not None and bodies_sent >= disconnect_after:
+                body_sent.set()
+
+        await asyncio.wait_for(application(request_scope, receive, send), 5)
+        return sent
+    return asyncio.run(run())
+
+
+def response(messages):
+    start = messages[0]
+    assert start["type"] == "http.response.start"
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], headers, body
+
+
+def echo_app(environ, start_response):
+    body = environ["wsgi.input"].read()
+    start_response("201 Created", [("Content-Type", "application/json"), ("X-Seen", environ["HTTP_X_SEEN"])])
+    return [json.dumps({"method": environ["REQUEST_METHOD"], "path": environ["PATH_INFO"],
+                        "query": environ["QUERY_STRING"], "length": environ["CONTENT_LENGTH"],
+                        "remote": environ["REMOTE_ADDR"], "body": body.decode()}).encode(), b"\n"]
+
+
+def test_bridge_runs_the_wsgi_app_with_the_full_body(asgi):
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(2) as executor:
+        bridge = asgi.WSGIBridge(echo_app, executor, max_body=100)
+        request = scope("/echo", "POST", b"a=1", [(b"x-seen", b"a"), (b"x-seen", b"b")])
+        status, headers, body = response(call(bridge, request, bodies=(b"hello ", b"world")))
+        assert status == 201
+        assert headers["x-seen"] == "a,b"
+        assert json.loads(body) == {"method": "POST", "path": "/echo", "query": "a=1", "length": "11",
+                                    "remote": "10.0.0.1", "body": "hello world"}
+        too_big = call(bridge, scope("/echo", "POST"), bodies=(b"x" * 60, b"x" * 60))
+        assert response(too_big)[0] == 413
+        # A client that leaves before finishing its body gets nothing
+        assert call(bridge, scope("/echo", "POST"), bodies=(b"x",), finished=False) == []
+
+
+def test_flask_routes_are_bridged(campus):
+    status, headers, body = response(call(campus, scope("/health")))
+    assert status == 200
+    assert json.loads(body) == {"status": "Backend is running"}
+
+
+def test_crowd_poll_is_answered_natively(campus):
+    status, headers, body = response(call(campus, scope("/api/cafeteria/crowd")))
+    assert status == 200
+    assert headers["cache-control"] == "no-cache"
+    version = json.loads(body)["version"]
+    unchanged = call(campus, scope("/api/cafeteria/crowd", query=f"since={version}".encode()))
+    assert response(unchanged)[0] == 304
+    bad = call(campus, scope("/api/cafeteria/crowd", query=b"since=x"))
+    assert response(bad)[0] == 400
+
+
+def test_status_matches_the_flask_route_and_is_compressed(campus, client):
+    status, headers, body = response(call(campus, scope("/api/cafeteria/status",
+                                                        headers=[(b"accept-encoding", b"gzip")])))
+    assert status == 200
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert json.loads(gzip.decompress(body)) == client.get("/api/cafeteria/status").get_json()
+
+
+def test_status_is_encoded_once_per_crowd_version_off_the_loop(campus, client, app, monkeypatch):
+    import threading
+    encoded_on = []
+    encode = campus._encode_status
+
+    def record():
+        encoded_on.append(threading.current_thread().name)
+        return encode()
+
+    monkeypatch.setattr(campus, "_encode_status", record)
+    gzipped = scope("/api/cafeteria/status", headers=[(b"accept-encoding", b"gzip")])
+    first = response(call(campus, gzipped))[2]
+    assert response(call(campus, gzipped))[2] == first
+    assert len(encoded_on) == 1
+    assert encoded_on[0].startswith("asgi-wsgi")
+    # Compressed once, into the cache the Flask app's middleware uses too
+    assert campus.compressed is app.extensions["compressed_body_cache"]
+    assert campus.compressed.get((campus._status[1].etag, "gzip")) == first
+
+    client.post("/api/cafeteria/report-crowd", json={"cafeteria_id": "main_cafeteria", "rush_time": 5,
+                                                     "user_id": "asgi-test"})
+    after = json.loads(gzip.decompress(response(call(campus, gzipped))[2]))
+    assert len(encoded_on) == 2
+    assert after == client.get("/api/cafeteria/status").get_json()
+
+
+def test_stream_sends_every_cafeteria_then_stops_on_disconnect(campus):
+    import server
+    messages = call(campus, scope("/api/cafeteria/stream"), disconnect_after=1)
+    status, headers, body = response(messages)
+    assert status == 200
+    assert headers["content-type"].startswith("text/event-stream")
+    text = body.decode()
+    assert text.startswith("retry: ")
+    assert text.count("event: crowd") == len(server.cafeteria_data)
+
+
+def test_shutdown_detaches_from_the_broadcaster(campus):
+    import server
+    call(campus, scope("/api/cafeteria/stream"), disconnect_after=1)
+    assert len(campus._wakeups) == 1
+    assert lifespan(campus) == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert not campus._wakeups
+    # Publishing no longer reaches the closed loop
+    server.crowd_broadcaster.publish("crowd", {})
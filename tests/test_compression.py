@@ -0,0 +1,151 @@
+import gzip
+
+import pytest
+from flask import Flask
+from werkzeug.http import parse_accept_header
+
+from compression import (CompressedBodyCache, CompressionMiddleware, negotiate_encoding,
+                         prebuilt_variants, variant_etag)
+from http_cache import CachedBody, cached_response
+
+BODY = '{"items": [' + ", ".join(f'"item {i}"' for i in range(200)) + "]}"
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0", "identity"),
+    ("deflate", "identity"),
+    (None, "identity"),
+    ("*", "gzip"),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(parse_accept_header(header), ("gzip",)) == expected
+    assert negotiate_encoding(parse_accept_header(header), ()) == "identity"
+
+
+def test_prebuilt_variants_skip_encodings_that_do_not_shrink():
+    assert set(prebuilt_variants(b"x")) == {"identity"}
+    variants = prebuilt_variants(BODY.encode())
+    assert gzip.decompress(variants["gzip"]) == BODY.encode()
+    assert variant_etag("abc", "gzip") == "abc-gzip"
+    assert variant_etag("abc", "identity") == "abc"
+
+
+def test_cache_evicts_least_recently_used():
+    cache = CompressedBodyCache(max_bytes=10)
+    cache.put(("a", "gzip"), b"1234")
+    cache.put(("b", "gzip"), b"1234")
+    assert cache.get(("a", "gzip")) == b"1234"
+    cache.put(("c", "gzip"), b"1234")
+    assert cache.get(("b", "gzip")) is None
+    assert cache.get(("a", "gzip")) == b"1234"
+    cache.put(("big", "gzip"), b"x" * 11)
+    assert cache.get(("big", "gzip")) is None
+
+
+@pytest.fixture
+def demo():
+    app = Flask(__name__)
+    cached = CachedBody.from_json(BODY)
+
+    @app.route("/cached")
+    def cached_route():
+        return cached_response(cached, 60)
+
+    @app.route("/dynamic")
+    def dynamic_route():
+        return app.response_class(BODY, mimetype="application/json")
+
+    @app.route("/small")
+    def small_route():
+        return {"ok": True}
+
+    @app.route("/image")
+    def image_route():
+        return app.response_class(b"\0" * 4096, mimetype="image/png")
+
+    app.wsgi_app = CompressionMiddleware(app.wsgi_app)
+    app.cached = cached
+    return app
+
+
+def get(app, path, **headers):
+    return app.test_client().get(path, headers={"Accept-Encoding": "gzip", **headers})
+
+
+def test_dynamic_json_is_compressed(demo):
+    response = get(demo, "/dynamic")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    assert gzip.decompress(response.data) == BODY.encode()
+
+
+@pytest.mark.parametrize("path, headers", [
+    ("/small", {}),
+    ("/image", {}),
+    ("/dynamic", {"Accept-Encoding": "identity"}),
+])
+def test_small_binary_and_unaccepted_responses_pass_through(demo, path, headers):
+    response = get(demo, path, **headers)
+    assert "Content-Encoding" not in response.headers
+
+
+def test_etagged_bodies_get_a_variant_tag_and_revalidate(demo):
+    first = get(demo, "/cached")
+    etag = first.headers["ETag"]
+    assert etag == f'"{demo.cached.etag}-gzip"'
+    assert gzip.decompress(first.data) == demo.cached.body
+    assert get(demo, "/cached").data == first.data
+    again = get(demo, "/cached", **{"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.headers["Vary"] == "Accept-Encoding"
+    # The plain tag still revalidates the uncompressed representation
+    plain = demo.test_client().get("/cached", headers={"If-None-Match": f'"{demo.cached.etag}"'})
+    assert plain.status_code == 304
+
+
+def test_cached_variants_are_reused(demo):
+    middleware = demo.wsgi_app
+    get(demo, "/cached")
+    assert middleware.cache.get((demo.cached.etag, "gzip")) is not None
+    middleware.cache.put((demo.cached.etag, "gzip"), gzip.compress(b"from cache"))
+    assert gzip.decompress(get(demo, "/cached").data) == b"from cache"
+
+
+@pytest.mark.parametrize("path", ["/dynamic", "/cached", "/small"])
+def test_head_negotiates_like_get(demo, path):
+    client = demo.test_client()
+    get_response = client.get(path, headers={"Accept-Encoding": "gzip"})
+    head = client.head(path, headers={"Accept-Encoding": "gzip"})
+    assert head.status_code == 200
+    assert head.data == b""
+    for name in ("Content-Encoding", "Content-Length", "ETag", "Vary"):
+        assert head.headers.get(name) == get_response.headers.get(name)
+    if path == "/cached":
+        revalidated = client.head(path, headers={"Accept-Encoding": "gzip", "If-None-Match": head.headers["ETag"]})
+        assert revalidated.status_code == 304
+
+
+def test_head_keeps_its_method_outside_the_middleware(demo):
+    seen = []
+    inner = demo.wsgi_app
+
+    def outer(environ, start_response):
+        app_iter = inner(environ, start_response)
+        seen.append(environ["REQUEST_METHOD"])
+        return app_iter
+
+    demo.wsgi_app = outer
+    assert demo.test_client().head("/dynamic", headers={"Accept-Encoding": "gzip"}).data == b""
+    assert seen == ["HEAD"]
+
+
+def test_api_responses_are_compressed(client):
+    response = client.get("/api/locations", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"].endswith('-gzip"')
+    revalidated = client.get("/api/locations", headers={"Accept-Encoding": "gzip",
+                                                         "If-None-Match": response.headers["ETag"]})
+    assert revalidated.status_code == 304
@@ -0,0 +1,84 @@
+import pytest
+
+from crowd import CROWD_OUTLIER_MARGIN, CrowdAggregator, CrowdVersions
+
+
+def report(n):
+    return {"n": n}
+
+
+def test_first_report_replaces_the_configured_default():
+    crowd = CrowdAggregator(initial=15)
+    assert crowd.estimate() == 15
+    crowd.add(30, report(1), now=0)
+    assert crowd.estimate() == 30
+
+
+def test_simultaneous_reports_average():
+    crowd = CrowdAggregator()
+    assert crowd.estimate() is None
+    for i, value in enumerate([10, 20, 30]):
+        crowd.add(value, report(i), now=100)
+    assert crowd.estimate() == 20
+    assert crowd.median(now=100) == 20
+
+
+def test_an_outlier_moves_the_estimate_by_at_most_the_margin():
+    crowd = CrowdAggregator()
+    for i in range(5):
+        crowd.add(10, report(i), now=0)
+    crowd.add(60, report(5), now=0)
+    # 60 is clamped to median + margin before it is averaged with five 10s
+    assert crowd.estimate() == round((5 * 10 + 10 + CROWD_OUTLIER_MARGIN) / 6)
+
+
+def test_old_reports_fade_and_leave_the_window():
+    crowd = CrowdAggregator(window_seconds=600, decay_seconds=60)
+    crowd.add(40, report(0), now=0)
+    crowd.add(5, report(1), now=3600)
+    # An hour of decay leaves the first report almost no weight
+    assert crowd.estimate() == 5
+    assert crowd.median(now=3600) == 5
+    assert crowd.median(now=10_000) is None
+
+
+def test_recent_keeps_the_latest_reports_oldest_first():
+    crowd = CrowdAggregator(capacity=4)
+    for i in range(6):
+        crowd.add(10, report(i), now=i)
+    assert crowd.recent(10) == [report(i) for i in range(2, 6)]
+    assert crowd.recent(2) == [report(4), report(5)]
+    assert crowd.recent(0) == []
+
+
+def test_versions_name_the_cafeterias_changed_since():
+    versions = CrowdVersions(["main", "hostel"])
+    assert versions.changed_since(0) == []
+    assert versions.bump("main") == 1
+    assert versions.bump("hostel") == 2
+    assert versions.changed_since(1) == ["hostel"]
+    assert sorted(versions.changed_since(0)) == ["hostel", "main"]
+    # A version from before a restart gets everything
+    assert sorted(versions.changed_since(99)) == ["hostel", "main"]
+
+
+def test_reports_update_the_estimate_and_the_delta(client):
+    version = client.get("/api/cafeteria/crowd").get_json()["version"]
+    assert client.get(f"/api/cafeteria/crowd?since={version}").status_code == 304
+    before = client.get("/api/cafeteria/status").get_json()["data"]["main_cafeteria"]["current_rush_time"]
+    response = client.post("/api/cafeteria/report-crowd",
+                           json={"cafeteria_id": "main_cafeteria", "rush_time": 60, "user_id": "crowd-test"})
+    assert response.status_code == 200
+    delta = client.get(f"/api/cafeteria/crowd?since={version}").get_json()
+    assert list(delta["data"]) == ["main_cafeteria"]
+    main = client.get("/api/cafeteria/status").get_json()["data"]["main_cafeteria"]
+    assert before < main["current_rush_time"] <= 60
+    assert main["crowd_reports"][-1]["user_id"] == "crowd-test"
+
+
+@pytest.mark.parametrize("body", [
+    [{"cafeteria_id": "main_cafeteria", "rush_time": 10}],
+    {"cafeteria_id": "main_cafeteria", "rush_time": 10, "user_id": ["crowd-test"]},
+])
+def test_malformed_reports_are_rejected(client, body):
+    assert client.post("/api/cafeteria/report-crowd", json=body).status_code == 400
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_forked_child_opens_its_own_connection(db):
+    parent = db.connection()
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            child = db.connection()
+            ok = child is not parent and db.query_one("SELECT 1")[0] == 1
+            os.write(write, b"1" if ok else b"0")
+        finally:
+            os._exit(0)
+    os.close(write)
+    assert os.read(read, 1) == b"1"
+    os.close(read)
+    os.waitpid(pid, 0)
+    assert db.connection() is parent
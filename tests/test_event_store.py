@@ -0,0 +1,188 @@
+import threading
+
+import pytest
+
+from event_store import EventStore, fts_query
+from pagination import decode_cursor
+
+
+@pytest.fixture
+def store(db):
+    store = EventStore(db)
+    locations = ["Main Hall", "Seminar Hall B", "Library"]
+    for i in range(25):
+        store.create({"name": f"Tech talk {i}", "date": f"2025-0{i % 9 + 1}-10", "location": locations[i % 3],
+                      "description": "tech " * (i % 4 + 1)})
+    return store
+
+
+def test_crud(db):
+    store = EventStore(db)
+    event = store.create({"name": "Hackathon", "date": "2025-03-01", "location": "Lab", "participants": ["a", "b"]})
+    assert event["id"] == 1
+    assert event["category"] == "General"
+    assert event["participants"] == '["a", "b"]'
+    assert store.get(event["id"]) == event
+    assert store.update(event["id"], {"name": "Hackathon 2", "id": 99, "unknown": 1})["name"] == "Hackathon 2"
+    assert store.get(99) is None
+    assert store.update(99, {"name": "x"}) is None
+    assert store.delete(event["id"])
+    assert not store.delete(event["id"])
+    assert len(store) == 0
+
+
+def test_concurrent_creates_get_distinct_ids(db):
+    store = EventStore(db)
+    ids = []
+
+    def create():
+        for _ in range(20):
+            ids.append(store.create({"name": "e", "date": "2025-01-01", "location": "x"})["id"])
+
+    threads = [threading.Thread(target=create) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(ids) == list(range(1, 81))
+
+
+def test_seed_runs_on_a_new_database_only(db):
+    store = EventStore(db)
+    store.seed([{"id": 7, "name": "Sports Meet", "date": "2025-01-01", "location": "Ground"}])
+    assert store.get(7)["name"] == "Sports Meet"
+    assert store.delete(7)
+    store.seed([{"id": 7, "name": "Sports Meet", "date": "2025-01-01", "location": "Ground"}])
+    assert len(store) == 0
+    # Ids carry on after the seeded ones
+    assert store.create({"name": "e", "date": "2025-01-01", "location": "x"})["id"] == 8
+
+
+def test_upcoming_is_date_ordered_from_today(store):
+    upcoming = store.upcoming("2025-07-10")
+    assert [e["date"] for e in upcoming] == sorted(e["date"] for e in upcoming)
+    assert {e["date"] for e in upcoming} == {"2025-07-10", "2025-08-10", "2025-09-10"}
+
+
+def test_filter_by_date_prefix_and_location_words(store):
+    page, cursor = store.filter(100, date_prefix="2025-01", location="main")
+    assert cursor is None
+    assert {(e["date"], e["location"]) for e in page} == {("2025-01-10", "Main Hall")}
+    assert store.filter_count(date_prefix="2025-01", location="main") == len(page)
+    hall, _ = store.filter(100, location="HALL")
+    assert {e["location"] for e in hall} == {"Main Hall", "Seminar Hall B"}
+    assert store.filter_count() == 25
+    assert store.filter(100, date_prefix="2024") == ([], None)
+    # Location words match whole words or prefixes, not fragments
+    assert store.filter(100, location="all")[0] == []
+    assert store.filter(100, location="!!!")[0] == []
+
+
+def walk(fetch, limit):
+    """Every id across the pages fetch(limit, after) returns, and the number of pages."""
+    ids, after, pages = [], None, 0
+    while True:
+        page, cursor = fetch(limit, after)
+        ids.extend(event["id"] for event in page)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+        after = decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("limit", [1, 4, 7, 100])
+def test_pages_cover_every_event_once(store, limit):
+    ids, pages = walk(store.page, limit)
+    assert ids == list(range(1, 26))
+    assert pages == -(-25 // limit)
+
+
+@pytest.mark.parametrize("limit", [1, 4, 7, 100])
+def test_search_pages_resume_after_the_cursor(store, limit):
+    everything, _ = store.search("tech", 100)
+    ids, pages = walk(lambda n, after: store.search("tech", n, after), limit)
+    assert ids == [event["id"] for event in everything]
+    assert len(ids) == store.search_count("tech") == 25
+    assert pages == -(-25 // limit)
+
+
+@pytest.mark.parametrize("limit", [1, 3, 100])
+def test_filter_pages_in_id_order(store, limit):
+    ids, _ = walk(lambda n, after: store.filter(n, after, location="hall"), limit)
+    everything, _ = store.page(100)
+    hall = [event["id"] for event in everything if "Hall" in event["location"]]
+    assert ids == hall
+    assert store.filter_count(location="hall") == len(hall)
+
+
+def test_fts_query():
+    assert fts_query("Tech  TALK tech") == '"tech"* "talk"*'
+    assert fts_query("a b", "location") == 'location : ("a" "b")'
+    assert fts_query('say "hi"') == '"say"* "hi"*'
+    assert fts_query(" -- ") is None
+
+
+def search(store, query):
+    page, _ = store.search(query, 100)
+    return page
+
+
+@pytest.fixture
+def events(db):
+    store = EventStore(db)
+    store.create({"name": "Basketball final", "date": "2025-02-01", "location": "Court",
+                  "description": "Inter-hostel final", "category": "Sports"})
+    store.create({"name": "Robotics workshop", "date": "2025-02-02", "location": "Lab 3",
+                  "description": "Build a line follower robot", "category": "Technical"})
+    store.create({"name": "Debate", "date": "2025-02-03", "location": "Main Hall",
+                  "description": "Robots will replace teachers", "category": "Literary"})
+    return store
+
+
+def test_search_ranks_name_hits_first(events):
+    assert [e["name"] for e in search(events, "robot")] == ["Robotics workshop", "Debate"]
+    assert [e["name"] for e in search(events, "ROBOT workshop")] == ["Robotics workshop"]
+    assert [e["name"] for e in search(events, "sports")] == ["Basketball final"]
+    assert search(events, "robot chess") == []
+    assert events.search_count("robot") == 2
+
+
+def test_search_matches_word_prefixes_not_fragments(events):
+    assert [e["name"] for e in search(events, "bask")] == ["Basketball final"]
+    assert search(events, "ball") == []
+
+
+def test_search_follows_updates_and_deletes(events):
+    debate = search(events, "debate")[0]
+    events.update(debate["id"], {"name": "Quiz"})
+    assert search(events, "debate") == []
+    assert [e["id"] for e in search(events, "quiz")] == [debate["id"]]
+    events.delete(debate["id"])
+    assert search(events, "quiz") == []
+
+
+def test_events_stored_before_the_text_index_are_indexed_on_start(events, db):
+    with db.transaction() as conn:
+        conn.execute("INSERT INTO events_fts (events_fts) VALUES ('delete-all')")
+    assert search(events, "debate") == []
+    assert [e["name"] for e in search(EventStore(db), "debate")] == ["Debate"]
+
+
+def test_event_endpoints(client):
+    created = client.post("/api/events", json={"name": "Quiz", "date": "2999-01-01", "location": "Hall"})
+    assert created.status_code == 201
+    event_id = created.get_json()["id"]
+    assert client.get(f"/api/events/{event_id}").get_json()["name"] == "Quiz"
+    assert client.put(f"/api/events/{event_id}", json={"name": "Quiz night"}).get_json()["name"] == "Quiz night"
+    assert event_id in [e["id"] for e in client.get("/api/events/upcoming").get_json()]
+    assert event_id in [e["id"] for e in client.get("/api/events/filter?date=2999-01").get_json()]
+    assert [e["id"] for e in client.get("/api/events/search?query=quiz%20nig").get_json()] == [event_id]
+    page = client.get("/api/events?limit=1")
+    assert len(page.get_json()) == 1
+    assert int(page.headers["X-Total-Count"]) == len(client.get("/api/events?limit=200").get_json())
+    assert client.get(f"/api/events?cursor={page.headers['X-Next-Cursor']}").get_json()[0]["id"] > \
+        page.get_json()[0]["id"]
+    assert client.get("/api/events?cursor=bogus").status_code == 400
+    assert client.delete(f"/api/events/{event_id}").status_code == 200
+    assert client.get(f"/api/events/{event_id}").status_code == 404
+    assert client.post("/api/events", json={"name": "No date"}).status_code == 400
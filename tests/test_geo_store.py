@@ -0,0 +1,28 @@
+from geo_store import parse_roads
+
+
+def test_every_part_of_a_multilinestring_is_a_road():
+    roads = parse_roads({"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"id": "ring", "name": "Ring Road"},
+         "geometry": {"type": "MultiLineString", "coordinates": [
+             [[81.0, 16.0], [81.001, 16.0]],
+             [],
+             [[81.002, 16.0], [81.003, 16.0], [81.003, 16.001]],
+         ]}},
+        {"type": "Feature", "properties": {},
+         "geometry": {"type": "LineString", "coordinates": [[81.0, 16.01], [81.001, 16.01]]}},
+    ]})
+    assert roads == [
+        {"id": "ring-1", "name": "Ring Road", "type": "LineString", "coordinates": [[16.0, 81.0], [16.0, 81.001]]},
+        {"id": "ring-2", "name": "Ring Road", "type": "LineString",
+         "coordinates": [[16.0, 81.002], [16.0, 81.003], [16.001, 81.003]]},
+        {"id": "3", "name": "Road 3", "type": "LineString", "coordinates": [[16.01, 81.0], [16.01, 81.001]]},
+    ]
+
+
+def test_roads_drawn_as_areas_keep_their_outline():
+    roads = parse_roads({"type": "Feature", "properties": {"name": "Plaza"}, "geometry": {
+        "type": "Polygon", "coordinates": [[[81.0, 16.0], [81.001, 16.0], [81.001, 16.001]]]}})
+    assert roads == [{"id": "1", "name": "Plaza", "type": "Polygon",
+                      "coordinates": [[16.0, 81.0], [16.0, 81.001], [16.001, 81.001], [16.0, 81.0]]}]
+    assert parse_roads({"type": "Feature", "geometry": {"type": "MultiLineString", "coordinates": []}}) == []
@@ -0,0 +1,43 @@
+import pytest
+from flask import Flask
+
+from http_cache import CachedBody, cached_response
+
+
+def test_etag_follows_the_body():
+    body = CachedBody.from_json('{"a": 1}')
+    assert body.body == b'{"a": 1}\n'
+    assert body.etag == CachedBody(b'{"a": 1}\n').etag
+    assert body.etag != CachedBody.from_json('{"a": 2}').etag
+
+
+@pytest.mark.parametrize("method, if_none_match, status", [
+    ("GET", None, 200),
+    ("GET", '"other"', 200),
+    ("GET", "{etag}", 304),
+    ("GET", '"other", {etag}', 304),
+    ("HEAD", "{etag}", 304),
+    ("POST", "{etag}", 200),
+])
+def test_conditional_requests(method, if_none_match, status):
+    cached = CachedBody.from_json("[1, 2, 3]")
+    headers = {"If-None-Match": if_none_match.replace("{etag}", f'"{cached.etag}"')} if if_none_match else {}
+    with Flask(__name__).test_request_context("/", method=method, headers=headers):
+        response = cached_response(cached, 60)
+    assert response.status_code == status
+    assert response.get_etag() == (cached.etag, False)
+    assert response.headers["Cache-Control"] == "public, max-age=60, must-revalidate"
+    assert response.get_data() == (cached.body if status == 200 else b"")
+
+
+@pytest.mark.parametrize("path", ["/api/campus/boundary", "/api/locations", "/api/roads",
+                                  "/api/navigation/config", "/api/navigation/all"])
+def test_geo_endpoints_revalidate_with_their_etag(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.is_json
+    etag = first.headers["ETag"]
+    again = client.get(path, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.get_data() == b""
+    assert again.headers["ETag"] == etag
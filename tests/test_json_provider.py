@@ -0,0 +1,72 @@
+import datetime
+import json
+import uuid
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+import json_provider
+from json_provider import OrjsonProvider, install_json_provider
+
+VALUE = {
+    "b": [1, 2.5, None, True],
+    "a": "Café ☕",
+    "when": datetime.date(2025, 3, 1),
+    "at": datetime.datetime(2025, 3, 1, 9, 30, tzinfo=datetime.timezone.utc),
+    "id": uuid.UUID(int=1),
+    "price": Decimal("1.50"),
+}
+
+
+@pytest.fixture
+def apps():
+    pytest.importorskip("orjson")
+    stdlib, fast = Flask(__name__), Flask(__name__)
+    assert install_json_provider(fast) == "orjson"
+    assert isinstance(fast.json, OrjsonProvider)
+    return stdlib, fast
+
+
+def test_same_content_as_the_stdlib_provider(apps):
+    stdlib, fast = apps
+    assert json.loads(fast.json.dumps(VALUE)) == json.loads(stdlib.json.dumps(VALUE))
+    assert fast.json.dumps({"b": 1, "a": 2}) == '{"a":2,"b":1}'
+    assert fast.json.dumps({3: "x"}) == stdlib.json.dumps({3: "x"}).replace(" ", "")
+    assert "Café ☕" in fast.json.dumps(VALUE)
+    assert fast.json.loads(b'{"x": [1, "\\u00e9"]}') == {"x": [1, "é"]}
+
+
+def test_indent_two_matches_orjson_and_other_options_fall_back(apps):
+    stdlib, fast = apps
+    assert fast.json.dumps({"a": [1]}, indent=2) == '{\n  "a": [\n    1\n  ]\n}'
+    assert fast.json.dumps({"a": 1}, indent=4) == stdlib.json.dumps({"a": 1}, indent=4)
+    assert fast.json.dumps({"a": 1}, separators=(", ", ": ")) == '{"a": 1}'
+    assert fast.json.dumps({"a": 1}, cls=json.JSONEncoder) == stdlib.json.dumps({"a": 1}, cls=json.JSONEncoder)
+    assert fast.json.dumps({"a": 1}, sort_keys=False) == '{"a":1}'
+
+
+def test_unserialisable_values_raise_like_the_stdlib(apps):
+    _, fast = apps
+    with pytest.raises(TypeError):
+        fast.json.dumps({"a": object()})
+
+
+def test_responses_use_the_provider(apps):
+    _, fast = apps
+
+    @fast.route("/")
+    def index():
+        return {"name": "Café", "when": datetime.date(2025, 3, 1)}
+
+    response = fast.test_client().get("/")
+    assert response.is_json
+    assert response.get_json() == {"name": "Café", "when": "Sat, 01 Mar 2025 00:00:00 GMT"}
+
+
+def test_without_orjson_the_stdlib_provider_stays(monkeypatch):
+    monkeypatch.setattr(json_provider, "orjson", None)
+    app = Flask(__name__)
+    default = app.json
+    assert install_json_provider(app) == "json"
+    assert app.json is default
@@ -0,0 +1,129 @@
+import pytest
+
+from database import Database
+from lost_found_store import LostFoundStore, match_terms
+from pagination import decode_cursor
+
+
+def report(store, item_type, title, description="", category="Electronics", location="Main Library", **extra):
+    return store.create({
+        "title": title, "description": description, "category": category, "item_type": item_type,
+        "location": location, "status": "active", "created_at": "2025-01-01 10:00", **extra,
+    })
+
+
+@pytest.fixture
+def store(db):
+    return LostFoundStore(db)
+
+
+def test_create_get_delete(store):
+    item = report(store, "lost", "Red umbrella", contact_info="a@b.c")
+    assert item["id"] == 1
+    assert item["user_id"] is None
+    assert store.get(item["id"]) == item
+    assert len(store) == 1
+    assert store.delete(item["id"])
+    assert not store.delete(item["id"])
+    assert store.get(item["id"]) is None
+
+
+def test_pages_in_report_order(store):
+    ids = [report(store, "lost", f"Item {i}")["id"] for i in range(7)]
+    seen, after = [], None
+    while True:
+        page, cursor = store.page(3, after)
+        seen.extend(item["id"] for item in page)
+        if cursor is None:
+            break
+        after = decode_cursor(cursor)
+    assert seen == ids
+
+
+def test_items_outlive_the_connection(tmp_path):
+    path = str(tmp_path / "campus.db")
+    first = Database(path)
+    item = report(LostFoundStore(first), "found", "Blue bottle")
+    first.close()
+    assert LostFoundStore(Database(path)).get(item["id"])["title"] == "Blue bottle"
+
+
+def test_match_terms_normalise_words_and_location():
+    terms = match_terms({"title": "Lost my Keys", "description": "Two KEYS on a ring",
+                         "category": "Personal Items", "location": "  Main   Library, 2nd floor "})
+    assert terms["c:personal items"] == 2.0
+    assert terms["l=main library 2nd floor"] == 2.0
+    assert "l:library" in terms
+    assert "w:key" in terms and "w:ring" in terms
+    # Stop words and the words "lost"/"found" say nothing about the item
+    assert not {"w:lost", "w:my", "w:on"} & set(terms)
+
+
+def test_matches_come_from_the_opposite_type_best_first(store):
+    phone = report(store, "lost", "Black phone", "Samsung phone with a cracked screen")
+    wallet = report(store, "lost", "Brown wallet", "Leather wallet", category="Accessories", location="Hostel")
+    report(store, "found", "Black phone", "Samsung phone")  # same type as the query: never a match
+    found = report(store, "found", "Found a phone", "black samsung phones, cracked", location="main library")
+
+    matches = store.matches(found)
+    assert [m["id"] for m in matches] == [phone["id"]]
+    assert matches[0]["matched_on"][:2] == ["category", "location"]
+    assert {"black", "samsung", "phone", "cracked"} <= set(matches[0]["matched_on"])
+    assert wallet["id"] not in [m["id"] for m in store.matches(found)]
+
+
+def test_ranking_and_limit(store):
+    strong = report(store, "lost", "Blue bottle", "Steel water bottle with stickers")
+    weak = report(store, "lost", "Bottle", "plain", location="Hostel")
+    query = report(store, "found", "Water bottle", "steel bottle, blue, stickers")
+    matches = store.matches(query)
+    assert [m["id"] for m in matches] == [strong["id"], weak["id"]]
+    assert matches[0]["score"] > matches[1]["score"]
+    assert [m["id"] for m in store.matches(query, limit=1)] == [strong["id"]]
+
+
+@pytest.mark.parametrize("lost_at, found_at", [("Gym", "Canteen"), ("Main Library", "Main Library")])
+def test_a_shared_category_or_location_alone_is_not_a_match(store, lost_at, found_at):
+    report(store, "lost", "Headphones", location=lost_at)
+    query = report(store, "found", "Charger", location=found_at)
+    assert store.matches(query) == []
+
+
+def test_deleted_items_drop_out_of_matches(store, db):
+    lost = report(store, "lost", "Red umbrella")
+    query = report(store, "found", "Red umbrella")
+    assert [m["id"] for m in store.matches(query)] == [lost["id"]]
+    assert store.delete(lost["id"])
+    assert store.matches(query) == []
+    assert db.query_one("SELECT COUNT(*) FROM lost_found_terms WHERE item_id = ?", (lost["id"],))[0] == 0
+
+
+def test_unknown_item_type_has_no_matches(store):
+    report(store, "lost", "Red umbrella")
+    assert store.matches({"item_type": "misc", "title": "Red umbrella"}) == []
+
+
+def test_items_reported_before_the_index_are_indexed_on_start(store, db):
+    lost = report(store, "lost", "Silver watch", "Titan watch")
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM lost_found_terms")
+    query = {"item_type": "found", "title": "Silver watch", "category": "Electronics", "location": "Main Library"}
+    assert store.matches(query) == []
+    assert [m["id"] for m in LostFoundStore(db).matches(query)] == [lost["id"]]
+
+
+def test_report_returns_matches(client):
+    lost = client.post("/api/lost-found/report", data={
+        "title": "Green umbrella", "description": "Folding umbrella, green", "category": "Accessories",
+        "item_type": "lost", "location": "Block C", "contact_method": "email", "contact_info": "a@b.c"})
+    assert lost.status_code == 200
+    found = client.post("/api/lost-found/report", data={
+        "title": "Umbrella", "description": "green folding umbrella", "category": "Accessories",
+        "item_type": "found", "location": "Block C", "contact_method": "email", "contact_info": "d@e.f"})
+    lost_id = lost.get_json()["item"]["id"]
+    assert lost_id in [m["id"] for m in found.get_json()["matches"]]
+    found_id = found.get_json()["item"]["id"]
+    matches = client.get(f"/api/lost-found/items/{found_id}/matches?limit=1")
+    assert [m["id"] for m in matches.get_json()["data"]] == [lost_id]
+    assert client.get(f"/api/lost-found/items/{found_id}/matches?limit=0").status_code == 400
+    assert client.get("/api/lost-found/items/999999/matches").status_code == 404
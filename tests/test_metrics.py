@@ -0,0 +1,86 @@
+import pytest
+from flask import Flask, Response
+
+from metrics import PROMETHEUS_CONTENT_TYPE, Registry, RequestMetrics
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = registry.histogram("latency_seconds", "Latency.", ("endpoint",), buckets=(0.1, 1.0))
+    for amount in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(("a",), amount)
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"]
+    assert lines[2:] == [
+        'latency_seconds_bucket{endpoint="a",le="0.1"} 2',
+        'latency_seconds_bucket{endpoint="a",le="1.0"} 3',
+        'latency_seconds_bucket{endpoint="a",le="+Inf"} 4',
+        'latency_seconds_sum{endpoint="a"} 3.65',
+        'latency_seconds_count{endpoint="a"} 4',
+    ]
+
+
+def test_counters_gauges_and_callbacks_render():
+    registry = Registry()
+    counter = registry.counter("hits_total", "Hits.", ("path",))
+    counter.inc(('say "hi"\n',))
+    counter.inc(('say "hi"\n',), 2)
+    gauge = registry.gauge("busy", "Busy.")
+    gauge.inc()
+    gauge.dec()
+    registry.gauge_callback("queue", "Queue.", lambda: {("x",): 3, ("a",): 1}, ("name",))
+    registry.counter_callback("dropped_total", "Dropped.", lambda: 7)
+    text = registry.render()
+    assert 'hits_total{path="say \\"hi\\"\\n"} 3' in text
+    assert "busy 0" in text
+    assert text.index('queue{name="a"} 1') < text.index('queue{name="x"} 3')
+    assert "# TYPE dropped_total counter\ndropped_total 7" in text
+    with pytest.raises(ValueError):
+        registry.counter("busy", "Again.")
+
+
+@pytest.fixture
+def demo():
+    app = Flask(__name__)
+
+    @app.route("/hello")
+    def hello():
+        return "hello"
+
+    @app.route("/stream")
+    def stream():
+        return Response(iter([b"data: 1\n\n", b"data: 2\n\n"]), mimetype="text/event-stream")
+
+    app.registry = Registry()
+    RequestMetrics(app.registry).init_app(app)
+    return app
+
+
+def test_requests_are_counted_by_endpoint_and_status(demo):
+    client = demo.test_client()
+    client.get("/hello", buffered=True)
+    client.post("/hello", buffered=True)
+    client.get("/missing", buffered=True)
+    assert client.get("/stream", buffered=True).data == b"data: 1\n\ndata: 2\n\n"
+    text = demo.registry.render()
+    assert 'http_requests_total{endpoint="hello",method="GET",status="200"} 1' in text
+    assert 'http_requests_total{endpoint="unmatched",method="POST",status="405"} 1' in text
+    assert 'http_requests_total{endpoint="unmatched",method="GET",status="404"} 1' in text
+    assert 'http_request_duration_seconds_count{endpoint="stream",method="GET"} 1' in text
+    assert 'http_response_size_bytes_sum{endpoint="hello"} 5' in text
+    assert 'http_requests_in_flight{endpoint="hello"} 0' in text
+
+
+def test_metrics_endpoint(client):
+    client.get("/health", buffered=True)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type == PROMETHEUS_CONTENT_TYPE
+    assert response.headers["Cache-Control"] == "no-store"
+    text = response.get_data(as_text=True)
+    assert 'http_requests_total{endpoint="health",method="GET",status="200"}' in text
+    assert "# TYPE campus_events gauge" in text
+    assert "cafeteria_rush_time_minutes{cafeteria=" in text
+    for name in ("cafeteria_crowd_reports_total", "crowd_reports_rejected_total", "crowd_reports_coalesced_total",
+                 "log_records_dropped_total"):
+        assert f"# TYPE {name} counter" in text
@@ -0,0 +1,52 @@
+import pytest
+
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, parse_page_args
+
+
+@pytest.mark.parametrize("key", [(0, 1), (17, 17), (-3.25, 42), (1e-9, 7)])
+def test_cursor_round_trip(key):
+    token = encode_cursor(key)
+    assert "=" not in token
+    assert decode_cursor(token) == key
+
+
+@pytest.mark.parametrize("token", ["", "not-base64!", encode_cursor((1, 2))[:-3],
+                                   "WzEsMiwzXQ", "WyJhIiwxXQ", "W3RydWUsMV0", "WzEsMS41XQ"])
+def test_decode_cursor_rejects_foreign_tokens(token):
+    # "WzEsMiwzXQ" is [1,2,3], "WyJhIiwxXQ" ["a",1], "W3RydWUsMV0" [true,1], "WzEsMS41XQ" [1,1.5]
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_parse_page_args_defaults_and_cap():
+    assert parse_page_args({}) == (DEFAULT_PAGE_SIZE, None)
+    assert parse_page_args({"limit": ""}) == (DEFAULT_PAGE_SIZE, None)
+    assert parse_page_args({"limit": "5"}) == (5, None)
+    assert parse_page_args({"limit": str(MAX_PAGE_SIZE * 10)}) == (MAX_PAGE_SIZE, None)
+    assert parse_page_args({"cursor": encode_cursor((3, 4))}) == (DEFAULT_PAGE_SIZE, (3, 4))
+
+
+@pytest.mark.parametrize("args", [{"limit": "ten"}, {"limit": "0"}, {"limit": "-1"}, {"cursor": "bogus"}])
+def test_parse_page_args_rejects_bad_values(args):
+    with pytest.raises(ValueError):
+        parse_page_args(args)
+
+
+
+def test_lost_found_items_are_paged(client):
+    for i in range(5):
+        client.post("/api/lost-found/report", data={
+            "title": f"Umbrella {i}", "description": "black", "category": "Other", "item_type": "lost",
+            "location": "Library", "contact_method": "email", "contact_info": "a@b.c"})
+    ids, cursor = [], None
+    while True:
+        query = f"?limit=2&cursor={cursor}" if cursor else "?limit=2"
+        body = client.get(f"/api/lost-found/items{query}").get_json()
+        assert len(body["data"]) <= 2
+        ids.extend(item["id"] for item in body["data"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert ids == sorted(ids)
+    assert len(ids) == body["total"] >= 5
+    assert client.get("/api/lost-found/items?limit=0").status_code == 400
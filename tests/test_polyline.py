@@ -0,0 +1,62 @@
+import pytest
+
+from polyline import POLYLINE_MIMETYPE, decode, encode, encode_payload, negotiate_format
+
+# The worked example from Google's encoded-polyline documentation
+GOOGLE_POINTS = [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]
+GOOGLE_ENCODED = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_encode_matches_reference():
+    assert encode(GOOGLE_POINTS) == GOOGLE_ENCODED
+    assert decode(GOOGLE_ENCODED) == GOOGLE_POINTS
+
+
+@pytest.mark.parametrize("precision", [5, 6])
+def test_round_trip_within_precision(precision):
+    points = [[16.8285123, 81.5255987], [16.8286, 81.5254], [16.82701, 81.52999], [-0.0000049, 0.0]]
+    decoded = decode(encode(points, precision), precision)
+    assert len(decoded) == len(points)
+    for (lat, lng), (dlat, dlng) in zip(points, decoded):
+        assert abs(lat - dlat) <= 0.5 / 10 ** precision
+        assert abs(lng - dlng) <= 0.5 / 10 ** precision
+
+
+def test_empty_line():
+    assert encode([]) == ""
+    assert decode("") == []
+
+
+def test_encode_payload_replaces_only_point_lists():
+    payload = [{"id": "A", "coordinates": GOOGLE_POINTS, "center": [1.0, 2.0],
+                "nested": {"coordinates": [[38.5, -120.2]]}}]
+    encoded = encode_payload(payload)
+    assert encoded[0]["coordinates"] == GOOGLE_ENCODED
+    assert encoded[0]["center"] == [1.0, 2.0]
+    assert decode(encoded[0]["nested"]["coordinates"]) == [[38.5, -120.2]]
+    # The input is left alone
+    assert payload[0]["coordinates"] == GOOGLE_POINTS
+
+
+def test_negotiate_format():
+    assert negotiate_format(None, False) is None
+    assert negotiate_format(None, True) == "polyline"
+    assert negotiate_format("json", True) is None
+    assert negotiate_format("polyline6", False) == "polyline6"
+    with pytest.raises(ValueError):
+        negotiate_format("wkt", False)
+
+
+def test_geometry_endpoints_label_encoded_payloads(client):
+    plain = client.get("/api/roads")
+    assert plain.mimetype == "application/json"
+    for response in (client.get("/api/roads?format=polyline"),
+                     client.get("/api/roads", headers={"Accept": POLYLINE_MIMETYPE}),
+                     client.get("/api/roads?format=polyline6&bbox=-180,-90,180,90")):
+        assert response.status_code == 200
+        assert response.mimetype == POLYLINE_MIMETYPE
+        assert "Accept" in response.headers["Vary"]
+    encoded = client.get("/api/roads?format=polyline").get_json()
+    assert [decode(f["coordinates"]) for f in encoded] == [
+        [[round(lat, 5), round(lng, 5)] for lat, lng in f["coordinates"]] for f in plain.get_json()]
+    assert client.get("/api/roads?format=wkt").status_code == 400
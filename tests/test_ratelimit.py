@@ -0,0 +1,49 @@
+import pytest
+
+from ratelimit import RecentKeys, TokenBucketLimiter
+
+
+def test_burst_then_rejects_with_retry_after():
+    limiter = TokenBucketLimiter(rate=0.5, burst=3)
+    assert [limiter.acquire("ip", now=100.0)[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = limiter.acquire("ip", now=100.0)
+    assert not allowed
+    assert retry_after == pytest.approx(2.0)
+    assert limiter.rejected == 1
+
+
+def test_tokens_refill_with_time_up_to_burst():
+    limiter = TokenBucketLimiter(rate=1.0, burst=2)
+    limiter.acquire("k", now=0.0)
+    limiter.acquire("k", now=0.0)
+    assert not limiter.acquire("k", now=0.5)[0]
+    assert limiter.acquire("k", now=1.5)[0]
+    # A long idle spell refills to the burst, no further
+    assert [limiter.acquire("k", now=1000.0)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_keys_have_separate_buckets():
+    limiter = TokenBucketLimiter(rate=0.1, burst=1)
+    assert limiter.acquire(("ip", "a"), now=0.0)[0]
+    assert not limiter.acquire(("ip", "a"), now=0.0)[0]
+    assert limiter.acquire(("ip", "b"), now=0.0)[0]
+
+
+def test_least_recently_used_key_is_forgotten():
+    limiter = TokenBucketLimiter(rate=0.001, burst=1, max_keys=2)
+    limiter.acquire("a", now=0.0)
+    limiter.acquire("b", now=0.0)
+    limiter.acquire("a", now=0.0)  # rejected, but marks "a" as recently used
+    limiter.acquire("c", now=0.0)  # evicts "b"
+    assert limiter.acquire("b", now=0.0)[0]  # forgotten, so a full bucket again
+    assert len(limiter._buckets) == 2
+
+
+def test_recent_keys_coalesce_within_window():
+    recent = RecentKeys(window=60)
+    assert not recent.seen(("u", "main", 10), now=0.0)
+    assert recent.seen(("u", "main", 10), now=30.0)
+    assert not recent.seen(("u", "main", 15), now=30.0)
+    # The window runs from the first sighting
+    assert not recent.seen(("u", "main", 10), now=61.0)
+    assert recent.coalesced == 1
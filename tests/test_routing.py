@@ -0,0 +1,138 @@
+from types import SimpleNamespace
+
+import pytest
+
+from routing import RoadGraph, RouteTable, parse_latlng, route_aliases, route_destinations
+
+# An L-shaped road: east along lat 16.0 for ~210 m, then north for ~220 m
+ROADS = {"type": "FeatureCollection", "features": [
+    {"type": "Feature", "geometry": {"type": "LineString",
+                                     "coordinates": [[81.0, 16.0], [81.002, 16.0], [81.002, 16.002]]}},
+]}
+
+
+def square(lat, lng, half=0.00005):
+    return [[lat - half, lng - half], [lat - half, lng + half], [lat + half, lng + half], [lat + half, lng - half]]
+
+
+@pytest.fixture
+def graph():
+    return RoadGraph.from_geojson(ROADS)
+
+
+@pytest.fixture
+def snapshot():
+    return SimpleNamespace(
+        locations=[
+            {"id": "A", "name": "Academic Block", "coordinates": square(16.0002, 81.0)},
+            {"id": "B", "name": "Building B", "coordinates": square(16.002, 81.0022)},
+        ],
+        raw={"nav_config": {"quickLinks": [
+            {"name": "Gate", "coordinates": [16.0, 81.001]},
+            {"name": "Central Library", "targetId": "B"},
+            {"name": "Nowhere", "targetId": "MISSING"},
+        ]}},
+    )
+
+
+@pytest.fixture
+def table(snapshot, graph):
+    return RouteTable(graph, route_destinations(snapshot, graph), route_aliases(snapshot))
+
+
+def test_route_follows_the_road_around_the_corner(graph):
+    route = graph.route(graph.snap(16.0, 81.0), graph.snap(16.002, 81.002))
+    assert route["distance_m"] == pytest.approx(430, rel=0.05)
+    assert route["duration_s"] > 0
+    assert [16.0, 81.002] in route["coordinates"]
+
+
+def test_points_off_the_road_walk_to_it_first(graph):
+    # ~22 m south of the road, then ~107 m east along it
+    route = graph.route(graph.snap(15.9998, 81.0), graph.snap(16.0, 81.001))
+    assert route["distance_m"] == pytest.approx(22 + 107, rel=0.03)
+    assert route["coordinates"][0] == [15.9998, 81.0]
+
+
+def test_points_beyond_max_snap_are_off_the_network(graph):
+    assert graph.snap(16.0, 81.1, max_distance=1000) is None
+
+
+def test_disconnected_roads_have_no_route():
+    graph = RoadGraph.from_geojson({"type": "MultiLineString", "coordinates": [
+        [[81.0, 16.0], [81.001, 16.0]],
+        [[81.0, 16.01], [81.001, 16.01]],
+    ]})
+    assert graph.route(graph.snap(16.0, 81.0), graph.snap(16.01, 81.0)) is None
+
+
+def test_dangling_ends_near_a_road_are_joined():
+    # The second road stops ~3 m short of the first
+    graph = RoadGraph.from_geojson({"type": "MultiLineString", "coordinates": [
+        [[81.0, 16.0], [81.002, 16.0]],
+        [[81.001, 16.002], [81.001, 16.00003]],
+    ]})
+    assert graph.route(graph.snap(16.002, 81.001), graph.snap(16.0, 81.002)) is not None
+
+
+def test_destinations_are_buildings_and_point_links(table):
+    assert [d.key for d in table.destinations] == ["A", "B", "Gate"]
+    assert "A" in table and "Gate" in table
+    assert "Unknown" not in table
+    assert table.describe_key("B") == {"id": "B", "name": "Building B"}
+
+
+def test_link_names_resolve_to_their_building(table):
+    assert "Central Library" in table
+    assert table.describe_key("Central Library") == {"id": "B", "name": "Building B"}
+    assert table.distance("A", "Central Library") == table.distance("A", "B")
+    assert table.route("Gate", "Central Library") == table.route("Gate", "B")
+
+
+def test_links_to_unknown_buildings_are_ignored(table):
+    assert "Nowhere" not in table
+
+
+def test_alias_never_shadows_a_destination(snapshot, graph):
+    snapshot.raw["nav_config"]["quickLinks"].append({"name": "A", "targetId": "B"})
+    table = RouteTable(graph, route_destinations(snapshot, graph), route_aliases(snapshot))
+    assert table.describe_key("A")["id"] == "A"
+
+
+def test_table_distances_follow_the_road(table):
+    # A sits at the west end, B at the north end: the whole L, ~430 m
+    assert table.distance("A", "B") == pytest.approx(430, rel=0.05)
+    assert table.distance("A", "B") == pytest.approx(table.distance("B", "A"))
+    assert table.distance("A", "A") == 0
+    # ~17 m from A's nearest corner to the road, then ~101 m east to the gate
+    route = table.route("A", "Gate")
+    assert route["distance_m"] == pytest.approx(118, rel=0.02)
+    assert route["duration_s"] > 0
+    assert route["coordinates"][-1] == [16.0, 81.001]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("16.5,81.5", (16.5, 81.5)),
+    (" 16.5 , 81.5 ", (16.5, 81.5)),
+    ("16.5", None),
+    ("16.5,81.5,3", None),
+    ("north,east", None),
+    ("91,0", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_latlng(value, expected):
+    assert parse_latlng(value) == expected
+
+
+def test_route_endpoint(client):
+    locations = client.get("/api/locations").get_json()
+    lat, lng = locations[0]["coordinates"][0]
+    response = client.get(f"/api/navigation/route?from={lat},{lng}&to={locations[-1]['id']}")
+    assert response.status_code == 200
+    assert response.get_json()["to"]["id"] == locations[-1]["id"]
+    between = client.get(f"/api/navigation/route?from={locations[0]['id']}&to={locations[-1]['id']}")
+    assert between.status_code == 200
+    assert between.get_json()["from"]["id"] == locations[0]["id"]
+    assert client.get("/api/navigation/route?from=1,2&to=no-such-building").status_code == 404
+    assert client.get("/api/navigation/route?to=x").status_code == 400
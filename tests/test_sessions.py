@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from sessions import RevokedSessions, SessionTokens, session_secret
+
+
+@pytest.fixture
+def tokens(db):
+    return SessionTokens(b"k" * 32, ttl=60, revoked=RevokedSessions(db))
+
+
+def test_issued_token_verifies_until_it_expires(tokens):
+    now = time.time()
+    token, expires_at = tokens.issue("21CS001", now=now)
+    assert expires_at == int(now) + 60
+    claims = tokens.verify(token, now=now)
+    assert claims["sub"] == "21CS001"
+    assert claims["exp"] == expires_at
+    assert tokens.verify(token, now=expires_at - 1) is not None
+    assert tokens.verify(token, now=expires_at) is None
+
+
+def test_tokens_are_distinct_per_login(tokens):
+    first, _ = tokens.issue("21CS001")
+    second, _ = tokens.issue("21CS001")
+    assert first != second
+
+
+@pytest.mark.parametrize("mangle", [
+    lambda t: t[:-1] + ("A" if t[-1] != "A" else "B"),  # signature changed
+    lambda t: "e30" + t[t.index("."):],                  # payload swapped for {}
+    lambda t: t.replace(".", ""),
+    lambda t: t + ".extra",
+    lambda t: "",
+    lambda t: None,
+    lambda t: t + "é",
+])
+def test_tampered_tokens_are_rejected(tokens, mangle):
+    token, _ = tokens.issue("21CS001")
+    assert tokens.verify(mangle(token)) is None
+
+
+def test_token_from_another_secret_is_rejected(tokens):
+    other = SessionTokens(b"x" * 32, ttl=60)
+    token, _ = other.issue("21CS001")
+    assert tokens.verify(token) is None
+
+
+def test_revoked_token_stops_verifying(tokens):
+    token, _ = tokens.issue("21CS001")
+    other, _ = tokens.issue("21CS001")
+    assert tokens.revoke(token)
+    assert tokens.verify(token) is None
+    assert tokens.verify(other) is not None
+    # Revoking again, or revoking junk, reports that nothing valid was revoked
+    assert not tokens.revoke(token)
+    assert not tokens.revoke("junk")
+
+
+def test_without_revocations_logout_leaves_the_token_valid():
+    tokens = SessionTokens(b"k" * 32, ttl=60)
+    token, _ = tokens.issue("21CS001")
+    assert tokens.revoke(token)
+    assert tokens.verify(token) is not None
+    assert not tokens.revoke("junk")
+
+
+def test_expired_revocations_are_purged(db):
+    revoked = RevokedSessions(db)
+    now = time.time()
+    revoked.add("old", int(now) + 10, now=now)
+    revoked.add("already-expired", int(now) - 1, now=now)
+    assert "old" in revoked
+    assert "already-expired" not in revoked
+    # A later add deletes rows whose tokens have expired by then
+    revoked.add("new", int(now) + 1000, now=now + 20)
+    rows = {row[0] for row in db.query("SELECT token_id FROM session_revocations")}
+    assert rows == {"new"}
+
+
+def test_generated_secret_is_kept_in_the_database(db, monkeypatch):
+    monkeypatch.delenv("SESSION_SECRET", raising=False)
+    secret = session_secret(db)
+    assert len(secret) == 32
+    assert session_secret(db) == secret
+
+
+def test_configured_secret_wins(db, monkeypatch):
+    monkeypatch.setenv("SESSION_SECRET", "from-the-environment")
+    assert session_secret(db) == b"from-the-environment"
@@ -0,0 +1,64 @@
+import pytest
+
+from simplify import LayerLevels, douglas_peucker, parse_bbox, zoom_band
+
+
+def test_douglas_peucker_drops_points_within_tolerance():
+    line = [(0, 0), (1, 0.1), (2, -0.1), (3, 5), (4, 6), (5, 7)]
+    assert douglas_peucker(line, 0.5) == [0, 2, 3, 5]
+    # (4, 6) lies on the segment from (3, 5) to (5, 7)
+    assert douglas_peucker(line, 0.0) == [0, 1, 2, 3, 5]
+    assert douglas_peucker(line[:2], 100) == [0, 1]
+
+
+@pytest.mark.parametrize("zoom, band", [(3, 13), (13, 13), (14.5, 15), (17, 17), (17.5, None), (19, None)])
+def test_zoom_band(zoom, band):
+    assert zoom_band(zoom) == band
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("81.0,16.0,81.1,16.1", (81.0, 16.0, 81.1, 16.1)),
+    ("81.1,16.0,81.0,16.1", None),
+    ("81.0,16.0,81.1", None),
+    ("a,b,c,d", None),
+    (None, None),
+])
+def test_parse_bbox(value, expected):
+    assert parse_bbox(value) == expected
+
+
+@pytest.fixture
+def layer():
+    # A wiggly road heading north, every vertex ~1 m off the straight line
+    wiggle = [[16.0 + i * 0.0001, 81.0 + (0.00001 if i % 2 else 0)] for i in range(50)]
+    ring = [[16.0, 81.01], [16.0, 81.0102], [16.0002, 81.0102], [16.0002, 81.01], [16.0, 81.01]]
+    return LayerLevels([{"id": "road", "coordinates": wiggle}, {"id": "hall", "coordinates": ring}])
+
+
+def test_low_zooms_are_simplified_and_full_zoom_is_not(layer):
+    road, hall = layer.features
+    coarse_road, coarse_hall = layer.select(13)
+    assert len(coarse_road["coordinates"]) < len(road["coordinates"])
+    assert coarse_road["coordinates"][0] == road["coordinates"][0]
+    assert coarse_road["coordinates"][-1] == road["coordinates"][-1]
+    # A ring that would collapse below a triangle is served whole
+    assert coarse_hall is hall
+    assert layer.select(18) == layer.features
+    assert layer.select() == layer.features
+
+
+def test_bbox_selects_features_whose_bounds_meet_it(layer):
+    assert [f["id"] for f in layer.select(bbox=(81.009, 15.99, 81.02, 16.01))] == ["hall"]
+    assert [f["id"] for f in layer.select(bbox=(80.0, 15.0, 82.0, 17.0))] == ["road", "hall"]
+    assert layer.select(bbox=(70.0, 10.0, 70.1, 10.1)) == []
+
+
+def test_layer_endpoints(client):
+    full = client.get("/api/roads").get_json()
+    coarse = client.get("/api/roads?zoom=13")
+    assert coarse.status_code == 200
+    assert "ETag" in coarse.headers
+    assert len(coarse.get_json()) == len(full)
+    assert sum(len(f["coordinates"]) for f in coarse.get_json()) <= sum(len(f["coordinates"]) for f in full)
+    assert client.get("/api/locations?bbox=0,0,1,1").get_json() == []
+    assert client.get("/api/locations?bbox=nonsense").status_code == 400
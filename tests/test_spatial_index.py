@@ -0,0 +1,85 @@
+import math
+import random
+
+import pytest
+
+from spatial_index import GridIndex, PolygonIndex, point_in_ring
+
+
+def square(lat, lng, half):
+    return [[lat - half, lng - half], [lat - half, lng + half], [lat + half, lng + half],
+            [lat + half, lng - half], [lat - half, lng - half]]
+
+
+@pytest.fixture
+def grid_points():
+    rng = random.Random(7)
+    points = [(rng.uniform(-500, 500), rng.uniform(-500, 500)) for _ in range(300)]
+    grid = GridIndex(40)
+    for i, (x, y) in enumerate(points):
+        grid.insert(i, x, y, x, y)
+    return grid, points
+
+
+@pytest.mark.parametrize("x, y, k", [(0, 0, 1), (123, -321, 5), (900, 900, 3), (-40, 10, 300)])
+def test_nearest_matches_a_linear_scan(grid_points, x, y, k):
+    grid, points = grid_points
+    distance = lambda i: math.hypot(points[i][0] - x, points[i][1] - y)
+    expected = sorted(distance(i) for i in range(len(points)))[:k]
+    assert [d for d, _ in grid.nearest(x, y, distance, k)] == pytest.approx(expected)
+
+
+def test_nearest_respects_max_distance(grid_points):
+    grid, points = grid_points
+    distance = lambda i: math.hypot(points[i][0], points[i][1])
+    hits = grid.nearest(0, 0, distance, k=300, max_distance=100)
+    assert {i for _, i in hits} == {i for i in range(len(points)) if distance(i) <= 100}
+
+
+def test_query_bbox_returns_items_in_overlapping_cells(grid_points):
+    grid, points = grid_points
+    found = grid.query_bbox(-100, -100, 100, 100)
+    inside = {i for i, (x, y) in enumerate(points) if -100 <= x <= 100 and -100 <= y <= 100}
+    assert inside <= found
+    assert GridIndex(10).query_bbox(0, 0, 1, 1) == set()
+
+
+def test_point_in_ring():
+    ring = [(0, 0), (10, 0), (10, 10), (0, 10), (0, 0)]
+    assert point_in_ring(5, 5, ring)
+    assert not point_in_ring(15, 5, ring)
+
+
+@pytest.fixture
+def index():
+    return PolygonIndex([
+        {"id": "campus", "coordinates": square(16.0, 81.0, 0.01)},
+        {"id": "library", "coordinates": square(16.0, 81.0, 0.0005)},
+        {"id": "hostel", "coordinates": square(16.005, 81.005, 0.0005)},
+    ])
+
+
+def test_containing_puts_the_innermost_building_first(index):
+    assert [loc["id"] for loc in index.containing(16.0, 81.0)] == ["library", "campus"]
+    assert [loc["id"] for loc in index.containing(16.003, 81.0)] == ["campus"]
+    assert index.containing(16.5, 81.5) == []
+
+
+def test_nearest_is_by_distance_to_the_outline(index):
+    # Just north of the library, inside the campus outline
+    hits = index.nearest(16.0006, 81.0, k=2)
+    assert [loc["id"] for _, loc in hits] == ["campus", "library"]
+    assert hits[0][0] == 0
+    assert hits[1][0] == pytest.approx(11, rel=0.05)
+
+
+def test_location_endpoints(client):
+    locations = client.get("/api/locations").get_json()
+    ring = locations[0]["coordinates"]
+    lat = sum(pt[0] for pt in ring) / len(ring)
+    lng = sum(pt[1] for pt in ring) / len(ring)
+    nearest = client.get(f"/api/locations/nearest?lat={lat}&lng={lng}&k=3").get_json()
+    assert len(nearest) == 3
+    assert [loc["distance_m"] for loc in nearest] == sorted(loc["distance_m"] for loc in nearest)
+    assert client.get("/api/locations/at?lat=0&lng=0").status_code == 404
+    assert client.get("/api/locations/at?lat=x").status_code == 400
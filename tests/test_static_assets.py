@@ -0,0 +1,80 @@
+import gzip
+import os
+import re
+
+import pytest
+from flask import Flask
+
+from static_assets import IMMUTABLE_MAX_AGE, AssetRegistry, asset_response
+
+CSS = b"body { color: black; }\n" * 50
+
+
+@pytest.fixture
+def registry(tmp_path):
+    (tmp_path / "style.css").write_bytes(CSS)
+    (tmp_path / "page.html").write_bytes(b'<link href="/static/style.css">')
+    registry = AssetRegistry()
+    registry.add("style.css", str(tmp_path / "style.css"), "text/css")
+    registry.add("page.html", str(tmp_path / "page.html"), "text/html",
+                 rewrite=lambda body: body.replace(b"style.css", f"style.css?v={registry.get('style.css').fingerprint}".encode()),
+                 depends=("style.css",))
+    return registry
+
+
+def touch(path, body):
+    path.write_bytes(body)
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_assets_are_rebuilt_when_their_file_changes(registry, tmp_path):
+    css = registry.get("style.css")
+    assert registry.get("style.css") is css
+    assert gzip.decompress(css.variants["gzip"]) == CSS
+    touch(tmp_path / "style.css", CSS + b"p {}\n")
+    assert registry.get("style.css").etag != css.etag
+
+
+def test_dependent_pages_follow_their_dependency(registry, tmp_path):
+    page = registry.get("page.html")
+    assert f"?v={registry.get('style.css').fingerprint}".encode() in page.variants["identity"]
+    touch(tmp_path / "style.css", CSS + b"p {}\n")
+    rebuilt = registry.get("page.html")
+    assert rebuilt.etag != page.etag
+    assert f"?v={registry.get('style.css').fingerprint}".encode() in rebuilt.variants["identity"]
+
+
+def test_missing_files_have_no_asset(registry, tmp_path):
+    os.remove(tmp_path / "style.css")
+    assert registry.get("style.css") is None
+
+
+@pytest.mark.parametrize("headers, encoding", [({}, None), ({"Accept-Encoding": "gzip"}, "gzip"),
+                                               ({"Accept-Encoding": "gzip;q=0, deflate"}, None)])
+def test_asset_response_negotiates_and_revalidates(registry, headers, encoding):
+    css = registry.get("style.css")
+    with Flask(__name__).test_request_context("/", headers=headers):
+        response = asset_response(css)
+    assert response.headers.get("Content-Encoding") == encoding
+    assert response.get_data() == css.variants[encoding or "identity"]
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert "Accept-Encoding" in response.vary
+    with Flask(__name__).test_request_context("/", headers=dict(headers, **{"If-None-Match": response.headers["ETag"]})):
+        assert asset_response(css).status_code == 304
+
+
+def test_immutable_assets_are_cached_for_a_year(registry):
+    with Flask(__name__).test_request_context("/"):
+        response = asset_response(registry.get("style.css"), immutable=True)
+    assert response.headers["Cache-Control"] == f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+
+
+def test_pages_link_the_stylesheet_by_fingerprint(client):
+    page = client.get("/")
+    assert page.status_code == 200
+    fingerprint = re.search(rb'/static/style\.css\?v=(\w+)"', page.get_data()).group(1).decode()
+    pinned = client.get(f"/static/style.css?v={fingerprint}")
+    assert "immutable" in pinned.headers["Cache-Control"]
+    assert client.get("/static/style.css").headers["Cache-Control"] == "no-cache"
+    assert client.get("/", headers={"If-None-Match": page.headers["ETag"]}).status_code == 304
@@ -0,0 +1,113 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+
+from uploads import UnsupportedImage, UploadStore, UploadTooLarge
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadStore(str(tmp_path), "/static/uploads", max_bytes=1000)
+
+
+def test_uploads_are_stored_under_their_content_hash(store, tmp_path):
+    url = store.save(io.BytesIO(PNG))
+    name = f"{hashlib.sha256(PNG).hexdigest()}.png"
+    assert url == f"/static/uploads/{name}"
+    assert (tmp_path / name).read_bytes() == PNG
+    # The same bytes again are the same file
+    assert store.save(io.BytesIO(PNG)) == url
+    assert sorted(os.listdir(tmp_path)) == [name]
+
+
+@pytest.mark.parametrize("data, error", [
+    (PNG + b"\x00" * 1000, UploadTooLarge),
+    (b"GIF88a not really", UnsupportedImage),
+    (b"", UnsupportedImage),
+])
+def test_rejected_uploads_leave_nothing_behind(store, tmp_path, data, error):
+    with pytest.raises(error):
+        store.save(io.BytesIO(data))
+    assert os.listdir(tmp_path) == []
+
+
+def test_rendition_urls_and_fallback_to_the_original(store):
+    url = store.save(io.BytesIO(PNG))
+    base = url[:-len(".png")]
+    assert store.rendition_urls(url) == {"thumbnail_url": f"{base}-thumb.png", "medium_url": f"{base}-medium.png"}
+    assert store.rendition_urls("/static/uploads/cat.png") == {}
+    assert store.rendition_urls(f"{base}-thumb.png") == {}
+    assert store.rendition_urls(None) == {}
+    digest = base.rsplit("/", 1)[1]
+    # Until the thumbnail exists its URL serves the original
+    assert store.resolve(f"{digest}-thumb.png") == f"{digest}.png"
+    assert store.resolve("cat.png") == "cat.png"
+
+
+def test_renditions_are_made_in_the_background(store, tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 400), "red").save(buffer, format="PNG")
+    store.max_bytes = len(buffer.getvalue())
+    url = store.save(io.BytesIO(buffer.getvalue()))
+    store._pool.shutdown(wait=True)
+    digest = url.rsplit("/", 1)[1][:-len(".png")]
+    with Image.open(tmp_path / f"{digest}-thumb.png") as thumb:
+        assert thumb.size == (320, 160)
+    assert store.resolve(f"{digest}-thumb.png") == f"{digest}-thumb.png"
+
+
+def wait_for_renditions(store, timeout=5):
+    deadline = time.monotonic() + timeout
+    while store._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_failed_renditions_are_cleaned_up_and_retried(store, tmp_path, monkeypatch):
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 400), "red").save(buffer, format="PNG")
+    data = buffer.getvalue()
+    store.max_bytes = len(data)
+
+    def fail(self, *args, **kwargs):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Image.Image, "save", fail)
+        url = store.save(io.BytesIO(data))
+        wait_for_renditions(store)
+    name = url.rsplit("/", 1)[1]
+    assert os.listdir(tmp_path) == [name]
+    # Uploading the same image again makes the renditions that are missing
+    store.save(io.BytesIO(data))
+    wait_for_renditions(store)
+    digest = name[:-len(".png")]
+    assert sorted(os.listdir(tmp_path)) == [f"{digest}-medium.png", f"{digest}-thumb.png", name]
+
+
+def test_reported_items_link_their_renditions(client, monkeypatch, tmp_path):
+    import server
+    monkeypatch.setattr(server, "upload_store", UploadStore(str(tmp_path), "/static/uploads", 5 * 1024 * 1024))
+    monkeypatch.setattr(server, "UPLOAD_FOLDER", str(tmp_path))
+    form = {"title": "Keys", "description": "bunch of keys", "category": "Other", "item_type": "found",
+            "location": "Library", "contact_method": "email", "contact_info": "a@b.c"}
+    response = client.post("/api/lost-found/report", data=dict(form, image=(io.BytesIO(PNG), "keys.png")),
+                           content_type="multipart/form-data")
+    item = response.get_json()["item"]
+    assert item["image_url"].endswith(f"{hashlib.sha256(PNG).hexdigest()}.png")
+    served = client.get(item["thumbnail_url"])
+    assert served.status_code == 200
+    assert served.get_data() == PNG
+    # The original never changes; the thumbnail URL will once it is made
+    assert "immutable" in client.get(item["image_url"]).headers["Cache-Control"]
+    assert "immutable" not in served.headers["Cache-Control"]
+    bad = client.post("/api/lost-found/report", data=dict(form, image=(io.BytesIO(b"MZ not an image"), "keys.png")),
+                      content_type="multipart/form-data")
+    assert bad.status_code == 400
+    assert bad.get_json()["message"].startswith("Invalid file type")
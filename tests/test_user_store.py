@@ -0,0 +1,42 @@
+from user_store import UserStore
+
+
+def test_register_numbers_are_unique(db):
+    users = UserStore(db)
+    assert users.create("21CS001", "pw", "3", "CSE", "2025-01-01 10:00:00")
+    assert not users.create("21CS001", "other", "1", "ECE", "2025-01-02 10:00:00")
+    assert users.get("21CS001")["branch"] == "CSE"
+    assert users.get("21CS002") is None
+
+
+def test_login_after_register(client):
+    user = {"register_number": "21CS900", "password": "pw", "year": "3", "branch": "CSE"}
+    assert client.post("/api/auth/register", json=user).status_code == 201
+    assert client.post("/api/auth/register", json=user).status_code == 400
+    login = client.post("/api/auth/login", json={"register_number": "21CS900", "password": "pw"})
+    assert login.status_code == 200
+    auth = {"Authorization": f"Bearer {login.get_json()['session_id']}"}
+    me = client.get("/api/auth/me", headers=auth)
+    assert me.get_json()["user"]["register_number"] == "21CS900"
+    assert me.get_json()["expires_at"] == login.get_json()["expires_at"]
+    logout = client.post("/api/auth/logout", headers=auth)
+    assert logout.status_code == 200
+    assert logout.get_json()["revoked"] is True
+    assert client.get("/api/auth/me", headers=auth).status_code == 401
+    assert client.get("/api/auth/me").status_code == 401
+    assert client.post("/api/auth/login", json={"register_number": "21CS900", "password": "x"}).status_code == 401
+
+
+def test_logout_without_revocations_says_the_token_still_works(client, monkeypatch):
+    import server
+    monkeypatch.setattr(server.session_tokens, "revoked", None)
+    user = {"register_number": "21CS901", "password": "pw", "year": "3", "branch": "CSE"}
+    client.post("/api/auth/register", json=user)
+    login = client.post("/api/auth/login", json={"register_number": "21CS901", "password": "pw"})
+    auth = {"Authorization": f"Bearer {login.get_json()['session_id']}"}
+    logout = client.post("/api/auth/logout", headers=auth)
+    assert logout.status_code == 200
+    assert logout.get_json()["revoked"] is False
+    assert "until it expires" in logout.get_json()["message"]
+    assert client.get("/api/auth/me", headers=auth).status_code == 200
+    assert client.post("/api/auth/logout", headers={"Authorization": "Bearer junk"}).status_code == 401
@@ -0,0 +1,174 @@
+"""Content-addressed image uploads with background-generated renditions."""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # renditions are optional; originals are served instead
+    Image = None
+    ImageOps = None
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Longest edge, in pixels, of each rendition
+RENDITION_SIZES = {"thumb": 320, "medium": 1024}
+RENDITION_WORKERS = int(os.getenv("RENDITION_WORKERS", "2"))
+
+# Leading bytes of each accepted image type, and the extension it is stored under
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+_STORED_NAME_RE = re.compile(r"^(?P<digest>[0-9a-f]{64})(?:-(?P<rendition>[a-z]+))?\.(?P<ext>png|jpg|gif)$")
+
+logger = logging.getLogger(__name__)
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class UnsupportedImage(ValueError):
+    pass
+
+
+def _sniff_extension(head: bytes) -> Optional[str]:
+    for signature, ext in _SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    return None
+
+
+class UploadStore:
+    """Images stored under the sha256 of their bytes, so a re-upload is a no-op.
+
+    save() copies the upload to disk in chunks, hashing as it goes and giving
+    up as soon as max_bytes is passed, then moves the file into place under
+    its digest. Smaller renditions are made on a thread pool afterwards; until
+    one exists (or when Pillow isn't installed) its URL serves the original.
+    Re-uploading an image retries any rendition that is still missing.
+    """
+
+    def __init__(self, root: str, url_prefix: str, max_bytes: int):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+        self.max_bytes = max_bytes
+        self._pool = ThreadPoolExecutor(max_workers=RENDITION_WORKERS, thread_name_prefix="rendition")
+        # Originals with renditions queued or being made, so repeats aren't queued twice
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+
+    def save(self, stream: BinaryIO) -> str:
+        """Store an uploaded image and return its URL.
+
+        Raises UploadTooLarge or UnsupportedImage; nothing is left on disk then.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        ext = None
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if ext is None:
+                        ext = _sniff_extension(chunk)
+                        if ext is None:
+                            raise UnsupportedImage("File is not a PNG, JPEG or GIF image")
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise UploadTooLarge(f"Upload exceeds {self.max_bytes} bytes")
+                    digest.update(chunk)
+                    out.write(chunk)
+            if ext is None:
+                raise UnsupportedImage("Empty file")
+            name = f"{digest.hexdigest()}.{ext}"
+            path = os.path.join(self.root, name)
+            if os.path.exists(path):
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+            self._queue_renditions(path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return f"{self.url_prefix}/{name}"
+
+    def _queue_renditions(self, path: str) -> None:
+        """Make any missing renditions of path in the background."""
+        if Image is None:
+            return
+        base, ext = os.path.splitext(path)
+        if all(os.path.exists(f"{base}-{rendition}{ext}") for rendition in RENDITION_SIZES):
+            return
+        with self._pending_lock:
+            if path in self._pending:
+                return
+            self._pending.add(path)
+        self._pool.submit(self._make_renditions, path)
+
+    def _make_renditions(self, path: str) -> None:
+        try:
+            base, ext = os.path.splitext(path)
+            for rendition, edge in RENDITION_SIZES.items():
+                target = f"{base}-{rendition}{ext}"
+                if not os.path.exists(target):
+                    self._make_rendition(path, target, edge)
+        finally:
+            with self._pending_lock:
+                self._pending.discard(path)
+
+    def _make_rendition(self, path: str, target: str, edge: int) -> None:
+        ext = os.path.splitext(path)[1]
+        tmp_path = None
+        try:
+            with Image.open(path) as im:
+                im = ImageOps.exif_transpose(im)
+                im.thumbnail((edge, edge))
+                if ext == ".jpg" and im.mode not in ("RGB", "L"):
+                    im = im.convert("RGB")
+                fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".rendition-", suffix=ext)
+                with os.fdopen(fd, "wb") as out:
+                    im.save(out, format=Image.registered_extensions()[ext], optimize=True)
+            os.replace(tmp_path, target)
+        except Exception as e:
+            logger.warning("Could not make %s of %s: %s", os.path.basename(target), path, e)
+            # A half-written rendition would otherwise stay behind
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def rendition_urls(self, image_url: Optional[str]) -> Dict[str, str]:
+        """thumbnail_url / medium_url for a stored image URL ({} for anything else)."""
+        if not image_url or not image_url.startswith(self.url_prefix + "/"):
+            return {}
+        match = _STORED_NAME_RE.match(image_url[len(self.url_prefix) + 1:])
+        if not match or match.group("rendition"):
+            return {}
+        base = f"{self.url_prefix}/{match.group('digest')}"
+        return {
+            "thumbnail_url": f"{base}-thumb.{match.group('ext')}",
+            "medium_url": f"{base}-medium.{match.group('ext')}",
+        }
+
+    def is_immutable(self, filename: str) -> bool:
+        """True for content-addressed names, whose bytes can never change."""
+        return _STORED_NAME_RE.match(filename) is not None
+
+    def resolve(self, filename: str) -> str:
+        """Name of the file to serve for filename: a missing rendition falls back to its original."""
+        match = _STORED_NAME_RE.match(filename)
+        if match and match.group("rendition") and not os.path.exists(os.path.join(self.root, filename)):
+            return f"{match.group('digest')}.{match.group('ext')}"
+        return filename
@@ -0,0 +1,29 @@
+"""User accounts on SQLite."""
+
+import sqlite3
+from typing import Any, Dict, Optional
+
+from database import Database
+
+_SELECT_USER = "SELECT register_number, password, year, branch, created_at FROM users WHERE register_number = ?"
+_INSERT_USER = "INSERT INTO users (register_number, password, year, branch, created_at) VALUES (?, ?, ?, ?, ?)"
+
+
+class UserStore:
+    """Rows of the users table, keyed by register number."""
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def get(self, register_number: str) -> Optional[Dict[str, Any]]:
+        row = self.db.query_one(_SELECT_USER, (register_number,))
+        return dict(row) if row else None
+
+    def create(self, register_number: str, password: str, year: str, branch: str, created_at: str) -> bool:
+        """Add a user; False if the register number is already taken."""
+        try:
+            with self.db.transaction() as conn:
+                conn.execute(_INSERT_USER, (register_number, password, year, branch, created_at))
+        except sqlite3.IntegrityError:
+            return False
+        return True